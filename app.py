@@ -1,71 +1,113 @@
 # app.py
+import pandas as pd
 import streamlit as st
-from utils.data_loader import load_data # Asumiendo que tienes esta función
-from utils.sampling import sample_data # Necesitarás crear este módulo/función
+from utils.data_loader import load_data, load_from_db, load_from_api, is_excel_source, list_excel_sheets
+from utils.sampling import apply_sampling
 from utils.filters import apply_filters_ui, get_filtered_df # Necesitarás crear este módulo/función
-from utils.plots import render_main_plot_ui, render_coupled_plot_ui
+from utils.plots import render_main_plot_ui, render_coupled_plot_ui, render_export_queue_ui
+from utils.lazy import is_lazy, is_empty, row_count_label
+from utils.dataset_store import get_dataset_store, current_session_id
 
 # --- Configuración de Página ---
 st.set_page_config(layout="wide", page_title="Dashboard Multimedia")
+# Las tablas cargadas se comparten entre sesiones: con copy-on-write, las
+# proyecciones de columnas no copian y escribir en una vista nunca toca la base
+pd.set_option("mode.copy_on_write", True)
+
+# --- Almacén de datasets compartido (utils/dataset_store.py) ---
+# session_state no guarda DataFrames: cada sesión tiene vistas ligeras
+# (posiciones de filas y columnas) sobre tablas base compartidas por huella
+dataset_store = get_dataset_store()
+session_id = current_session_id()
+dataset_store.touch(session_id)
 
 # --- Carga de Datos ---
 st.sidebar.title("Panel de Control")
-uploaded_file = st.sidebar.file_uploader("Carga tu archivo CSV o Excel", type=["csv", "xlsx"])
+uploaded_files = st.sidebar.file_uploader("Carga tus archivos CSV, Parquet o Excel", type=["csv", "parquet", "xlsx"],
+                                          accept_multiple_files=True)
+local_path = st.sidebar.text_input("O ruta local en el servidor (CSV/Parquet, archivo o directorio)", key="local_path")
+mongo_source = st.sidebar.text_input("O colección de MongoDB (base.colección, conexión en MONGODB_URI)", key="mongo_source").strip()
+api_url = st.sidebar.text_input("O URL de API REST (JSON paginado con ?page=N)", key="api_url").strip()
+optimize_memory = st.sidebar.checkbox("Optimizar memoria (lectura por bloques)", value=True, key="optimize_memory")
+add_source_column = st.sidebar.checkbox("Columna con el archivo de origen (varios archivos)", value=False, key="add_source_column")
+load_sample = st.sidebar.checkbox("Muestrear al cargar (reservorio, memoria acotada)", value=False, key="load_sample")
+load_sample_size, load_sample_strata = None, None
+if load_sample:
+    load_sample_size = st.sidebar.number_input("Filas de la muestra (por estrato si se indica)", 100, 10_000_000, 100_000, 10_000, key="load_sample_size")
+    load_sample_strata = st.sidebar.text_input("Columna de estratos (opcional)", key="load_sample_strata").strip() or None
+
+if uploaded_files:
+    # Varios archivos se leen en paralelo y se unifican sus esquemas
+    data_source = uploaded_files[0] if len(uploaded_files) == 1 else uploaded_files
+else:
+    data_source = local_path.strip() or None
 
-if 'raw_df' not in st.session_state:
-    st.session_state.raw_df = None
-if 'sampled_df' not in st.session_state:
-    st.session_state.sampled_df = None
-if 'filtered_df' not in st.session_state:
-    st.session_state.filtered_df = None
+excel_sheets = None
+if data_source is not None and not isinstance(data_source, list) and is_excel_source(data_source):
+    # Solo se lee el índice del libro; cada hoja elegida se parsea una vez y queda en caché Parquet
+    try:
+        available_sheets = list_excel_sheets(data_source)
+        excel_sheets = st.sidebar.multiselect("Hojas de Excel", available_sheets, default=available_sheets[:1], key="excel_sheets")
+    except Exception as e:
+        st.sidebar.error(f"No se pudo leer el libro de Excel: {e}")
 
-if uploaded_file:
-    raw_df = load_data(uploaded_file)
+if data_source or mongo_source or api_url:
+    if data_source:
+        # Las rutas locales grandes se abren en modo perezoso (Dask) automáticamente
+        raw_df = load_data(data_source, optimize=optimize_memory,
+                           sample_size=load_sample_size, sample_strata=load_sample_strata,
+                           source_column="archivo_origen" if add_source_column else None,
+                           sheets=excel_sheets)
+    elif mongo_source:
+        database, _, collection = mongo_source.partition(".")
+        raw_df = load_from_db(database, collection) if collection else None
+    else:
+        raw_df = load_from_api(api_url)
     if raw_df is not None:
-        st.session_state.raw_df = raw_df
-        st.session_state.sampled_df = raw_df # Inicialmente, muestreado es igual a raw
-        st.session_state.filtered_df = raw_df # Inicialmente, filtrado es igual a raw
+        # Si otra sesión ya cargó el mismo dataset, se reutiliza su tabla base
+        raw_df = dataset_store.put_view(session_id, 'raw', raw_df)
         st.sidebar.success("Archivo cargado exitosamente!")
-        st.sidebar.metric("Filas Totales", len(raw_df))
+        st.sidebar.metric("Filas Totales", row_count_label(raw_df)) # En Dask, sin recorrer el dataset
+        if is_lazy(raw_df):
+            st.sidebar.info(f"Modo perezoso (Dask): {raw_df.npartitions} particiones.")
+        reservoir_info = getattr(raw_df, 'attrs', {}).get('reservoir')
+        if reservoir_info:
+            st.sidebar.caption(f"Muestra aleatoria de {reservoir_info['sample_rows']:,} filas "
+                               f"de {reservoir_info['rows_seen']:,} leídas.")
+        memory_report = getattr(raw_df, 'attrs', {}).get('memory_report')
+        if memory_report:
+            st.sidebar.caption(
+                f"Memoria: {memory_report['optimized_bytes'] / 1024**2:.1f} MB "
+                f"(ahorro de {memory_report['saved_bytes'] / 1024**2:.1f} MB, {memory_report['saved_ratio']:.0%})"
+            )
     else:
         st.sidebar.error("No se pudo cargar el archivo.")
-        st.session_state.raw_df = None # Resetear si falla la carga
+        dataset_store.put_view(session_id, 'raw', None) # Resetear si falla la carga
 
-if st.session_state.raw_df is not None:
-    current_df_for_processing = st.session_state.raw_df
+raw_df = dataset_store.get_view(session_id, 'raw')
+if raw_df is not None:
+    current_df_for_processing = raw_df
 
     # --- Muestreo / Partición de Datos (utils/sampling.py) ---
     st.sidebar.markdown("---")
     st.sidebar.subheader("Muestreo / Partición")
-    # Aquí irían los controles para seleccionar el método de muestreo
-    # y st.session_state.sampled_df se actualizaría.
-    # Ejemplo:
-    # sampling_method = st.sidebar.selectbox("Método de Muestreo", ["Ninguno", "Aleatorio", "Estratificado", "Temporal"])
-    # if sampling_method != "Ninguno":
-    #     st.session_state.sampled_df = sample_data(st.session_state.raw_df, method=sampling_method, ...) # Implementar sample_data
-    # else:
-    #     st.session_state.sampled_df = st.session_state.raw_df
-    # current_df_for_processing = st.session_state.sampled_df
-    
-    # Por ahora, asumimos que usamos el raw_df o el último df procesado
-    # Debes implementar la lógica de muestreo y actualizar current_df_for_processing
+    with st.sidebar:
+        sampled_df = apply_sampling(raw_df)
+    # Vista sobre la base: solo se guardan las posiciones de las filas elegidas
+    current_df_for_processing = dataset_store.put_view(session_id, 'sampled', sampled_df, base=raw_df)
 
     # --- Filtrado Dinámico (utils/filters.py) ---
     st.sidebar.markdown("---")
     st.sidebar.subheader("Filtros Dinámicos")
-    # filter_configs = apply_filters_ui(current_df_for_processing) # apply_filters_ui devuelve los widgets y configuraciones
-    # if st.sidebar.button("Aplicar Filtros"):
-    #     st.session_state.filtered_df = get_filtered_df(current_df_for_processing, filter_configs)
-    # else:
-    #      # Si no se aplican filtros nuevos, usar el df procesado anteriormente (muestreado o raw)
-    #      st.session_state.filtered_df = current_df_for_processing 
-    # df_to_visualize = st.session_state.filtered_df
-
-    # Simplificación por ahora: usar el raw_df directamente
-    df_to_visualize = st.session_state.raw_df
+    filter_configs = apply_filters_ui(current_df_for_processing) # apply_filters_ui devuelve los widgets y configuraciones
+    # Los filtros se compilan en una sola máscara; sin filtros activos se reutiliza el mismo df
+    filtered_df = get_filtered_df(current_df_for_processing, filter_configs)
+    df_to_visualize = dataset_store.put_view(session_id, 'filtered', filtered_df, base=raw_df)
+    # Presupuesto global: se liberan primero las vistas de sesiones inactivas
+    dataset_store.enforce_budget(session_id)
 
-    if df_to_visualize is not None and not df_to_visualize.empty:
-        st.metric("Filas para Visualizar", len(df_to_visualize))
+    if not is_empty(df_to_visualize):
+        st.metric("Filas para Visualizar", row_count_label(df_to_visualize))
         
         # --- Renderizar Visualizaciones ---
         # Opción 1: Una función que maneja ambas UIs
@@ -81,8 +123,10 @@ if st.session_state.raw_df is not None:
         coupled_plot_container = st.container()
         with coupled_plot_container:
             render_coupled_plot_ui(df_to_visualize, st) # Pasamos 'st' como el contenedor
+
+        render_export_queue_ui(st)
             
-    elif st.session_state.raw_df is not None : # Hay datos cargados pero están vacíos después de filtrar/muestrear
+    else: # Hay datos cargados pero están vacíos después de filtrar/muestrear
         st.warning("El conjunto de datos actual (después de filtros/muestreo) está vacío.")
 else:
     st.info("Por favor, carga un archivo de datos para comenzar.")
\ No newline at end of file
@@ -0,0 +1,71 @@
+# benchmarks/bench_sampling.py
+"""
+Compara el muestreo estratificado vectorizado (sample_data) con la versión
+anterior basada en groupby.apply.
+
+Uso:
+    python benchmarks/bench_sampling.py [filas] [estratos]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_processing import sample_data  # noqa: E402
+
+
+def legacy_stratified(df: pd.DataFrame, strata: str, size):
+    """Implementación anterior: un df.sample por grupo vía groupby.apply."""
+    if isinstance(size, float):
+        return df.groupby(strata).apply(
+            lambda x: x.sample(frac=size, random_state=42)
+        ).reset_index(drop=True)
+    return df.groupby(strata).apply(
+        lambda x: x.sample(n=size, random_state=42)
+    ).reset_index(drop=True)
+
+
+def make_data(n_rows: int, n_strata: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # Estratos de tamaño desigual (clientes con muchas y con pocas filas)
+    customer = rng.zipf(1.3, n_rows) % n_strata
+    return pd.DataFrame({
+        'cliente': customer,
+        'importe': rng.gamma(2.0, 50.0, n_rows),
+        'canal': rng.choice(['web', 'tienda', 'app'], n_rows),
+    })
+
+
+def timed(label: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<45} {time.perf_counter() - start:8.3f} s  ({len(result):,} filas)")
+    return result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_strata = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    df = make_data(n_rows, n_strata)
+    print(f"{n_rows:,} filas, {df['cliente'].nunique():,} estratos\n")
+
+    timed("vectorizado proporcional (frac=0.1)", sample_data, df, "stratified", 0.1, strata='cliente')
+    timed("vectorizado fijo (n=5 por estrato)", sample_data, df, "stratified", 5, strata='cliente')
+    timed("vectorizado igual (total=50.000)", sample_data, df, "stratified", 50_000,
+          strata='cliente', allocation='equal')
+    timed("vectorizado Neyman (total=50.000)", sample_data, df, "stratified", 50_000,
+          strata='cliente', allocation='neyman', value_column='importe')
+
+    timed("anterior groupby.apply (frac=0.1)", legacy_stratified, df, 'cliente', 0.1)
+    try:
+        timed("anterior groupby.apply (n=5)", legacy_stratified, df, 'cliente', 5)
+    except ValueError as e:
+        print(f"{'anterior groupby.apply (n=5)':<45} falla: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_summary.py
+"""
+Compara el resumen numérico en una pasada por bloques (utils.summary) con el
+cálculo anterior columna a columna (min, max, mean, std y tres percentiles).
+
+Uso:
+    python benchmarks/bench_summary.py [filas] [columnas]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.summary import merge_summaries, summarize_numeric  # noqa: E402
+
+
+def legacy_summary(df: pd.DataFrame) -> dict:
+    """Implementación anterior: varias pasadas por cada columna."""
+    summary = {}
+    for col in df.columns:
+        non_null = df[col].dropna()
+        quantiles = np.quantile(non_null.to_numpy(dtype=np.float64), [0.25, 0.50, 0.75])
+        summary[col] = (non_null.min(), non_null.max(), non_null.mean(), non_null.std(), quantiles)
+    return summary
+
+
+def make_data(n_rows: int, n_columns: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {f"x{i}": rng.normal(i, 1 + i % 7, n_rows) for i in range(n_columns)}
+    df = pd.DataFrame(data)
+    df.iloc[::11, 0] = np.nan
+    return df
+
+
+def timed(label: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<45} {time.perf_counter() - start:8.3f} s")
+    return result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    df = make_data(n_rows, n_columns)
+    print(f"{n_rows:,} filas, {n_columns} columnas\n")
+
+    legacy = timed("anterior columna a columna", legacy_summary, df)
+    summary = timed("una pasada por bloques", lambda frame: summarize_numeric(frame).result(), df)
+    parts = np.array_split(np.arange(n_rows), 8)
+    timed("8 particiones + merge", lambda frame: merge_summaries(
+        [summarize_numeric(frame.iloc[p[0]:p[-1] + 1]) for p in parts]).result(), df)
+
+    # Error relativo de la mediana del boceto frente a la exacta
+    errors = [abs(summary[col]['percentiles']['50%'] - legacy[col][4][1]) / max(abs(legacy[col][4][1]), 1e-12)
+              for col in df.columns]
+    print(f"\nError relativo máximo de la mediana: {max(errors):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Caché de datasets en un directorio temporal (se lee al importar utils.cache)
+os.environ.setdefault("DASHBOARD_CACHE_DIR", tempfile.mkdtemp(prefix="dashboard_cache_"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,165 @@
+# tests/test_aggregations.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import aggregations
+from utils.aggregations import (OTHERS_LABEL, bar_sum_frame, crosstab, grouped_sum, histogram_frame,
+                                shared_aggregations, value_counts_frame)
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(7)
+    n = 4_000
+    # Zipf: pocas categorías muy frecuentes y una cola larga
+    product = pd.Series([f"p{v:03d}" for v in np.minimum(rng.zipf(1.6, size=n), 200)])
+    product[rng.choice(n, 50, replace=False)] = None
+    return pd.DataFrame({
+        "product": product,
+        "channel": pd.Categorical(rng.choice(["web", "shop", "phone"], size=n)),
+        "amount": np.where(rng.random(n) < 0.05, np.nan, rng.normal(loc=10.0, size=n)),
+        "units": rng.integers(1, 5, size=n),
+    })
+
+
+def test_crosstab_matches_pandas(events):
+    table = crosstab(events, "product", "channel")
+    expected = pd.crosstab(events["product"], events["channel"])
+
+    pd.testing.assert_frame_equal(table, expected, check_names=True, check_index_type=False,
+                                  check_column_type=False, check_categorical=False)
+
+
+def test_crosstab_top_k_collapses_tail_into_others(events):
+    top_k = 5
+    table = crosstab(events, "product", "channel", top_k=(top_k, None))
+    totals = events["product"].value_counts()
+    n_present = events["product"].nunique()
+
+    assert len(table) == top_k + 1
+    others = table.index[-1]
+    assert others == f"{OTHERS_LABEL} ({n_present - top_k})"
+    assert sorted(table.index[:-1]) == sorted(totals.index[:top_k])
+    # Nada se pierde: el total sigue siendo el de las filas con ambas claves
+    assert table.to_numpy().sum() == len(events.dropna(subset=["product"]))
+    assert table.loc[others].sum() == totals.iloc[top_k:].sum()
+
+
+def test_crosstab_sparse_above_cell_limit(events, monkeypatch):
+    monkeypatch.setattr(aggregations, "CROSSTAB_SPARSE_CELLS", 10)
+
+    table = crosstab(events, "product", "channel")
+
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in table.dtypes)
+    pd.testing.assert_frame_equal(table.sparse.to_dense(), pd.crosstab(events["product"], events["channel"]),
+                                  check_index_type=False, check_column_type=False, check_categorical=False)
+
+
+def test_value_counts_top_k(events):
+    counts = value_counts_frame(events, "product", top_k=3)
+    expected = events["product"].value_counts()
+    is_others = counts["product"].str.startswith(OTHERS_LABEL)
+
+    assert counts["count"].is_monotonic_decreasing
+    assert is_others.sum() == 1 and counts["count"].sum() == expected.sum()
+    assert set(counts.loc[~is_others, "product"]) == set(expected.index[:3])
+
+
+def test_grouped_sum_ignores_nulls_and_keeps_integers(events):
+    amounts = grouped_sum(events, "channel", "amount")
+    units = grouped_sum(events, "channel", "units")
+    expected = events.dropna(subset=["amount"]).groupby("channel", observed=True)["amount"].sum()
+
+    np.testing.assert_allclose(amounts.set_index("channel")["amount"].loc[expected.index], expected)
+    assert units["units"].dtype == np.int64
+
+
+def test_lazy_crosstab_matches_eager(events):
+    ddf = dd.from_pandas(events, npartitions=3)
+
+    lazy = crosstab(ddf, "product", "channel", top_k=(5, None))
+    eager = crosstab(events, "product", "channel", top_k=(5, None))
+
+    pd.testing.assert_frame_equal(lazy, eager, check_index_type=False, check_column_type=False,
+                                  check_categorical=False)
+    pd.testing.assert_frame_equal(value_counts_frame(ddf, "product", top_k=3), value_counts_frame(events, "product", top_k=3))
+
+
+@pytest.mark.parametrize("histnorm", [None, "percent", "probability density"])
+def test_histogram_matches_numpy(events, histnorm):
+    hist, bin_width = histogram_frame(events, "amount", nbins=12, histnorm=histnorm)
+    values = events["amount"].dropna()
+    counts, edges = np.histogram(values, bins=12)
+    expected = {None: counts, "percent": 100 * counts / counts.sum(),
+                "probability density": counts / (counts.sum() * np.diff(edges))}[histnorm]
+
+    assert bin_width == pytest.approx(edges[1] - edges[0])
+    np.testing.assert_allclose(hist["amount"], (edges[:-1] + edges[1:]) / 2)
+    np.testing.assert_allclose(hist[histnorm or "count"], expected)
+
+
+def test_histogram_by_color_and_categorical(events):
+    hist, _ = histogram_frame(events, "amount", color="channel", nbins=8)
+    categorical, width = histogram_frame(events, "channel")
+
+    totals = hist.groupby("channel")["count"].sum()
+    expected = events.dropna(subset=["amount"]).groupby("channel", observed=True).size()
+    assert totals.to_dict() == expected.to_dict()
+    assert width is None and categorical.set_index("channel")["count"].to_dict() \
+        == events["channel"].value_counts().to_dict()
+
+
+def test_histogram_datetime_and_lazy(events):
+    events = events.assign(when=pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(len(events)), unit="h"))
+    ddf = dd.from_pandas(events, npartitions=4)
+
+    eager, _ = histogram_frame(events, "when", nbins=10)
+    lazy, _ = histogram_frame(ddf, "when", nbins=10)
+    colored, _ = histogram_frame(ddf, "amount", color="channel", nbins=8)
+
+    assert eager["count"].sum() == len(events) and pd.api.types.is_datetime64_any_dtype(eager["when"])
+    pd.testing.assert_frame_equal(lazy, eager)
+    pd.testing.assert_frame_equal(colored.sort_values(["channel", "amount"], ignore_index=True),
+                                  histogram_frame(events, "amount", color="channel", nbins=8)[0]
+                                  .sort_values(["channel", "amount"], ignore_index=True), check_dtype=False)
+
+
+def test_bar_sums_split_by_sign():
+    df = pd.DataFrame({"x": ["a", "a", "b", "b", "c"], "y": [3.0, -1.0, 2.0, 4.0, np.nan]})
+
+    split = bar_sum_frame(df, "x", "y")
+    plain = bar_sum_frame(df, "x", "y", split_sign=False)
+
+    assert sorted(split.itertuples(index=False, name=None)) == [("a", -1.0), ("a", 3.0), ("b", 6.0)]
+    assert plain.set_index("x")["y"].to_dict() == {"a": 2.0, "b": 6.0}
+
+
+def test_shared_aggregations_compute_once_across_threads(events, monkeypatch):
+    calls = []
+    started = threading.Barrier(4)
+    original = aggregations._coded_groups
+
+    def counting_groups(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    def worker(top_k):
+        started.wait()  # Los cuatro hilos piden la agregación a la vez
+        return value_counts_frame(events, "product", top_k=top_k)
+
+    monkeypatch.setattr(aggregations, "_coded_groups", counting_groups)
+    with shared_aggregations(), ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(copy_context().run, worker, top_k) for top_k in (5, 5, 5, 10)]
+        results = [future.result() for future in futures]
+
+    # Tres peticiones idénticas comparten resultado; otro top_k se calcula aparte
+    assert len(calls) == 2
+    assert results[0] is results[1] is results[2] and len(results[3]) == 11  # 10 + "Otros"
+    # Fuera del contexto no hay memo
+    assert value_counts_frame(events, "product", top_k=5) is not results[0] and len(calls) == 3
@@ -0,0 +1,74 @@
+# tests/test_catalog.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import catalog as catalog_module
+from utils.cache import register_fingerprint
+from utils.catalog import HyperLogLog, build_column_catalog, get_column_catalog
+
+
+@pytest.fixture
+def mixed():
+    rng = np.random.default_rng(16)
+    n = 5_000
+    df = pd.DataFrame({
+        "amount": rng.normal(loc=50, scale=5, size=n),
+        "count": rng.integers(0, 10, size=n),
+        "city": rng.choice(["madrid", "lima", "quito"], size=n),
+        "kind": pd.Categorical(rng.choice(["x", "y"], size=n), categories=["x", "y", "unused"]),
+        "user": [f"u{i}" for i in rng.integers(0, 4_000, size=n)],
+        "when": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 100, size=n), unit="D"),
+    })
+    df.loc[:49, "amount"] = np.nan
+    df.loc[:9, "city"] = None
+    return df
+
+
+@pytest.mark.parametrize("n_distinct", [100, 5_000, 200_000])
+def test_hyperloglog_estimate_and_merge(n_distinct):
+    values = pd.Series(np.arange(n_distinct)).astype(str)
+    halves = [HyperLogLog().update(values.iloc[:n_distinct // 2]), HyperLogLog().update(values.iloc[n_distinct // 2:])]
+
+    whole = HyperLogLog().update(pd.concat([values, values])).estimate()
+    merged = halves[0].merge(halves[1]).estimate()
+
+    # Precisión 12: error típico ~1.6%
+    assert whole == pytest.approx(n_distinct, rel=0.06)
+    assert merged == pytest.approx(whole)
+
+
+def test_catalog_matches_pandas(mixed):
+    catalog = build_column_catalog(mixed)
+
+    assert catalog["amount"]["null_count"] == 50 and catalog["amount"]["count"] == len(mixed) - 50
+    assert catalog["amount"]["mean"] == pytest.approx(mixed["amount"].mean())
+    assert catalog["count"]["min"] == 0 and isinstance(catalog["count"]["max"], int)
+    assert sum(catalog["amount"]["histogram"]["counts"]) == len(mixed) - 50
+    assert catalog["city"]["unique_exact"] and catalog["city"]["unique_count"] == 3
+    assert catalog["city"]["values"] == list(mixed["city"].dropna().unique())
+    assert catalog["city"]["top_k"][0] == max(mixed["city"].value_counts().items(), key=lambda item: item[1])
+    # Las categorías sin filas no cuentan
+    assert catalog["kind"]["unique_count"] == 2 and catalog["kind"]["is_categorical"]
+    assert catalog["when"]["min"] == mixed["when"].min() and catalog["when"]["kind"] == "datetime"
+
+
+def test_high_cardinality_falls_back_to_estimates(mixed):
+    catalog = build_column_catalog(mixed, exact_limit=1_000)
+    exact = mixed["user"].nunique()
+
+    assert not catalog["user"]["unique_exact"] and "values" not in catalog["user"]
+    assert catalog["user"]["unique_count"] == pytest.approx(exact, rel=0.06)
+    assert all(count > 1 for _, count in catalog["user"]["top_k"])
+
+
+def test_catalog_computed_once_per_fingerprint(mixed, monkeypatch):
+    calls = []
+    original = catalog_module.build_column_catalog
+    monkeypatch.setattr(catalog_module, "build_column_catalog", lambda df: calls.append(1) or original(df))
+    register_fingerprint(mixed, "test-catalog")
+
+    first = get_column_catalog(mixed)
+    again = get_column_catalog(register_fingerprint(mixed.copy(), "test-catalog"))
+
+    assert first is again and calls == [1]
@@ -0,0 +1,111 @@
+# tests/test_correlation.py
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import correlation
+from utils.cache import LRUByteCache
+from utils.correlation import CoMoments, comoments, compute_correlation
+from utils.summary import numeric_block
+
+
+@pytest.fixture
+def numeric_df():
+    rng = np.random.default_rng(6)
+    n = 3_000
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        "a": base,
+        "b": 2.0 * base + rng.normal(scale=0.5, size=n),
+        "c": rng.normal(loc=1e6, scale=3.0, size=n),  # desplazada: prueba la precisión
+        "d": -base ** 3 + rng.normal(scale=0.1, size=n),
+        "flag": rng.random(size=n) > 0.5,
+        "name": rng.choice(["x", "y"], size=n),
+    })
+    df.loc[rng.choice(n, 300, replace=False), "a"] = np.nan
+    df.loc[rng.choice(n, 500, replace=False), "c"] = np.nan
+    return df
+
+
+COLUMNS = ["a", "b", "c", "d"]
+
+
+def test_merge_equals_single_pass(numeric_df):
+    block = numeric_block(numeric_df, COLUMNS)
+    shift = np.nanmean(block, axis=0)
+    whole = CoMoments(shift, shift).update(block, block)
+    parts = [block[:700], block[700:2_100], block[2_100:]]
+    # Cada parte con su propio desplazamiento, como las particiones de Dask
+    partials = [CoMoments(np.nanmean(p, axis=0), np.nanmean(p, axis=0)).update(p, p) for p in parts]
+    merged = partials[0]
+    for other in partials[1:]:
+        merged.merge(other)
+
+    np.testing.assert_allclose(merged.n, whole.n)
+    np.testing.assert_allclose(merged.correlation(), whole.correlation(), atol=1e-9)
+
+
+def test_chunked_comoments_match_pandas(numeric_df):
+    moments = comoments(numeric_df, COLUMNS, COLUMNS, chunk_rows=512)
+
+    np.testing.assert_allclose(moments.correlation(), numeric_df[COLUMNS].corr().to_numpy(), atol=1e-9)
+
+
+def test_rectangular_comoments(numeric_df):
+    moments = comoments(numeric_df, ["a", "b"], ["c", "d"], chunk_rows=1_000)
+    expected = numeric_df[COLUMNS].corr().loc[["a", "b"], ["c", "d"]].to_numpy()
+
+    np.testing.assert_allclose(moments.correlation(), expected, atol=1e-9)
+
+
+def test_pearson_matrix_and_column_selection(numeric_df):
+    result = compute_correlation(numeric_df)
+    subset = compute_correlation(numeric_df, columns=["d", "a", "name"])
+
+    assert list(result.columns) == COLUMNS  # sin booleanas ni texto
+    pd.testing.assert_frame_equal(result, numeric_df[COLUMNS].corr(), atol=1e-9)
+    pd.testing.assert_frame_equal(subset, numeric_df[["d", "a"]].corr(), atol=1e-9)
+
+
+def test_min_periods_and_constant_columns():
+    df = pd.DataFrame({"x": [1.0, 2.0, np.nan, np.nan], "y": [np.nan, 1.0, 2.0, 3.0], "k": [5.0] * 4})
+
+    result = compute_correlation(df, min_periods=2)
+
+    assert np.isnan(result.loc["x", "y"]) and np.isnan(result.loc["k", "k"])
+    assert result.loc["y", "y"] == 1.0
+
+
+def test_spearman_ranks_pairs_with_different_nulls(numeric_df, monkeypatch):
+    monkeypatch.setattr(correlation, "_tile_cache", LRUByteCache())
+    df = numeric_df.copy()
+    df["e"] = df["b"].where(df["a"].notna())  # mismos nulos que 'a'
+
+    result = compute_correlation(df, method="spearman")
+
+    pd.testing.assert_frame_equal(result, df[COLUMNS + ["e"]].corr(method="spearman"), atol=1e-9)
+
+
+def test_tiles_computed_once_and_reused(numeric_df, monkeypatch):
+    monkeypatch.setattr(correlation, "CORRELATION_TILE_COLUMNS", 2)
+    monkeypatch.setattr(correlation, "_tile_cache", LRUByteCache())
+    calls = []
+    original = correlation.comoments
+    monkeypatch.setattr(correlation, "comoments", lambda df, x, y, *a: calls.append((x, y)) or original(df, x, y, *a))
+
+    compute_correlation(numeric_df, columns=["a", "b"])
+    compute_correlation(numeric_df)
+
+    assert calls == [(["a", "b"], ["a", "b"]), (["a", "b"], ["c", "d"]), (["c", "d"], ["c", "d"])]
+
+
+def test_lazy_matches_eager(numeric_df):
+    ddf = dd.from_pandas(numeric_df, npartitions=4)
+
+    pearson = compute_correlation(ddf)
+    spearman = compute_correlation(ddf, method="spearman")
+
+    pd.testing.assert_frame_equal(pearson, numeric_df[COLUMNS].corr(), atol=1e-9)
+    # En Dask los rangos salen del boceto de cuantiles: aproximados
+    np.testing.assert_allclose(spearman, numeric_df[COLUMNS].corr(method="spearman"), atol=0.02)
@@ -0,0 +1,123 @@
+# tests/test_data_loader.py
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from utils import data_loader
+from utils.data_loader import load_data, load_excel, plan_column_dtypes, read_csv_optimized, read_tables_parallel
+
+CSV_ROWS = ["city,code,value"] + [f"{'ab'[i % 2]},{'xy'[i % 2]},{i}" for i in range(5)] \
+    + [f",{i % 3},{i}" for i in range(5, 10)] + [f"{'ab'[i % 2]},x,{i}" for i in range(10, 15)]
+CSV_TEXT = "\n".join(CSV_ROWS) + "\n"
+
+
+def test_category_column_all_null_in_one_chunk():
+    df = read_csv_optimized(io.StringIO(CSV_TEXT), chunksize=5)
+
+    assert len(df) == 15
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    assert df["city"].isna().sum() == 5
+    assert sorted(df["city"].cat.categories) == ["a", "b"]
+
+
+def test_category_column_numeric_in_one_chunk():
+    # En el segundo bloque 'code' llega como enteros: se unifica como texto
+    df = read_csv_optimized(io.StringIO(CSV_TEXT), chunksize=5)
+
+    assert isinstance(df["code"].dtype, pd.CategoricalDtype)
+    assert df["code"].astype(str).tolist()[:7] == ["x", "y", "x", "y", "x", "2", "0"]
+
+
+def test_chunked_read_matches_plain_read():
+    expected = pd.read_csv(io.StringIO(CSV_TEXT))
+    df = read_csv_optimized(io.StringIO(CSV_TEXT), chunksize=5)
+
+    assert df["value"].tolist() == expected["value"].tolist()
+    assert df["city"].astype(object).where(df["city"].notna(), np.nan).equals(expected["city"])
+
+
+def test_plan_column_dtypes():
+    sample = pd.DataFrame({"n": [1, 2, 3, 4], "f": [0.5, 1.5, np.nan, 2.0],
+                           "label": ["a", "a", "b", "a"], "id": ["u1", "u2", "u3", "u4"],
+                           "fecha": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]})
+    plan = plan_column_dtypes(sample)
+
+    assert plan["n"] == "integer"
+    assert plan["f"] == "float"
+    assert plan["label"] == "category"
+    assert plan["id"] == "keep"
+    assert plan["fecha"] == "datetime"
+
+
+@pytest.fixture
+def parts(tmp_path):
+    """Tres archivos con esquemas distintos: int -> float, columnas que faltan."""
+    pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}).to_csv(tmp_path / "p1.csv", index=False)
+    pd.DataFrame({"a": [2.5], "c": [True]}).to_parquet(tmp_path / "p2.parquet")
+    pd.DataFrame({"b": ["z"], "a": [3]}).to_csv(tmp_path / "p3.csv", index=False)
+    return [str(tmp_path / name) for name in ("p1.csv", "p2.parquet", "p3.csv")]
+
+
+def test_parallel_read_unifies_schemas(parts):
+    table = read_tables_parallel(parts, source_column="archivo", max_workers=3)
+
+    assert table.schema.field("a").type == pa.float64()
+    assert table.column("a").to_pylist() == [1.0, 2.0, 2.5, 3.0]
+    assert table.column("b").to_pylist() == ["x", "y", None, "z"]
+    assert table.column("c").to_pylist() == [None, None, True, None]
+    assert table.column("archivo").to_pylist() == ["p1.csv", "p1.csv", "p2.parquet", "p3.csv"]
+
+
+def test_directory_loads_like_file_list(parts, tmp_path):
+    from_dir = load_data(str(tmp_path), use_cache=False)
+    from_list = load_data(parts, use_cache=False, source_column="archivo")
+
+    pd.testing.assert_frame_equal(from_dir, from_list.drop(columns="archivo"))
+    assert list(from_list["archivo"].astype(str)) == ["p1.csv", "p1.csv", "p2.parquet", "p3.csv"]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    book = openpyxl.Workbook()
+    ventas = book.active
+    ventas.title = "ventas"
+    ventas.append(["fecha", "importe", None, "importe"])  # cabecera vacía y repetida
+    ventas.append([pd.Timestamp("2024-01-01").to_pydatetime(), 10, "a", 1])
+    ventas.append([None, None, None, None])  # fila vacía: se descarta
+    ventas.append([pd.Timestamp("2024-01-02").to_pydatetime(), 12.5, "b"])  # fila corta
+    costes = book.create_sheet("costes")
+    costes.append(["importe"])
+    costes.append([3])
+    path = tmp_path / "libro.xlsx"
+    book.save(path)
+    return str(path)
+
+
+def test_excel_sheet_header_and_rows(workbook):
+    df = load_excel(workbook, use_cache=False)
+
+    assert list(df.columns) == ["fecha", "importe", "columna_3", "importe_1"]
+    assert df["importe"].tolist() == [10.0, 12.5]
+    assert df["importe_1"].isna().tolist() == [False, True]
+    assert pd.api.types.is_datetime64_any_dtype(df["fecha"])
+
+
+def test_excel_sheets_parsed_once(workbook, monkeypatch):
+    calls = []
+    original = data_loader.read_excel_tables
+    monkeypatch.setattr(data_loader, "read_excel_tables",
+                        lambda file, sheets: calls.append(list(sheets)) or original(file, sheets))
+
+    load_excel(workbook)
+    both = load_excel(workbook, sheets=["ventas", "costes"])
+
+    # Solo se parsea la hoja nueva; la otra sale de la caché
+    assert calls == [["ventas"], ["costes"]]
+    assert both["hoja"].tolist() == ["ventas", "ventas", "costes"]
+    assert list(both["hoja"].cat.categories) == ["ventas", "costes"]
+    with pytest.raises(ValueError):
+        load_excel(workbook, sheets=["otra"])
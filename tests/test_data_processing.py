@@ -0,0 +1,93 @@
+# tests/test_data_processing.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processing import allocate_strata, sample_data, stratified_sample
+
+COUNTS = np.array([500, 300, 150, 40, 10])
+
+
+@pytest.mark.parametrize("allocation", ["proportional", "equal", "neyman"])
+def test_allocation_hits_total_without_exceeding_strata(allocation):
+    stds = np.array([1.0, 2.0, 0.5, 4.0, 8.0])
+
+    allocated = allocate_strata(COUNTS, 200, allocation, stds=stds)
+
+    assert allocated.sum() == 200
+    assert np.all(allocated <= COUNTS) and np.all(allocated >= 0)
+
+
+def test_proportional_allocation():
+    assert allocate_strata(COUNTS, 100, "proportional").tolist() == [50, 30, 15, 4, 1]
+    # Con proporción, la misma fracción en cada estrato
+    assert allocate_strata(COUNTS, 0.1, "proportional").tolist() == [50, 30, 15, 4, 1]
+
+
+def test_equal_allocation_redistributes_small_strata():
+    # 10 filas por estrato no caben en el último (solo 4): el resto va a los demás
+    allocated = allocate_strata(np.array([100, 100, 100, 100, 4]), 50, "equal")
+
+    assert allocated.tolist() == [12, 12, 11, 11, 4]
+
+
+def test_neyman_allocation_follows_count_times_std():
+    allocated = allocate_strata(np.array([100, 100]), 30, "neyman", stds=np.array([1.0, 2.0]))
+
+    assert allocated.tolist() == [10, 20]
+    with pytest.raises(ValueError):
+        allocate_strata(COUNTS, 30, "neyman")
+
+
+def test_fixed_allocation_and_errors():
+    assert allocate_strata(COUNTS, 20, "fixed").tolist() == [20, 20, 20, 20, 10]
+    assert allocate_strata(np.array([1000]), 5_000, "proportional").tolist() == [1000]
+    with pytest.raises(ValueError):
+        allocate_strata(COUNTS, 10, "random")
+
+
+@pytest.fixture
+def strata_df():
+    rng = np.random.default_rng(3)
+    n = 2_000
+    return pd.DataFrame({
+        "group": rng.choice(["a", "b", "c"], size=n, p=[0.6, 0.3, 0.1]),
+        "region": rng.choice(["n", "s"], size=n),
+        "value": rng.normal(size=n),
+    }, index=np.arange(n) * 10)
+
+
+def test_stratified_sample_proportional_fraction(strata_df):
+    sample = stratified_sample(strata_df, "group", 0.2)
+    counts = strata_df["group"].value_counts()
+
+    assert sample["group"].value_counts().to_dict() == (counts * 0.2).round().astype(int).to_dict()
+    # Filas reales, en el orden original
+    assert sample.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(sample, strata_df.loc[sample.index])
+
+
+def test_stratified_sample_fixed_rows_and_multiple_columns(strata_df):
+    sample = stratified_sample(strata_df, ["group", "region"], 15)
+
+    assert (sample.groupby(["group", "region"]).size() == 15).all()
+    assert len(sample) == 6 * 15
+
+
+def test_stratified_sample_is_seeded_and_skips_null_strata(strata_df):
+    df = strata_df.copy()
+    df.loc[df.index[:100], "group"] = None
+
+    first = stratified_sample(df, "group", 50, allocation="equal", random_state=7)
+    second = stratified_sample(df, "group", 50, allocation="equal", random_state=7)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first["group"].notna().all() and len(first) == 50
+    assert not first.index.equals(stratified_sample(df, "group", 50, allocation="equal", random_state=8).index)
+
+
+def test_sample_data_stratified_requires_strata(strata_df):
+    with pytest.raises(ValueError):
+        sample_data(strata_df, "stratified", 0.1)
+    sample = sample_data(strata_df, "stratified", 100, strata="group", allocation="neyman", value_column="value")
+    assert len(sample) == 100
@@ -0,0 +1,102 @@
+# tests/test_dataset_store.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cache import known_fingerprint, register_fingerprint, register_selection
+from utils.dataset_store import DatasetStore
+from utils.filters import get_filtered_df
+
+
+@pytest.fixture
+def base_df():
+    rng = np.random.default_rng(5)
+    n = 5_000
+    df = pd.DataFrame({"x": rng.normal(size=n), "name": rng.choice(["alpha", "beta", "gamma"], size=n)})
+    return register_fingerprint(df, "test-store-base")
+
+
+def _store(budget_bytes):
+    return DatasetStore(budget_bytes=budget_bytes, idle_seconds=3600, expire_seconds=3600)
+
+
+def test_bases_are_shared_between_sessions(base_df):
+    store = _store(2**62)
+
+    fingerprint, first = store.share_base(base_df)
+    # Otra sesión carga el mismo archivo: misma huella, otro objeto
+    _, second = store.share_base(register_fingerprint(base_df.copy(), "test-store-base"))
+
+    assert fingerprint == "test-store-base" == known_fingerprint(first)
+    assert store.stats()['bases'] == 1
+    assert np.shares_memory(first["x"].to_numpy(), second["x"].to_numpy())
+
+
+def test_derived_view_rebuilt_after_eviction(base_df):
+    store = _store(2**62)
+    raw = store.put_view("s1", "raw", base_df)
+    filtered = get_filtered_df(raw, {"x": {"type": "numeric_range", "range": (0.0, 1.0)}})
+    store.put_view("s1", "filtered", filtered, base=raw)
+    view = store._sessions["s1"].views["filtered"]
+
+    assert view.base == "test-store-base" and not view.owned and view.nbytes > 0
+    view.frame = None  # como si enforce_budget la hubiera expulsado
+    rebuilt = store.get_view("s1", "filtered")
+
+    pd.testing.assert_frame_equal(rebuilt, filtered)
+    assert known_fingerprint(rebuilt) == known_fingerprint(filtered)
+    assert store.get_view("s1", "filtered") is rebuilt
+
+
+def test_views_without_lineage_are_owned(base_df):
+    store = _store(2**62)
+    raw = store.put_view("s1", "raw", base_df)
+    # Agregado con etiquetas que podrían parecer filas de la base
+    aggregated = raw.groupby("name")[["x"]].mean().reset_index(drop=True)
+    # Selección registrada que luego cambió de forma
+    reshaped = register_selection(raw.iloc[:10].copy(), raw, np.arange(10))
+    reshaped["extra"] = 1
+
+    store.put_view("s1", "agg", aggregated, base=raw)
+    store.put_view("s1", "reshaped", reshaped, base=raw)
+
+    for name in ("agg", "reshaped"):
+        view = store._sessions["s1"].views[name]
+        assert view.owned and view.base is None
+    assert store.get_view("s1", "agg") is aggregated
+
+
+def test_enforce_budget_spares_current_session_and_owned_views(base_df):
+    store = _store(0)  # cualquier RSS supera el presupuesto
+    for session in ("s1", "s2"):
+        raw = store.put_view(session, "raw", base_df)
+        store.put_view(session, "sampled", register_selection(raw.iloc[::2], raw, np.arange(0, len(raw), 2)), base=raw)
+        store.put_view(session, "summary", raw.describe(), base=raw)
+
+    freed = store.enforce_budget(current_session="s1")
+    s1, s2 = store._sessions["s1"].views, store._sessions["s2"].views
+
+    assert freed > 0
+    assert s2["sampled"].frame is None and s2["summary"].frame is not None
+    assert s1["sampled"].frame is not None
+    # La base sigue referenciada: no se libera y la vista se reconstruye
+    assert store.stats()['bases'] == 1
+    assert len(store.get_view("s2", "sampled")) == len(base_df) // 2
+
+
+def test_enforce_budget_drops_unreferenced_bases(base_df):
+    store = _store(0)
+    store.put_view("s1", "raw", base_df)
+    store.release_session("s1")
+
+    assert store.enforce_budget() >= 0
+    assert store.stats()['bases'] == 0
+
+
+def test_enforce_budget_noop_under_budget(base_df):
+    store = _store(2**62)
+    raw = store.put_view("s1", "raw", base_df)
+    store.put_view("s2", "sampled", register_selection(raw.iloc[:100], raw, np.arange(100)), base=raw)
+
+    assert store.enforce_budget(current_session="s1") == 0
+    assert store._sessions["s2"].views["sampled"].frame is not None
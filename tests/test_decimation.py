@@ -0,0 +1,86 @@
+# tests/test_decimation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.decimation import choose_render_mode, density_decimate, density_grid
+
+
+@pytest.fixture
+def cloud():
+    rng = np.random.default_rng(8)
+    dense = rng.normal(scale=0.3, size=(40_000, 2))
+    sparse = rng.uniform(-8, 8, size=(400, 2))
+    points = np.vstack([dense, sparse])
+    df = pd.DataFrame(points, columns=["x", "y"])
+    df["label"] = np.where(rng.random(len(df)) < 0.01, "rare", "common")
+    df.loc[[10, 20], "x"] = np.nan
+    return df
+
+
+def test_render_mode_thresholds():
+    assert choose_render_mode(1_000, 5_000) == "all"
+    assert choose_render_mode(50_000, 5_000) == "decimated"
+    assert choose_render_mode(500_000, 5_000) == "density"
+    assert choose_render_mode(2_000, 5_000, panels=9) == "decimated"
+    assert choose_render_mode(10, 5_000, mode="density") == "density"
+
+
+def test_small_frames_untouched(cloud):
+    small = cloud.iloc[:100]
+
+    assert density_decimate(small, ["x", "y"], 1_000) is small
+
+
+def test_decimation_respects_budget_and_keeps_order(cloud):
+    kept = density_decimate(cloud, ["x", "y"], 2_000)
+
+    assert len(kept) <= 2_000 + 4  # + mínimos y máximos de cada eje
+    assert kept.index.is_monotonic_increasing and kept.index.is_unique
+    assert kept["x"].notna().all()
+
+
+def test_decimation_preserves_sparse_regions_and_extremes(cloud):
+    kept = density_decimate(cloud, ["x", "y"], 2_000)
+    outliers = cloud.index[40_000:]
+
+    # Las celdas poco pobladas (colas) se conservan casi enteras; las densas se aclaran
+    assert kept.index.isin(outliers).sum() > 0.8 * len(outliers)
+    assert kept["x"].min() == cloud["x"].min() and kept["y"].max() == cloud["y"].max()
+    naive = cloud.sample(2_000, random_state=0)
+    assert naive.index.isin(outliers).sum() < kept.index.isin(outliers).sum()
+
+
+def test_strata_keep_rare_classes(cloud):
+    with_strata = density_decimate(cloud, ["x", "y"], 1_000, strata=["label"])
+    without = density_decimate(cloud, ["x", "y"], 1_000)
+
+    # Sin estratos la clase rara se aclara como las demás en la zona densa
+    assert (with_strata["label"] == "rare").sum() > 5 * (without["label"] == "rare").sum()
+    assert len(with_strata) <= 1_000 + 4
+
+
+def test_decimation_is_seeded(cloud):
+    first = density_decimate(cloud, ["x", "y"], 1_500, random_state=1)
+    second = density_decimate(cloud, ["x", "y"], 1_500, random_state=1)
+
+    assert first.index.equals(second.index)
+
+
+def test_categorical_and_datetime_axes():
+    rng = np.random.default_rng(9)
+    n = 20_000
+    df = pd.DataFrame({"when": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**6, n), unit="s"),
+                       "kind": rng.choice(["a", "b", "c"], size=n)})
+
+    kept = density_decimate(df, ["when", "kind"], 500)
+
+    assert 0 < len(kept) <= 502 and set(kept["kind"]) == {"a", "b", "c"}
+
+
+def test_density_grid_counts_all_finite_points(cloud):
+    counts, x_centers, y_centers = density_grid(cloud["x"], cloud["y"], bins=20)
+
+    assert counts.shape == (20, 20) and len(x_centers) == len(y_centers) == 20
+    assert np.nansum(counts) == cloud[["x", "y"]].notna().all(axis=1).sum()
+    assert density_grid(cloud["x"], cloud["label"]) is None
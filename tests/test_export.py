@@ -0,0 +1,51 @@
+# tests/test_export.py
+import io
+import threading
+import zipfile
+
+import plotly.graph_objects as go
+import pytest
+
+from utils import export
+from utils.export import ExportService
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Sustituye a Kaleido: devuelve el título y el formato, y falla con 'pdf'."""
+    calls = []
+
+    def fake_export_plot(fig, format="png", dpi=300, width=1000, height=600):
+        calls.append((threading.current_thread().name, format))
+        if format == "pdf":
+            raise RuntimeError("sin pdf")
+        return f"{fig.layout.title.text}.{format}".encode()
+
+    monkeypatch.setattr(export, "export_plot", fake_export_plot)
+    return calls
+
+
+def test_renders_on_single_background_thread(renders):
+    service = ExportService()
+    fig = go.Figure(layout={"title_text": "ventas"})
+
+    first = service.render(fig, "png").result()
+    second = service.render(fig, "svg").result()
+
+    # Arranque del renderizador una sola vez; todo en el mismo hilo de exportación
+    assert first == b"ventas.png" and second == b"ventas.svg"
+    assert [format for _, format in renders] == ["png", "png", "svg"]
+    assert len({name for name, _ in renders}) == 1 and renders[0][0].startswith("figure-export")
+
+
+def test_batch_zip_lists_failures(renders):
+    service = ExportService()
+    figures = [("Ventas / mes", go.Figure(layout={"title_text": "a"})), ("", go.Figure(layout={"title_text": "b"}))]
+
+    future = service.export_batch(figures, formats=("png", "pdf"))
+    figures[0][1].update_layout(title_text="modificada")  # El lote trabaja sobre copias
+    archive = zipfile.ZipFile(io.BytesIO(future.result()))
+
+    assert sorted(archive.namelist()) == ["01_Ventas_mes.png", "02_grafico.png", "errores.txt"]
+    assert archive.read("01_Ventas_mes.png") == b"a.png"
+    assert archive.read("errores.txt").decode().splitlines() == ["01_Ventas_mes.pdf: sin pdf", "02_grafico.pdf: sin pdf"]
@@ -0,0 +1,138 @@
+# tests/test_filters.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import filters
+from utils.cache import register_fingerprint
+from utils.filters import compile_filter_mask, get_filtered_df, normalize_filter_expr
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 1_001  # no múltiplo de 8: el último byte del bitmap va incompleto
+    return pd.DataFrame({
+        "x": rng.normal(size=n),
+        "y": rng.integers(0, 100, size=n),
+        "city": pd.Categorical(rng.choice(["a", "b", "c", None], size=n)),
+        "label": rng.choice(["p", "q", None], size=n).astype(object),
+        "when": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, size=n), unit="D"),
+    })
+
+
+X_RANGE = {"column": "x", "type": "numeric_range", "range": (-0.5, 1.0)}
+Y_RANGE = {"column": "y", "type": "numeric_range", "range": (10, 40)}
+CITY = {"column": "city", "type": "categorical_multiselect", "values": ["a", np.nan]}
+
+
+def _expected_x(df):
+    return df["x"].between(-0.5, 1.0).to_numpy()
+
+
+def _expected_y(df):
+    return df["y"].between(10, 40).to_numpy()
+
+
+def _expected_city(df):
+    return (df["city"].isin(["a"]) | df["city"].isna()).to_numpy()
+
+
+def test_normalize_flat_dict_is_and():
+    expr = normalize_filter_expr({"x": {"type": "numeric_range", "range": (0, 1)},
+                                  "y": {"type": "numeric_range", "range": (0, 1)}})
+
+    assert expr["op"] == "and"
+    assert [leaf["column"] for leaf in expr["children"]] == ["x", "y"]
+
+
+def test_normalize_collapses_single_child_and_drops_empty():
+    assert normalize_filter_expr({"op": "or", "children": [X_RANGE, {}]}) == X_RANGE
+    assert normalize_filter_expr({"op": "and", "children": []}) is None
+    assert normalize_filter_expr({}) is None
+
+
+def test_normalize_rejects_bad_groups():
+    with pytest.raises(ValueError):
+        normalize_filter_expr({"op": "xor", "children": [X_RANGE]})
+    with pytest.raises(ValueError):
+        normalize_filter_expr({"op": "not", "children": [X_RANGE, Y_RANGE]})
+
+
+def test_and_or_not_tree(df):
+    expr = {"op": "or", "children": [
+        {"op": "and", "children": [X_RANGE, Y_RANGE]},
+        {"op": "not", "children": [CITY]},
+    ]}
+    expected = (_expected_x(df) & _expected_y(df)) | ~_expected_city(df)
+
+    np.testing.assert_array_equal(compile_filter_mask(df, expr), expected)
+
+
+def test_categorical_object_and_datetime_leaves(df):
+    expr = {
+        "label": {"type": "categorical_multiselect", "values": ["q", np.nan]},
+        "when": {"type": "datetime_range", "range": (pd.Timestamp("2024-03-01"), pd.Timestamp("2024-06-30"))},
+    }
+    expected = (df["label"].isin(["q"]) | df["label"].isna()) \
+        & df["when"].between(pd.Timestamp("2024-03-01"), pd.Timestamp("2024-06-30"))
+
+    np.testing.assert_array_equal(compile_filter_mask(df, expr), expected.to_numpy())
+
+
+def test_get_filtered_df_returns_same_frame_when_nothing_dropped(df):
+    assert get_filtered_df(df, {}) is df
+    assert get_filtered_df(df, {"y": {"type": "numeric_range", "range": (0, 99)}}) is df
+
+
+def test_get_filtered_df_matches_mask(df):
+    filtered = get_filtered_df(df, {"op": "or", "children": [X_RANGE, CITY]})
+    expected = df[_expected_x(df) | _expected_city(df)]
+
+    pd.testing.assert_frame_equal(filtered, expected)
+
+
+def _count_leaf_evaluations(monkeypatch):
+    calls = []
+    original = filters._leaf_mask
+
+    def counting_leaf_mask(df, leaf, fingerprint=None):
+        calls.append(leaf["column"])
+        return original(df, leaf, fingerprint)
+
+    monkeypatch.setattr(filters, "_leaf_mask", counting_leaf_mask)
+    return calls
+
+
+def test_leaf_bitmaps_cached_per_fingerprint(df, monkeypatch):
+    register_fingerprint(df, "test-bitmaps")
+    calls = _count_leaf_evaluations(monkeypatch)
+    expr = {"op": "and", "children": [X_RANGE, Y_RANGE]}
+
+    first = compile_filter_mask(df, expr)
+    second = compile_filter_mask(df, expr)
+    # Solo cambia el filtro de y: el de x sale de la caché
+    moved = compile_filter_mask(df, {"op": "and", "children": [X_RANGE, dict(Y_RANGE, range=(0, 20))]})
+
+    assert calls == ["x", "y", "y"]
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(moved, _expected_x(df) & df["y"].between(0, 20).to_numpy())
+
+
+def test_combining_does_not_modify_cached_bitmaps(df):
+    register_fingerprint(df, "test-bitmaps-immutable")
+
+    compile_filter_mask(df, {"op": "and", "children": [X_RANGE, Y_RANGE]})
+    compile_filter_mask(df, {"op": "not", "children": [X_RANGE]})
+
+    np.testing.assert_array_equal(compile_filter_mask(df, X_RANGE), _expected_x(df))
+    np.testing.assert_array_equal(compile_filter_mask(df, Y_RANGE), _expected_y(df))
+
+
+def test_without_fingerprint_nothing_is_cached(df, monkeypatch):
+    calls = _count_leaf_evaluations(monkeypatch)
+
+    compile_filter_mask(df, X_RANGE)
+    compile_filter_mask(df, X_RANGE)
+
+    assert calls == ["x", "x"]
@@ -0,0 +1,80 @@
+# tests/test_indexes.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import filters
+from utils.cache import register_fingerprint
+from utils.filters import compile_filter_mask
+from utils.indexes import SortedRangeIndex, get_datetime_index, get_range_index
+
+
+def test_numeric_range_matches_comparison_and_skips_nan():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=500)
+    values[::7] = np.nan
+    index = SortedRangeIndex.from_series(pd.Series(values))
+
+    np.testing.assert_array_equal(index.range_mask(-0.3, 0.8), (values >= -0.3) & (values <= 0.8))
+    assert len(index.order) == np.count_nonzero(~np.isnan(values))
+    assert np.all(np.diff(index.sorted_values) >= 0)
+
+
+def test_range_bounds_are_inclusive():
+    index = SortedRangeIndex.from_series(pd.Series([5, 1, 3, 3, 9]))
+
+    assert index.range_slice(3, 5) == (1, 4)
+    assert sorted(index.range_positions(3, 3)) == [2, 3]
+    assert index.range_slice(6, 2) == (4, 4)  # rango vacío
+    assert index.searchsorted(3) == 1 and index.searchsorted(3, side='right') == 3
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_datetime_bounds_in_index_unit(unit):
+    # Regresión: los límites se calculaban en ns aunque la columna estuviera en otra unidad
+    dates = pd.Series(pd.date_range("2024-01-01", periods=48, freq="h")).astype(f"datetime64[{unit}]")
+    dates[5] = pd.NaT
+    index = SortedRangeIndex.from_series(dates)
+    start, end = pd.Timestamp("2024-01-01 10:00"), pd.Timestamp("2024-01-02 03:00")
+
+    assert index.datetime_unit == unit
+    np.testing.assert_array_equal(index.range_mask(start, end), dates.between(start, end).to_numpy())
+    assert index.searchsorted(start) == 9  # 10 horas anteriores, menos el NaT
+
+
+def test_datetime_index_parses_text_and_timezones():
+    text = pd.DataFrame({"d": ["2024-01-03", "nope", "2024-01-01", "2024-01-02"]})
+    aware = pd.DataFrame({"d": pd.date_range("2024-01-01", periods=3, freq="D", tz="Europe/Madrid")})
+
+    text_index = get_datetime_index(text, "d")
+    aware_index = get_datetime_index(aware, "d")
+
+    assert list(text_index.order) == [2, 3, 0]
+    assert aware_index.range_mask(pd.Timestamp("2023-12-31 23:00"), pd.Timestamp("2023-12-31 23:00")).tolist() \
+        == [True, False, False]
+
+
+def test_range_index_cached_by_fingerprint():
+    df = pd.DataFrame({"x": np.arange(10.0), "s": list("abcdefghij")})
+
+    assert get_range_index(df, "x") is None  # sin huella no se cachea
+    register_fingerprint(df, "test-range-index")
+    assert get_range_index(df, "x") is get_range_index(df, "x")
+    assert get_range_index(df, "s") is None
+
+
+def test_filters_use_index_with_same_result(monkeypatch):
+    monkeypatch.setattr(filters, "RANGE_INDEX_MIN_ROWS", 10)
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "x": rng.normal(size=200),
+        "when": pd.Series(pd.date_range("2024-01-01", periods=200, freq="min")).astype("datetime64[us]"),
+    })
+    register_fingerprint(df, "test-filters-index")
+    configs = {"x": {"type": "numeric_range", "range": (-1.0, 0.5)},
+               "when": {"type": "datetime_range", "range": (pd.Timestamp("2024-01-01 00:30"),
+                                                            pd.Timestamp("2024-01-01 02:00"))}}
+    plain = {col: dict(config, use_index=False) for col, config in configs.items()}
+
+    np.testing.assert_array_equal(compile_filter_mask(df, configs), compile_filter_mask(df, plain))
+    assert get_range_index(df, "when").datetime_unit == "us"
@@ -0,0 +1,98 @@
+# tests/test_lazy.py
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import lazy
+from utils.lazy import (is_empty, lazy_column_stats, lazy_row_count, lazy_summary, materialize, read_lazy,
+                        row_count_label, sample_lazy)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(14)
+    n = 6_000
+    return pd.DataFrame({
+        "x": rng.normal(size=n),
+        "n": rng.integers(0, 50, size=n),
+        "city": rng.choice(["a", "b", "c"], size=n),
+        "when": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**6, size=n), unit="s"),
+    })
+
+
+@pytest.fixture
+def sources(frame, tmp_path):
+    csv_path, parquet_path = tmp_path / "data.csv", tmp_path / "data.parquet"
+    frame.to_csv(csv_path, index=False)
+    frame.to_parquet(parquet_path, row_group_size=1_000)
+    return str(csv_path), str(parquet_path)
+
+
+def test_read_lazy_sources(sources, frame):
+    csv_path, parquet_path = sources
+
+    from_parquet = read_lazy(parquet_path)
+    from_csv = read_lazy(csv_path)
+
+    assert from_parquet.npartitions == 6
+    pd.testing.assert_frame_equal(from_parquet.compute().reset_index(drop=True), frame)
+    assert len(from_csv) == len(frame)
+    with pytest.raises(ValueError):
+        read_lazy("data.json")
+
+
+def test_row_counts_from_metadata_and_estimates(sources, frame):
+    csv_path, parquet_path = sources
+    ddf = read_lazy(parquet_path)
+
+    assert lazy_row_count(ddf) == (len(frame), True)
+    assert row_count_label(ddf) == len(frame)
+    assert row_count_label(frame) == len(frame)
+    assert lazy_row_count(read_lazy(csv_path)) == (len(frame), True)  # una sola partición: exacto
+
+
+def test_column_stats_cached_across_reruns(sources, frame, monkeypatch):
+    _, parquet_path = sources
+    calls = []
+    original = lazy._compute_lazy_column_stats
+    monkeypatch.setattr(lazy, "_compute_lazy_column_stats",
+                        lambda ddf, max_options: calls.append(1) or original(ddf, max_options))
+
+    # Cada rerun vuelve a abrir la fuente: otro objeto, misma clave
+    first = lazy_column_stats(read_lazy(parquet_path))
+    second = lazy_column_stats(read_lazy(parquet_path))
+
+    assert len(calls) == 1 and first is second
+    assert first["x"]["min"] == frame["x"].min() and first["when"]["max"] == frame["when"].max()
+    assert sorted(first["city"]["values"]) == ["a", "b", "c"]
+    assert "values" not in lazy_column_stats(read_lazy(parquet_path), max_options=2)["city"]
+
+
+def test_is_empty():
+    assert is_empty(None)
+    assert is_empty(dd.from_pandas(pd.DataFrame({"x": [1.0]}).iloc[:0], npartitions=1))
+    assert not is_empty(dd.from_pandas(pd.DataFrame({"x": np.arange(10.0)}), npartitions=3))
+
+
+def test_lazy_summary_matches_pandas(sources, frame):
+    _, parquet_path = sources
+
+    summary = lazy_summary(read_lazy(parquet_path))
+
+    assert summary["general"]["rows"] == len(frame)
+    assert summary["columns"]["x"]["mean"] == pytest.approx(frame["x"].mean())
+    assert summary["columns"]["n"]["max"] == frame["n"].max()
+    assert summary["columns"]["city"]["unique_count"] == 3
+
+
+def test_sampling_and_materialize(sources, frame):
+    _, parquet_path = sources
+    ddf = read_lazy(parquet_path)
+
+    sample = sample_lazy(ddf, "random", 0.1).compute()
+    capped = materialize(ddf, max_rows=600)
+
+    assert 400 < len(sample) < 800
+    assert len(capped) <= 900 and set(capped.columns) == set(frame.columns)
+    assert materialize(frame) is frame
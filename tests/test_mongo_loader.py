@@ -0,0 +1,125 @@
+# tests/test_mongo_loader.py
+import pyarrow as pa
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from utils import data_loader
+from utils.data_loader import load_from_db, read_mongo_collection
+from utils.filters import build_mongo_query
+
+FILTERS = {
+    "score": {"type": "numeric_range", "range": (10, 20)},
+    "city": {"type": "categorical_multiselect", "values": ["Lima", "Quito"]},
+}
+
+
+@pytest.fixture
+def client():
+    client = mongomock.MongoClient()
+    cities = ["Lima", "Quito", "Bogotá"]
+    client["db"]["people"].insert_many(
+        [{"name": f"p{i}", "score": i, "city": cities[i % 3], "extra": i * 2} for i in range(30)])
+    return client
+
+
+@pytest.fixture
+def find_calls(monkeypatch):
+    """Registra los argumentos de cada find() de mongomock."""
+    calls = []
+    original_find = mongomock.collection.Collection.find
+
+    def spy(self, filter=None, projection=None, *args, **kwargs):
+        calls.append({"filter": filter, "projection": projection, **kwargs})
+        return original_find(self, filter, projection, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "find", spy)
+    return calls
+
+
+def test_filters_and_columns_are_pushed_down(client, find_calls):
+    df = load_from_db("db", "people", filter_configs=FILTERS, columns=["name", "score", "city"],
+                      client=client, use_cache=False)
+
+    assert len(find_calls) == 1
+    assert find_calls[0]["filter"] == build_mongo_query(FILTERS)
+    assert find_calls[0]["projection"] == {"name": 1, "score": 1, "city": 1, "_id": 0}
+    assert list(df.columns) == ["name", "score", "city"]
+    assert df["score"].between(10, 20).all()
+    assert set(df["city"]) <= {"Lima", "Quito"}
+    assert len(df) == sum(1 for i in range(10, 21) if i % 3 != 2)
+
+
+def test_untranslatable_filters_never_drop_documents(client, find_calls):
+    # NOT no se traduce (podría descartar documentos sin el campo): solo se empuja la otra rama
+    filters = {"op": "and", "children": [
+        {"column": "score", "type": "numeric_range", "range": (0, 19)},
+        {"op": "not", "children": [{"column": "city", "type": "categorical_multiselect", "values": ["Lima"]}]},
+    ]}
+    df = load_from_db("db", "people", filter_configs=filters, client=client, use_cache=False)
+
+    assert find_calls[0]["filter"] == {"score": {"$gte": 0.0, "$lte": 19.0}}
+    assert len(df) == 20
+
+
+def test_batches_with_mixed_and_missing_fields_are_unified():
+    collection = mongomock.MongoClient()["db"]["mixed"]
+    collection.insert_many([
+        {"a": 1, "b": "x"},
+        {"a": 2},
+        {"a": 3, "b": "y"},
+        # Segundo lote: 'a' pasa a float y aparece 'c'
+        {"a": 4.5, "c": True},
+        {"b": "z", "c": False},
+        {"a": None, "b": None},
+        # Tercer lote: solo campos nuevos
+        {"d": "solo"},
+    ])
+    table = read_mongo_collection(collection, projection={"_id": 0}, batch_size=3)
+
+    assert table.num_rows == 7
+    assert table.schema.field("a").type == pa.float64()
+    assert table.schema.field("b").type == pa.string()
+    assert table.schema.field("c").type == pa.bool_()
+    assert table.column("a").to_pylist() == [1.0, 2.0, 3.0, 4.5, None, None, None]
+    assert table.column("b").to_pylist() == ["x", None, "y", None, "z", None, None]
+    assert table.column("c").to_pylist() == [None, None, None, True, False, None, None]
+    assert table.column("d").to_pylist() == [None] * 6 + ["solo"]
+
+
+def test_empty_result_keeps_projected_columns():
+    collection = mongomock.MongoClient()["db"]["empty"]
+    table = read_mongo_collection(collection, projection={"a": 1, "b": 1, "_id": 0})
+
+    assert table.num_rows == 0
+    assert table.column_names == ["a", "b"]
+
+
+def test_object_ids_are_read_as_text(client):
+    df = load_from_db("db", "people", client=client, use_cache=False)
+
+    assert df["_id"].map(type).eq(str).all()
+    assert len(df) == 30
+
+
+def test_same_query_is_served_from_cache(client, find_calls):
+    first = load_from_db("db", "people", filter_configs=FILTERS, columns=["name", "score"], client=client)
+    second = load_from_db("db", "people", filter_configs=FILTERS, columns=["name", "score"], client=client)
+    assert len(find_calls) == 1
+    assert second.equals(first)
+
+    # Otra consulta (otras columnas) no reutiliza el resultado
+    load_from_db("db", "people", filter_configs=FILTERS, columns=["name"], client=client)
+    assert len(find_calls) == 2
+
+
+def test_injected_clients_are_not_cached_on_disk(client, find_calls, monkeypatch):
+    stored = []
+    monkeypatch.setattr(data_loader._dataset_disk_cache, "put", lambda key, df: stored.append(key))
+    monkeypatch.setattr(data_loader._dataset_disk_cache, "get", lambda key: pytest.fail("lectura de disco"))
+
+    load_from_db("db", "people", columns=["name"], client=client)
+    load_from_db("db", "people", columns=["name"], client=client)
+
+    # La clave usa id(client): solo se reutiliza en memoria dentro de este proceso
+    assert stored == [] and len(find_calls) == 1
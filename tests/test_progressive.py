@@ -0,0 +1,117 @@
+# tests/test_progressive.py
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cache import known_fingerprint, register_fingerprint
+from utils.progressive import estimate_aggregate, estimate_aggregate_partitions, partition_prefix, random_prefix
+
+
+@pytest.fixture
+def population():
+    rng = np.random.default_rng(10)
+    n = 20_000
+    df = pd.DataFrame({
+        "group": rng.choice(["a", "b", "c"], size=n, p=[0.5, 0.3, 0.2]),
+        "value": rng.exponential(scale=5.0, size=n),
+        "other": rng.normal(size=n),
+    })
+    df.loc[rng.choice(n, 200, replace=False), "group"] = None
+    return register_fingerprint(df, "test-progressive")
+
+
+def test_random_prefixes_are_nested(population):
+    small = random_prefix(population, 0.01)
+    large = random_prefix(population, 0.1)
+
+    assert len(small) == 200 and len(large) == 2_000
+    assert small.index.isin(large.index).all()
+    assert small.index.is_monotonic_increasing
+    assert random_prefix(population, 1.0) is population
+    assert known_fingerprint(small) not in (None, known_fingerprint(large))
+
+
+def test_full_sample_is_exact(population):
+    exact = population.groupby("group")[["value", "other"]]
+
+    means = estimate_aggregate(population, ["group"], ["value", "other"], "mean", len(population))
+    sums = estimate_aggregate(population, ["group"], "value", "sum", len(population))
+
+    np.testing.assert_allclose(means[["value", "other"]], exact.mean())
+    np.testing.assert_allclose(sums["value"], exact.sum()["value"])
+    assert (means["value_error"] == 0).all() and (sums["value_error"] == 0).all()
+    assert list(means["group"]) == ["a", "b", "c"]
+
+
+def test_without_keys_single_group(population):
+    estimate = estimate_aggregate(population.iloc[:5_000], [], "value", "mean", len(population))
+
+    assert len(estimate) == 1
+    assert estimate["value"].iloc[0] == pytest.approx(population["value"].iloc[:5_000].mean())
+    with pytest.raises(ValueError):
+        estimate_aggregate(population, [], "value", "median", len(population))
+
+
+@pytest.mark.parametrize("how", ["mean", "sum"])
+def test_confidence_intervals_cover_true_value(population, how):
+    truth = getattr(population.groupby("group")["value"], how)()
+    rng = np.random.default_rng(11)
+    n_trials, covered = 300, 0
+    for _ in range(n_trials):
+        sample = population.iloc[rng.choice(len(population), 1_000, replace=False)]
+        estimate = estimate_aggregate(sample, ["group"], "value", how, len(population)).set_index("group")
+        error = (estimate["value"] - truth).abs()
+        covered += int((error <= estimate["value_error"]).sum())
+
+    # Cobertura nominal del 95% en los 3 grupos (margen por la aproximación normal)
+    coverage = covered / (3 * n_trials)
+    assert 0.9 <= coverage <= 0.99
+
+
+def test_error_shrinks_with_sample_size(population):
+    errors = [estimate_aggregate(random_prefix(population, fraction), ["group"], "value", "sum",
+                                 len(population))["value_error"].mean()
+              for fraction in (0.01, 0.1, 0.5)]
+
+    assert errors[0] > errors[1] > errors[2] > 0
+
+
+def test_partition_prefixes_are_nested(population):
+    ddf = dd.from_pandas(population, npartitions=40)
+
+    small, large = partition_prefix(ddf, 0.01), partition_prefix(ddf, 0.25)
+
+    assert len(small) == 2 and len(large) == 10 and set(small) <= set(large)
+    assert partition_prefix(ddf, 1.0) == list(range(40))
+
+
+def test_all_partitions_are_exact(population):
+    ddf = register_fingerprint(dd.from_pandas(population, npartitions=8), "test-progressive-lazy")
+    exact = population.groupby("group")[["value", "other"]]
+
+    means = estimate_aggregate_partitions(ddf, list(range(8)), ["group"], ["value", "other"], "mean")
+    sums = estimate_aggregate_partitions(ddf, list(range(8)), ["group"], "value", "sum")
+    total = estimate_aggregate_partitions(ddf, list(range(8)), [], "value", "sum")
+
+    np.testing.assert_allclose(means[["value", "other"]], exact.mean())
+    np.testing.assert_allclose(sums["value"], exact.sum()["value"])
+    assert total["value"].iloc[0] == pytest.approx(population["value"].sum())
+    assert (means["value_error"] == 0).all() and (sums["value_error"] == 0).all()
+    assert list(means["group"]) == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("how", ["mean", "sum"])
+def test_partition_intervals_cover_true_value(population, how):
+    # Particiones con medias distintas: la varianza entre particiones domina
+    shifted = population.assign(value=population["value"] + np.repeat(np.arange(40.0), len(population) // 40))
+    ddf = register_fingerprint(dd.from_pandas(shifted, npartitions=40), f"test-progressive-{how}")
+    truth = getattr(shifted.groupby("group")["value"], how)()
+    rng = np.random.default_rng(12)
+    n_trials, covered = 150, 0
+    for _ in range(n_trials):
+        partitions = sorted(rng.choice(40, 10, replace=False))
+        estimate = estimate_aggregate_partitions(ddf, partitions, ["group"], "value", how).set_index("group")
+        covered += int(((estimate["value"] - truth).abs() <= estimate["value_error"]).sum())
+
+    assert 0.88 <= covered / (3 * n_trials) <= 0.99
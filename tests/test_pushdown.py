@@ -0,0 +1,103 @@
+# tests/test_pushdown.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from utils.data_loader import load_parquet_pushdown
+from utils.filters import build_arrow_filter, get_filtered_df
+from utils.lazy import parquet_scan_info, read_lazy
+
+SCHEMA = pa.schema([("x", pa.float64()), ("n", pa.int64()), ("city", pa.string()),
+                    ("when", pa.timestamp("us")), ("zoned", pa.timestamp("us", tz="UTC"))])
+
+X_RANGE = {"type": "numeric_range", "range": (0.0, 1.0)}
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    n = 8_000
+    rng = np.random.default_rng(15)
+    df = pd.DataFrame({
+        "x": np.sort(rng.uniform(-5, 5, size=n)),  # ordenada: los row groups tienen rangos disjuntos
+        "n": rng.integers(0, 100, size=n),
+        "city": rng.choice(["a", "b", "c", None], size=n),
+    })
+    path = tmp_path / "data.parquet"
+    df.to_parquet(path, row_group_size=1_000)
+    return str(path), df
+
+
+def test_arrow_filter_translates_supported_leaves():
+    expr = build_arrow_filter({"x": X_RANGE, "city": {"type": "categorical_multiselect", "values": ["a", np.nan]},
+                               "when": {"type": "datetime_range", "range": (pd.Timestamp("2024-01-01"),
+                                                                             pd.Timestamp("2024-02-01"))}},
+                              SCHEMA)
+
+    text = str(expr)
+    assert "x" in text and "city" in text and "when" in text and "is_null" in text
+
+
+def test_arrow_filter_is_conservative():
+    # Tipos que no encajan con la columna, columnas con zona horaria o inexistentes: se omiten
+    assert build_arrow_filter({"city": X_RANGE}, SCHEMA) is None
+    assert build_arrow_filter({"n": {"type": "categorical_multiselect", "values": ["1"]}}, SCHEMA) is None
+    assert build_arrow_filter({"zoned": {"type": "datetime_range", "range": ("2024-01-01", "2024-02-01")}},
+                              SCHEMA) is None
+    assert build_arrow_filter({"missing": X_RANGE}, SCHEMA) is None
+    # Un OR con una rama no traducible y los NOT no se empujan; un AND conserva lo traducible
+    assert build_arrow_filter({"op": "or", "children": [dict(X_RANGE, column="x"),
+                                                        dict(X_RANGE, column="city")]}, SCHEMA) is None
+    assert build_arrow_filter({"op": "not", "children": [dict(X_RANGE, column="x")]}, SCHEMA) is None
+    assert build_arrow_filter({"x": X_RANGE, "city": X_RANGE}, SCHEMA) is not None
+
+
+def test_only_null_selected_is_pushed_as_is_null(parquet_path):
+    path, df = parquet_path
+
+    expr = build_arrow_filter({"city": {"type": "categorical_multiselect", "values": [np.nan]}}, SCHEMA)
+    loaded = load_parquet_pushdown(path, {"city": {"type": "categorical_multiselect", "values": [np.nan]}})
+
+    assert "is_null" in str(expr)
+    assert loaded["city"].isna().all() and len(loaded) == df["city"].isna().sum()
+    assert len(load_parquet_pushdown(path, {"city": {"type": "categorical_multiselect", "values": []}})) == 0
+
+
+def test_pushdown_then_exact_filter_matches_in_memory(parquet_path):
+    path, df = parquet_path
+    configs = {"op": "or", "children": [
+        {"column": "x", "type": "numeric_range", "range": (-1.0, 0.5)},
+        {"column": "city", "type": "categorical_multiselect", "values": [np.nan]},
+    ]}
+    projected = {"x": {"type": "numeric_range", "range": (-1.0, 0.5)}}
+
+    pushed = get_filtered_df(load_parquet_pushdown(path, configs), configs)
+    narrow = load_parquet_pushdown(path, projected, columns=["x", "n"])
+
+    pd.testing.assert_frame_equal(pushed.reset_index(drop=True),
+                                  get_filtered_df(df, configs).reset_index(drop=True))
+    assert list(narrow.columns) == ["x", "n"] and narrow["x"].between(-1.0, 0.5).all()
+    assert len(narrow) == df["x"].between(-1.0, 0.5).sum()
+
+
+def test_lazy_scan_skips_row_groups(parquet_path):
+    path, df = parquet_path
+    configs = {"x": {"type": "numeric_range", "range": (-1.0, 0.5)}}
+
+    scanned = load_parquet_pushdown(path, configs, lazy=True)
+
+    assert scanned.npartitions < 8
+    assert parquet_scan_info(scanned)["filter"] is not None
+    assert len(scanned) == df["x"].between(-1.0, 0.5).sum()
+
+
+def test_filtering_unregistered_lazy_scan(parquet_path):
+    path, df = parquet_path
+    configs = {"n": {"type": "numeric_range", "range": (10, 20)}, "x": {"type": "numeric_range", "range": (0, 5)}}
+
+    # Recién abierto con read_lazy (sin huella registrada): se re-escanea con el filtro
+    filtered = get_filtered_df(read_lazy(path), configs).compute()
+
+    # Dask lee el texto como string[pyarrow]
+    pd.testing.assert_frame_equal(filtered.reset_index(drop=True),
+                                  get_filtered_df(df, configs).reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,77 @@
+# tests/test_reservoir.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.reservoir import ReservoirSampler, iter_source_chunks, reservoir_sample_source
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(13)
+    n = 5_000
+    df = pd.DataFrame({"row": np.arange(n), "kind": rng.choice(["a", "b", "c"], size=n, p=[0.8, 0.15, 0.05]),
+                       "value": rng.normal(size=n)})
+    df.loc[:9, "kind"] = None
+    csv_path, parquet_path = tmp_path / "source.csv", tmp_path / "source.parquet"
+    df.to_csv(csv_path, index=False)
+    df.to_parquet(parquet_path, row_group_size=700)
+    return df, str(csv_path), str(parquet_path)
+
+
+def test_chunks_cover_source(source):
+    df, csv_path, parquet_path = source
+
+    for path in (csv_path, parquet_path):
+        chunks = list(iter_source_chunks(path, chunk_rows=1_200))
+        assert all(len(chunk) <= 1_200 for chunk in chunks)
+        assert pd.concat(chunks)["row"].tolist() == df["row"].tolist()
+    assert sum(len(chunk) for chunk in iter_source_chunks([csv_path, parquet_path], 2_000)) == 2 * len(df)
+    with pytest.raises(ValueError):
+        list(iter_source_chunks("data.json"))
+
+
+def test_sample_size_order_and_metadata(source):
+    df, csv_path, _ = source
+
+    sample = reservoir_sample_source(csv_path, 300, chunk_rows=512)
+
+    assert len(sample) == 300 and sample["row"].is_monotonic_increasing and sample["row"].is_unique
+    assert sample.attrs['reservoir'] == {'rows_seen': len(df), 'sample_rows': 300, 'size': 300, 'strata': None}
+    pd.testing.assert_frame_equal(sample, df.set_index("row").loc[sample["row"]].reset_index()[df.columns],
+                                  check_dtype=False)
+
+
+def test_sample_independent_of_chunk_size(source):
+    _, _, parquet_path = source
+
+    # Las claves aleatorias se generan fila a fila: mismo resultado con otros bloques
+    small = reservoir_sample_source(parquet_path, 200, chunk_rows=300)
+    large = reservoir_sample_source(parquet_path, 200, chunk_rows=5_000)
+
+    assert small["row"].tolist() == large["row"].tolist()
+
+
+def test_sample_is_uniform():
+    hits = np.zeros(100)
+    for seed in range(400):
+        sampler = ReservoirSampler(10, random_state=seed)
+        for start in range(0, 100, 30):
+            sampler.update(pd.DataFrame({"row": np.arange(start, min(start + 30, 100))}))
+        hits[sampler.result()["row"].to_numpy()] += 1
+
+    # Cada fila entra con probabilidad 10/100: 40 veces de media en 400 muestras
+    assert hits.min() > 15 and hits.max() < 70
+    assert abs(hits[:30].mean() - hits[70:].mean()) < 8
+
+
+def test_stratified_reservoir(source):
+    df, csv_path, _ = source
+
+    sample = reservoir_sample_source(csv_path, 50, strata="kind", chunk_rows=512)
+
+    assert sample["kind"].value_counts().to_dict() == {"a": 50, "b": 50, "c": 50}
+    with pytest.raises(ValueError):
+        reservoir_sample_source(csv_path, 50, strata="missing")
+    with pytest.raises(ValueError):
+        ReservoirSampler(0)
@@ -0,0 +1,165 @@
+# tests/test_rest_client.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from utils.rest_client import HTTPStatusError, fetch_page, fetch_pages
+
+PAGE_SIZE = 10
+N_PAGES = 12
+
+
+def _records(payload):
+    return payload["data"]
+
+
+class StubAPI:
+    """API paginada de prueba en 127.0.0.1 que registra peticiones y conexiones."""
+
+    def __init__(self):
+        self.requests = []  # (ruta, página, cabeceras)
+        self.request_times = []
+        self.connections = set()
+        self.not_modified = 0
+        self.failures = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def send(self, handler, status, body=b"", headers=None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle(self, handler):
+        parts = urlsplit(handler.path)
+        route, page = parts.path, int(parse_qs(parts.query)["page"][0])
+        with self._lock:
+            self.requests.append((route, page, dict(handler.headers)))
+            self.request_times.append((route, page, time.monotonic()))
+            self.connections.add(handler.client_address)
+        time.sleep(0.01)
+
+        if route == "/retry" and page == 2:
+            with self._lock:
+                attempt = self.failures[page] = self.failures.get(page, 0) + 1
+            if attempt == 1:
+                return self.send(handler, 429, headers={"Retry-After": "1"})
+            if attempt == 2:
+                return self.send(handler, 503, headers={"Retry-After": "0"})
+
+        if page > N_PAGES:
+            if route == "/notfound":
+                return self.send(handler, 404)
+            return self.send(handler, 200, json.dumps({"data": []}).encode())
+
+        etag = f'"p{page}"'
+        if handler.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.not_modified += 1
+            return self.send(handler, 304, headers={"ETag": etag})
+        payload = {"data": [{"id": page * PAGE_SIZE + i} for i in range(PAGE_SIZE)]}
+        headers = {"ETag": etag}
+        if route == "/total":
+            payload["total_pages"] = N_PAGES
+        if route == "/header":
+            headers["X-Total-Pages"] = str(N_PAGES)
+        self.send(handler, 200, json.dumps(payload).encode(), headers)
+
+    def pages_requested(self, route):
+        return sorted(page for r, page, _ in self.requests if r == route)
+
+
+@pytest.fixture
+def api():
+    stub = StubAPI()
+    yield stub
+    stub.close()
+
+
+def _ids(results):
+    return [record["id"] for result in results for record in result.data]
+
+
+@pytest.mark.parametrize("route", ["/total", "/header"])
+def test_known_total_fetches_exactly_the_announced_pages(api, route):
+    results = fetch_pages(api.url + route, _records, concurrency=4)
+
+    assert [result.page for result in results] == list(range(1, N_PAGES + 1))
+    assert _ids(results) == list(range(PAGE_SIZE, (N_PAGES + 1) * PAGE_SIZE))
+    assert api.pages_requested(route) == list(range(1, N_PAGES + 1))
+
+
+@pytest.mark.parametrize("route", ["/empty", "/notfound"])
+def test_unknown_total_stops_at_empty_page_or_404(api, route):
+    results = fetch_pages(api.url + route, _records, concurrency=4)
+
+    assert [result.page for result in results] == list(range(1, N_PAGES + 1))
+    assert _ids(results) == list(range(PAGE_SIZE, (N_PAGES + 1) * PAGE_SIZE))
+    # Como mucho una tanda especulativa pasado el final
+    assert max(api.pages_requested(route)) <= N_PAGES + 4
+
+
+def test_empty_first_page_returns_no_results(api):
+    assert fetch_pages(api.url + "/empty", _records, first_page=N_PAGES + 1) == []
+
+
+def test_retries_429_and_503_honouring_retry_after(api):
+    results = fetch_pages(api.url + "/retry", _records, concurrency=2)
+
+    assert _ids(results) == list(range(PAGE_SIZE, (N_PAGES + 1) * PAGE_SIZE))
+    attempts = [t for route, page, t in api.request_times if page == 2]
+    assert len(attempts) == 3
+    # Retry-After: 1 tras el 429
+    assert attempts[1] - attempts[0] >= 0.9
+
+
+def test_retries_exhausted_raise_http_status_error(api):
+    with pytest.raises(HTTPStatusError) as excinfo:
+        fetch_page(f"{api.url}/retry?page=2", 2, _records, max_retries=0)
+    assert excinfo.value.status == 429
+
+
+def test_unchanged_pages_are_revalidated_with_etag(api):
+    first = fetch_pages(api.url + "/total", _records, concurrency=4)
+    api.requests.clear()
+    second = fetch_pages(api.url + "/total", _records, concurrency=4)
+
+    assert all(result.not_modified for result in second)
+    assert api.not_modified == N_PAGES
+    assert all(headers.get("If-None-Match") == f'"p{page}"' for _, page, headers in api.requests)
+    assert _ids(second) == _ids(first)
+    assert [result.digest for result in second] == [result.digest for result in first]
+
+
+def test_connections_are_reused_up_to_concurrency(api):
+    concurrency = 3
+    fetch_pages(api.url + "/total", _records, concurrency=concurrency)
+    fetch_pages(api.url + "/empty", _records, concurrency=concurrency)
+
+    assert len(api.requests) > 2 * N_PAGES
+    assert len(api.connections) <= concurrency
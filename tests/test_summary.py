@@ -0,0 +1,87 @@
+# tests/test_summary.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.summary import (SKETCH_RELATIVE_ACCURACY, merge_summaries, numeric_block, numeric_histograms,
+                           summarize_numeric)
+
+
+@pytest.fixture
+def numbers():
+    rng = np.random.default_rng(12)
+    n = 30_000
+    df = pd.DataFrame({
+        "skewed": rng.lognormal(mean=2.0, sigma=1.0, size=n),
+        "signed": rng.normal(loc=-3.0, scale=10.0, size=n),
+        "year": rng.integers(2000, 2025, size=n),  # centro lejos de 0
+        "nullable": pd.array(rng.integers(0, 100, size=n), dtype="Int64"),
+    })
+    df.loc[rng.choice(n, 1_000, replace=False), "signed"] = np.nan
+    df.loc[rng.choice(n, 500, replace=False), "nullable"] = pd.NA
+    return df
+
+
+def _check_moments(result, df):
+    for col in df.columns:
+        values = df[col].astype("float64")
+        assert result[col]['count'] == values.count()
+        assert result[col]['mean'] == pytest.approx(values.mean(), rel=1e-9)
+        assert result[col]['std'] == pytest.approx(values.std(), rel=1e-9)
+        assert result[col]['min'] == values.min() and result[col]['max'] == values.max()
+
+
+def test_single_block_is_exact(numbers):
+    result = summarize_numeric(numbers).result()
+
+    _check_moments(result, numbers)
+    for col in numbers.columns:
+        expected = numbers[col].astype("float64").quantile([0.25, 0.5, 0.75]).to_numpy()
+        np.testing.assert_allclose(list(result[col]['percentiles'].values()), expected)
+
+
+def test_blocked_pass_uses_sketch_within_accuracy(numbers):
+    result = summarize_numeric(numbers, chunk_rows=4_096).result()
+
+    _check_moments(result, numbers)
+    for col in ("skewed", "signed", "year"):
+        values = numbers[col].dropna()
+        center = values.iloc[:4_096].mean()
+        for label, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+            expected = values.quantile(q)
+            # Error relativo respecto al centro de la columna (más la resolución del rango)
+            tolerance = 2 * SKETCH_RELATIVE_ACCURACY * abs(expected - center) + values.std() * 0.01
+            assert abs(result[col]['percentiles'][label] - expected) <= tolerance, (col, label)
+
+
+def test_merged_partitions_match_single_pass(numbers):
+    parts = [summarize_numeric(numbers.iloc[start:start + 7_000]) for start in range(0, len(numbers), 7_000)]
+
+    merged = merge_summaries(parts).result()
+    whole = summarize_numeric(numbers, chunk_rows=7_000).result()
+
+    _check_moments(merged, numbers)
+    for col in numbers.columns:
+        np.testing.assert_allclose(list(merged[col]['percentiles'].values()),
+                                   list(whole[col]['percentiles'].values()), rtol=0.02)
+
+
+def test_empty_column():
+    df = pd.DataFrame({"empty": [np.nan, np.nan], "one": [1.0, np.nan]})
+
+    result = summarize_numeric(df).result()
+
+    assert result["empty"]['count'] == 0 and np.isnan(result["empty"]['mean'])
+    assert result["one"]['mean'] == 1.0 and np.isnan(result["one"]['std'])
+
+
+def test_numeric_histograms_match_numpy(numbers):
+    columns = ["signed", "year"]
+    block = numeric_block(numbers, columns)
+    minimum, maximum = np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+
+    counts = numeric_histograms(numbers, columns, minimum, maximum, bins=10, chunk_rows=5_000)
+
+    for j, col in enumerate(columns):
+        expected, _ = np.histogram(numbers[col].dropna(), bins=10, range=(minimum[j], maximum[j]))
+        np.testing.assert_array_equal(counts[j], expected)
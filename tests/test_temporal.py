@@ -0,0 +1,124 @@
+# tests/test_temporal.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cache import register_fingerprint
+from utils.data_processing import temporal_partition
+from utils.temporal import (bucket_downsample, last_periods, rolling_windows, temporal_split, time_sorted,
+                            window_bounds, window_positions)
+
+
+def _events(unit="ns", n=500, seed=4):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 30 * 24 * 60, size=n), unit="min")
+    df = pd.DataFrame({"when": pd.Series(dates).astype(f"datetime64[{unit}]"), "value": rng.normal(size=n)})
+    df.loc[[3, 17], "when"] = pd.NaT
+    return df
+
+
+def _brute_force_windows(df, window, step, expanding=False):
+    dates = df["when"].dropna().sort_values().reset_index(drop=True)
+    window, step = pd.Timedelta(window), pd.Timedelta(step)
+    bounds, end = [], dates.iloc[0] + window
+    while end <= dates.iloc[-1] + step:
+        start = dates.iloc[0] if expanding else end - window
+        lo, hi = int((dates < start).sum()), int((dates < end).sum())
+        if hi > lo:
+            bounds.append((lo, hi))
+        end += step
+    return bounds
+
+
+def test_time_sorted_drops_nat_and_keeps_sorted_frames():
+    df = _events()
+    sorted_df, index = time_sorted(df, "when")
+
+    assert len(sorted_df) == len(df) - 2
+    assert sorted_df["when"].is_monotonic_increasing
+    assert time_sorted(sorted_df, "when")[0] is sorted_df
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "s"])
+@pytest.mark.parametrize("expanding", [False, True])
+def test_window_positions_match_brute_force(unit, expanding):
+    df = _events(unit)
+
+    lo, hi = window_positions(df, "when", "3D", "36h", expanding=expanding)
+
+    assert list(zip(lo.tolist(), hi.tolist())) == _brute_force_windows(df, "3D", "36h", expanding)
+    assert window_bounds(df, "when", "3D", "36h", expanding) == list(zip(lo.tolist(), hi.tolist()))
+
+
+def test_window_longer_than_series_is_one_window():
+    df = _events(n=50)
+
+    assert window_bounds(df, "when", "365D") == [(0, 48)]
+    with pytest.raises(ValueError):
+        window_positions(df, "when", "1D", "-1h")
+
+
+def test_rolling_partition_cuts_only_requested_window():
+    df = _events("us")
+    register_fingerprint(df, "test-rolling")
+    windows = list(rolling_windows(df, "when", "2D", "1D"))
+
+    last = temporal_partition(df, "when", temporal_mode="rolling", window="2D", step="1D")
+    third = temporal_partition(df, "when", temporal_mode="rolling", window="2D", step="1D", window_index=2)
+
+    pd.testing.assert_frame_equal(last, windows[-1])
+    pd.testing.assert_frame_equal(third, windows[2])
+    assert temporal_partition(df, "when", temporal_mode="expanding", window="2D")["when"].min() == df["when"].min()
+
+
+def test_split_by_cutoff_and_size():
+    df = _events()
+    cutoff = pd.Timestamp("2024-01-20")
+
+    train, test = temporal_split(df, "when", cutoff=cutoff)
+    by_size = temporal_partition(df, "when", 0.25, temporal_mode="split", part="test")
+    size_train = temporal_partition(df, "when", 0.25, temporal_mode="split")
+
+    assert (train["when"] < cutoff).all() and (test["when"] >= cutoff).all()
+    assert len(train) + len(test) == len(df) - 2
+    assert len(by_size) == round(0.25 * (len(df) - 2))
+    assert by_size["when"].min() >= size_train["when"].max()
+    with pytest.raises(ValueError):
+        temporal_split(df, "when")
+
+
+def test_last_periods_tick_and_calendar():
+    df = _events()
+    last = df["when"].max()
+
+    days = last_periods(df, "when", 5, "D")
+    months = last_periods(df, "when", 1, "ME")
+
+    assert (days["when"] > last - pd.Timedelta("5D")).all()
+    assert len(days) == int((df["when"] > last - pd.Timedelta("5D")).sum())
+    assert len(months) == int((df["when"] >= last.to_period("M").start_time).sum())
+
+
+def test_bucket_downsample_matches_groupby():
+    df = _events()
+    floored = df["when"].dt.floor("D")
+
+    first = bucket_downsample(df, "when", "D", "first")
+    means = bucket_downsample(df, "when", "D", "mean")
+    expected = df.assign(when=floored).groupby("when")["value"].agg(["mean", "size"])
+
+    assert first["when"].dt.floor("D").is_unique and len(first) == len(expected)
+    np.testing.assert_allclose(means["value"], expected["mean"].to_numpy())
+    assert means["rows"].tolist() == expected["size"].tolist()
+    with pytest.raises(ValueError):
+        bucket_downsample(df, "when", "D", "median")
+
+
+def test_temporal_sample_keeps_time_order():
+    df = _events()
+
+    sample = temporal_partition(df, "when", 100)
+
+    assert len(sample) == 100 and sample["when"].is_monotonic_increasing
+    with pytest.raises(ValueError):
+        temporal_partition(df, "when", 10, temporal_mode="seasonal")
@@ -0,0 +1,107 @@
+# tests/test_visualizations.py
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import visualizations
+from utils.cache import LRUByteCache, register_fingerprint
+from utils.plots import describe_render_mode
+from utils.visualizations import create_coupled_plot, create_visualization, progressive_visualization
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(17)
+    n = 2_000
+    return register_fingerprint(pd.DataFrame({
+        "x": rng.normal(size=n),
+        "y": rng.normal(size=n),
+        "group": rng.choice(["a", "b"], size=n),
+    }), "test-figures")
+
+
+@pytest.fixture(autouse=True)
+def empty_figure_cache(monkeypatch):
+    monkeypatch.setattr(visualizations, "_figure_cache", LRUByteCache())
+
+
+@pytest.fixture
+def flaky_histogram(monkeypatch):
+    """La primera agregación del histograma falla (p.ej. un error puntual de lectura)."""
+    original = visualizations.histogram_frame
+    failures = [RuntimeError("fallo puntual")]
+
+    def histogram_frame(*args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(visualizations, "histogram_frame", histogram_frame)
+
+
+def _count_builds(monkeypatch):
+    calls = []
+    original = visualizations._build_visualization
+
+    def counting_build(df, viz_type, **params):
+        calls.append(viz_type)
+        return original(df, viz_type, **params)
+
+    monkeypatch.setattr(visualizations, "_build_visualization", counting_build)
+    return calls
+
+
+def test_figures_memoized_and_returned_as_copies(df, monkeypatch):
+    calls = _count_builds(monkeypatch)
+
+    first = create_visualization(df, "histogram", x="x", nbins=10)
+    first.update_layout(title_text="modificada")
+    second = create_visualization(df, "histogram", x="x", nbins=10)
+    other = create_visualization(df, "histogram", x="x", nbins=20)
+
+    assert calls == ["histogram", "histogram"]
+    assert second.layout.title.text != "modificada"
+    assert len(other.data[0].x) == 20
+
+
+def test_error_figures_are_not_cached(df, flaky_histogram):
+    failed = create_visualization(df, "histogram", x="x", nbins=10)
+    retried = create_visualization(df, "histogram", x="x", nbins=10)
+
+    assert "Error generando histogram" in failed.layout.title.text and not failed.data
+    assert describe_render_mode(failed) is None
+    assert retried.data and len(visualizations._figure_cache) == 1
+
+
+def test_coupled_plot_with_failed_subplot_is_not_cached(df, flaky_histogram):
+    configs = [{"viz_type": "histogram", "x": "x", "nbins": 10}, {"viz_type": "scatter", "x": "x", "y": "y"}]
+
+    failed = create_coupled_plot(df, configs)
+    retried = create_coupled_plot(df, configs)
+
+    assert len(failed.data) == 1 and failed.layout.annotations[-1].text.startswith("No data")
+    assert len(retried.data) == 2
+
+
+def test_unregistered_frames_keyed_by_content(monkeypatch):
+    calls = _count_builds(monkeypatch)
+    plain = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+
+    create_visualization(plain, "histogram", x="x")
+    create_visualization(plain, "histogram", x="x")
+
+    # dataset_fingerprint calcula la huella de contenido: la segunda sale de la caché
+    assert calls == ["histogram"]
+
+
+def test_lazy_progressive_stages_read_partition_prefixes(df, monkeypatch):
+    monkeypatch.setattr(visualizations, "PROGRESSIVE_MIN_ROWS", 1_000)
+    ddf = register_fingerprint(dd.from_pandas(df.assign(v=df["x"].abs()), npartitions=20), "test-lazy-stages")
+
+    stages = list(progressive_visualization(ddf, "bar", x="group", y="v", bar_agg="mean"))
+
+    # 1% y 10% de 20 particiones: 2 particiones las dos; la etapa repetida se omite
+    assert [fraction for fraction, _ in stages] == [0.01, 1.0]
+    assert "10% de las particiones" in stages[0][1].layout.title.text
+    assert stages[0][1].data[0].error_y.array is not None
@@ -0,0 +1,420 @@
+# utils/aggregations.py
+import functools
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import dask
+import numpy as np
+import pandas as pd
+
+from utils.cache import hash_key, known_fingerprint
+from utils.correlation import compute_correlation
+from utils.lazy import AnyFrame, is_lazy
+
+# Agregaciones que usan los gráficos. Funcionan tanto con pandas como con
+# DataFrames perezosos de Dask: en ese caso se ejecutan como grafo sobre las
+# particiones y solo el resultado reducido se materializa.
+
+# Memo de agregaciones compartido por los gráficos que se construyen a la vez
+# (subplots de create_coupled_plot): clave -> Future con el resultado.
+_aggregation_memo: ContextVar = ContextVar("aggregation_memo", default=None)
+
+
+@contextmanager
+def shared_aggregations():
+    """
+    Dentro de este contexto, las agregaciones idénticas (misma función, mismo
+    dataset y mismos argumentos) se calculan una sola vez aunque las pidan
+    varios hilos a la vez: el primero calcula y el resto espera su resultado.
+    Los hilos deben ejecutarse con contextvars.copy_context().run para ver el memo.
+    Los resultados son compartidos: no deben modificarse.
+    """
+    token = _aggregation_memo.set(({}, threading.Lock()))
+    try:
+        yield
+    finally:
+        _aggregation_memo.reset(token)
+
+
+def _shared(func):
+    """Hace que la agregación use el memo de shared_aggregations() si está activo."""
+    @functools.wraps(func)
+    def wrapper(df, *args, **kwargs):
+        state = _aggregation_memo.get()
+        if state is None:
+            return func(df, *args, **kwargs)
+        memo, lock = state
+        key = hash_key(func.__name__, known_fingerprint(df) or id(df), args, sorted(kwargs.items()))
+        with lock:
+            future = memo.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = memo[key] = Future()
+        if is_owner:
+            try:
+                future.set_result(func(df, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+    return wrapper
+
+
+@_shared
+def column_codes(df: pd.DataFrame, col: str):
+    """
+    Códigos enteros de una columna (pd.factorize; -1 para nulos). Es la pasada
+    cara sobre columnas de texto, así que se comparte entre agregaciones.
+
+    Returns:
+        tuple: (códigos, valores únicos)
+    """
+    return pd.factorize(df[col])
+
+
+# Tablas por categorías sobre códigos enteros: cada clave se factoriza una vez
+# (column_codes), las celdas se numeran como código_x * n_y + código_y y se
+# cuentan o suman con np.bincount. Las claves con muchas categorías se
+# recortan a sus top_k de mayor total y el resto se junta en una categoría
+# "Otros"; si aun así la tabla tiene más de CROSSTAB_SPARSE_CELLS celdas, solo
+# se materializan las ocupadas (np.unique) y el crosstab se devuelve disperso.
+CROSSTAB_TOP_K = 30
+CROSSTAB_SPARSE_CELLS = 1_000_000
+OTHERS_LABEL = "Otros"
+
+
+def _collapse_codes(codes: np.ndarray, uniques, present: np.ndarray, totals: np.ndarray, top_k: int = None):
+    """
+    Recodifica una clave: solo categorías presentes, ordenadas por etiqueta y,
+    si hay más de top_k, las top_k de mayor total más "Otros (n)" al final.
+
+    Returns:
+        tuple: (códigos nuevos, -1 para filas sin categoría; etiquetas)
+    """
+    labels = pd.Index(uniques)
+    keep = np.flatnonzero(present)
+    n_tail = 0
+    if top_k and len(keep) > top_k:
+        keep = np.sort(keep[np.argsort(-totals[keep], kind='stable')[:top_k]])
+        n_tail = int(np.count_nonzero(present)) - top_k
+    try:
+        keep = keep[labels[keep].argsort()]
+    except TypeError:
+        pass  # Etiquetas de tipos mezclados: se quedan en orden de aparición
+    # La última posición recibe los códigos -1 (nulos)
+    remap = np.full(len(labels) + 1, len(keep), dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+    remap[-1] = -1
+    labels = labels[keep]
+    if n_tail:
+        labels = labels.astype(object).append(pd.Index([f"{OTHERS_LABEL} ({n_tail})"]))
+    return remap[codes], labels
+
+
+def _coded_groups(df: pd.DataFrame, keys, y: str = None, top_k=None, weight: str = None):
+    """
+    Motor común de conteos (y sumas de `y`) por combinación de categorías de
+    `keys`, ignorando filas con claves nulas o `y` nulo.
+
+    Args:
+        df: DataFrame de pandas
+        keys: Columnas de agrupación
+        y: Columna numérica a sumar (None = solo conteos)
+        top_k: Máximo de categorías por clave (un entero o uno por clave; None = todas)
+        weight: Columna con cuántas filas representa cada fila (resultados ya reducidos, p.ej. de Dask)
+
+    Returns:
+        tuple: (códigos de cada clave por celda ocupada, filas por celda, sumas por celda o None, etiquetas de cada clave)
+    """
+    top_ks = list(top_k) if isinstance(top_k, (list, tuple)) else [top_k] * len(keys)
+    factorized = [column_codes(df, key) for key in keys]
+    valid = np.logical_and.reduce([codes >= 0 for codes, _ in factorized])
+    values = None
+    if y is not None:
+        values = df[y].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid &= ~np.isnan(values)
+        values = values[valid]
+    rows = df[weight].to_numpy(dtype=np.float64)[valid] if weight else None
+
+    all_codes, all_labels = [], []
+    for (codes, uniques), key_top_k in zip(factorized, top_ks):
+        codes = codes[valid]
+        counts = np.bincount(codes, weights=rows, minlength=len(uniques))
+        totals = np.abs(np.bincount(codes, weights=values, minlength=len(uniques))) if y is not None else counts
+        codes, labels = _collapse_codes(codes, uniques, counts > 0, totals, key_top_k)
+        all_codes.append(codes)
+        all_labels.append(labels)
+
+    shape = tuple(len(labels) for labels in all_labels)
+    cells = np.ravel_multi_index(all_codes, shape) if all_codes else np.zeros(0, dtype=np.int64)
+    if np.prod(shape, dtype=np.float64) <= CROSSTAB_SPARSE_CELLS:
+        counts = np.bincount(cells, weights=rows, minlength=int(np.prod(shape)))
+        occupied = np.flatnonzero(np.bincount(cells, minlength=int(np.prod(shape))))
+        counts = counts[occupied]
+        sums = np.bincount(cells, weights=values, minlength=int(np.prod(shape)))[occupied] if y is not None else None
+    else:
+        occupied, inverse = np.unique(cells, return_inverse=True)
+        counts = np.bincount(inverse, weights=rows, minlength=len(occupied))
+        sums = np.bincount(inverse, weights=values, minlength=len(occupied)) if y is not None else None
+    cell_codes = np.unravel_index(occupied, shape)
+    return cell_codes, counts.astype(np.int64), sums, all_labels
+
+
+@_shared
+def value_counts_frame(df: AnyFrame, x: str, top_k: int = None) -> pd.DataFrame:
+    """
+    Frecuencia de cada valor de `x`.
+
+    Args:
+        top_k: Máximo de categorías; el resto se junta en "Otros" (None = todas)
+
+    Returns:
+        pd.DataFrame: Columnas [x, 'count'] ordenadas por frecuencia descendente
+    """
+    source, weight = df, None
+    if is_lazy(df):
+        # Dask reduce a una fila por valor; el recorte se hace sobre ese resultado
+        source = df[x].value_counts().compute().rename('_rows').rename_axis(x).reset_index()
+        weight = '_rows'
+    (codes,), counts, _, (labels,) = _coded_groups(source, [x], top_k=top_k, weight=weight)
+    counts_df = pd.DataFrame({x: labels[codes], 'count': counts})
+    return counts_df.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+
+@_shared
+def grouped_sum(df: AnyFrame, x: str, y: str, top_k: int = None) -> pd.DataFrame:
+    """
+    Suma de `y` por cada valor de `x` (ignorando nulos en ambas columnas).
+
+    Args:
+        top_k: Máximo de categorías (las de mayor suma absoluta); el resto se junta en "Otros"
+
+    Returns:
+        pd.DataFrame: Columnas [x, y] ordenadas por `x`
+    """
+    source, weight = df, None
+    if is_lazy(df):
+        source = df[[x, y]].dropna(subset=[x, y]).groupby(x, observed=True)[y].agg(['sum', 'count']).compute()
+        source = source.rename(columns={'sum': y, 'count': '_rows'}).reset_index()
+        weight = '_rows'
+    (codes,), _, sums, (labels,) = _coded_groups(source, [x], y=y, top_k=top_k, weight=weight)
+    y_dtype = df[y].dtype
+    if pd.api.types.is_integer_dtype(y_dtype) or pd.api.types.is_bool_dtype(y_dtype):
+        sums = sums.astype(np.int64)
+    return pd.DataFrame({x: labels[codes], y: sums})
+
+
+@_shared
+def grouped_mean(df: AnyFrame, keys, y) -> pd.DataFrame:
+    """
+    Media de `y` (una columna o lista) por cada combinación de `keys`
+    (ignorando filas con claves nulas).
+
+    Returns:
+        pd.DataFrame: Columnas keys + y
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    values = [y] if isinstance(y, str) else list(y)
+    chart_data = df[keys + values].dropna(subset=keys).groupby(keys, observed=True)[values].mean()
+    if is_lazy(df):
+        chart_data = chart_data.compute()
+    return chart_data.reset_index()
+
+
+@_shared
+def crosstab(df: AnyFrame, x: str, y: str, top_k=None) -> pd.DataFrame:
+    """
+    Tabla de contingencia de frecuencias de `x` (filas) contra `y` (columnas).
+
+    Args:
+        df: DataFrame (pandas o Dask)
+        x: Columna de las filas
+        y: Columna de las columnas
+        top_k: Máximo de categorías por eje, un entero o (filas, columnas); el
+            resto se junta en "Otros" (None = todas)
+
+    Returns:
+        pd.DataFrame: Frecuencias enteras; con más de CROSSTAB_SPARSE_CELLS
+            celdas, columnas dispersas (pd.SparseDtype, usar .sparse.to_dense())
+    """
+    source, weight = df, None
+    if is_lazy(df):
+        source = df.groupby([x, y], observed=True).size().compute().rename('_rows').reset_index()
+        weight = '_rows'
+    (rows, cols), counts, _, (row_labels, col_labels) = _coded_groups(source, [x, y], top_k=top_k, weight=weight)
+    shape = (len(row_labels), len(col_labels))
+    index, columns = row_labels.rename(x), col_labels.rename(y)
+    if shape[0] * shape[1] <= CROSSTAB_SPARSE_CELLS:
+        table = np.zeros(shape, dtype=np.int64)
+        table[rows, cols] = counts
+        return pd.DataFrame(table, index=index, columns=columns)
+    from scipy import sparse
+    matrix = sparse.csc_matrix((counts, (rows, cols)), shape=shape)
+    return pd.DataFrame.sparse.from_spmatrix(matrix, index=index, columns=columns)
+
+
+@_shared
+def correlation_matrix(df: AnyFrame, method: str = "pearson", columns=None) -> pd.DataFrame:
+    """
+    Matriz de correlación (Pearson o Spearman) de las columnas numéricas, con
+    nulos eliminados por pares. Ver utils.correlation.compute_correlation.
+    """
+    return compute_correlation(df, columns=columns, method=method)
+
+
+def _sturges_bins(n_values: int) -> int:
+    return int(np.ceil(np.log2(max(n_values, 1)))) + 1
+
+
+def _histogram_values(series: pd.Series) -> np.ndarray:
+    """Valores de la columna como float64 (fechas como int64 en ns); nulos como NaN."""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _partition_bin_counts(part: pd.DataFrame, x: str, color: str, edges: np.ndarray, color_codes=None) -> pd.DataFrame:
+    """Conteos por (grupo de color, bin) de un DataFrame o partición (color_codes: factorize ya hecho)."""
+    values = _histogram_values(part[x])
+    n_bins = len(edges) - 1
+    valid = np.isfinite(values) & (values >= edges[0]) & (values <= edges[-1])
+    # Bins uniformes: índice aritmético (más rápido que searchsorted) corregido
+    # en los bordes por redondeo, como hace np.histogram
+    values = values[valid]
+    bins = np.clip(((values - edges[0]) * (n_bins / (edges[-1] - edges[0]))).astype(np.int64), 0, n_bins - 1)
+    bins -= values < edges[bins]
+    bins += (values >= edges[bins + 1]) & (bins < n_bins - 1)
+    if not color:
+        return pd.DataFrame({'_bin': np.arange(n_bins), 'count': np.bincount(bins, minlength=n_bins)})
+    codes, uniques = color_codes if color_codes is not None else pd.factorize(part[color])
+    codes = codes[valid]
+    keep = codes >= 0  # Filas sin color no se dibujan (como en px.histogram)
+    counts = np.bincount(codes[keep] * n_bins + bins[keep], minlength=len(uniques) * n_bins)
+    return pd.DataFrame({
+        color: np.repeat(np.asarray(uniques, dtype=object), n_bins),
+        '_bin': np.tile(np.arange(n_bins), len(uniques)),
+        'count': counts,
+    })
+
+
+def _normalize_counts(counts: pd.Series, histnorm: str, bin_width: float) -> pd.Series:
+    total = counts.sum()
+    if histnorm == 'percent':
+        return 100 * counts / total
+    if histnorm == 'probability':
+        return counts / total
+    if histnorm == 'density':
+        return counts / bin_width
+    if histnorm == 'probability density':
+        return counts / (total * bin_width)
+    return counts
+
+
+@_shared
+def histogram_frame(
+    df: AnyFrame,
+    x: str,
+    color: str = None,
+    nbins: int = None,
+    histnorm: str = None
+):
+    """
+    Calcula el histograma en el servidor: solo viajan al navegador los conteos
+    por bin (y por grupo de color), no los valores crudos.
+
+    Args:
+        df: DataFrame (pandas o Dask)
+        x: Columna a binear (numérica o fecha; otras se cuentan por valor)
+        color: Columna de agrupación (opcional)
+        nbins: Número de bins (por defecto, regla de Sturges)
+        histnorm: None, 'percent', 'probability', 'density' o 'probability density'
+            (normalizado por grupo de color, como px.histogram)
+
+    Returns:
+        tuple: (DataFrame con [x, color?, valor], ancho del bin o None si x no es numérica)
+    """
+    value_col = histnorm or 'count'
+    series = df[x]
+    is_datetime = pd.api.types.is_datetime64_any_dtype(series.dtype)
+    if not (pd.api.types.is_numeric_dtype(series.dtype) or is_datetime) or pd.api.types.is_bool_dtype(series.dtype):
+        # Columna categórica: frecuencia de cada valor
+        color = color if color and color != x else None
+        keys = [x] + ([color] if color else [])
+        counts = df[keys].groupby(keys, observed=True).size()
+        if is_lazy(df):
+            counts = counts.compute()
+        hist_df = counts.rename('count').reset_index()
+        if color:
+            hist_df[value_col] = hist_df.groupby(color, observed=True)['count'].transform(
+                lambda c: _normalize_counts(c, histnorm, 1.0))
+        else:
+            hist_df[value_col] = _normalize_counts(hist_df['count'], histnorm, 1.0)
+        return hist_df[keys + [value_col]], None
+
+    # Rango de los datos (una pasada; en Dask, un único compute)
+    if is_lazy(df):
+        lo, hi, n_values = dask.compute(df[x].min(), df[x].max(), df[x].count())
+    else:
+        lo, hi, n_values = series.min(), series.max(), int(series.count())
+    if n_values == 0:
+        return pd.DataFrame(columns=[x, value_col]), None
+    if is_datetime:
+        lo, hi = pd.Timestamp(lo).value, pd.Timestamp(hi).value
+    lo, hi = float(lo), float(hi)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    n_bins = int(nbins) if nbins else _sturges_bins(n_values)
+    edges = np.linspace(lo, hi, n_bins + 1)
+    bin_width = edges[1] - edges[0]
+
+    color = color if color and color != x else None
+    if is_lazy(df):
+        columns = [x] + ([color] if color else [])
+        meta = _partition_bin_counts(df._meta[columns], x, color, edges).iloc[:0]
+        parts = df[columns].map_partitions(_partition_bin_counts, x, color, edges, meta=meta)
+        keys = ([color] if color else []) + ['_bin']
+        counts_df = parts.groupby(keys).sum().compute().reset_index()
+    else:
+        counts_df = _partition_bin_counts(df, x, color, edges, column_codes(df, color) if color else None)
+
+    centers = (edges[:-1] + edges[1:]) / 2
+    counts_df[x] = centers[counts_df['_bin'].to_numpy()]
+    if is_datetime:
+        counts_df[x] = pd.to_datetime(counts_df[x].round().astype(np.int64))
+    if color:
+        counts_df[value_col] = counts_df.groupby(color)['count'].transform(
+            lambda c: _normalize_counts(c, histnorm, bin_width))
+    else:
+        counts_df[value_col] = _normalize_counts(counts_df['count'], histnorm, bin_width)
+    columns = [x] + ([color] if color else []) + [value_col]
+    return counts_df.sort_values('_bin', kind='stable')[columns].reset_index(drop=True), bin_width
+
+
+@_shared
+def bar_sum_frame(df: AnyFrame, x: str, y: str, color: str = None, split_sign: bool = True) -> pd.DataFrame:
+    """
+    Agrega en el servidor un gráfico de barras con `y`: suma de `y` por cada
+    categoría de `x` (y de `color`). Con split_sign, positivos y negativos se
+    suman por separado para reproducir el apilado del modo 'relative'.
+
+    Returns:
+        pd.DataFrame: Columnas [x, color?, y]
+    """
+    keys = [x] + ([color] if color and color != x else [])
+    subset = df[keys + [y]].dropna(subset=[y])
+    if split_sign:
+        subset = subset.assign(_pos=subset[y].clip(lower=0), _neg=subset[y].clip(upper=0))
+        sums = subset.groupby(keys, observed=True)[['_pos', '_neg']].sum()
+    else:
+        sums = subset.groupby(keys, observed=True)[[y]].sum()
+    if is_lazy(df):
+        sums = sums.compute()
+    sums = sums.reset_index()
+    if not split_sign:
+        return sums
+    # Una fila por signo (las barras de valor 0 se descartan)
+    stacked = sums.melt(id_vars=keys, value_vars=['_pos', '_neg'], value_name=y).drop(columns='variable')
+    return stacked[stacked[y] != 0].reset_index(drop=True)
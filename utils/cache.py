@@ -0,0 +1,291 @@
+# utils/cache.py
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Presupuestos por defecto (configurables por variables de entorno)
+DEFAULT_MEMORY_CACHE_BYTES = int(os.environ.get("DASHBOARD_MEMORY_CACHE_BYTES", 2 * 1024**3))
+DEFAULT_DISK_CACHE_BYTES = int(os.environ.get("DASHBOARD_DISK_CACHE_BYTES", 20 * 1024**3))
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DASHBOARD_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "dashboard_multimedia")
+)
+
+_HASH_BLOCK_SIZE = 8 * 1024**2
+
+
+def hash_bytes_stream(file_obj) -> str:
+    """
+    Calcula un hash de contenido (BLAKE2b) leyendo el archivo por bloques.
+
+    Args:
+        file_obj: Objeto tipo archivo (UploadedFile, BytesIO, archivo abierto)
+
+    Returns:
+        str: Hash hexadecimal del contenido
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    position = file_obj.tell() if hasattr(file_obj, "tell") else None
+    if hasattr(file_obj, "seek"):
+        file_obj.seek(0)
+    while True:
+        block = file_obj.read(_HASH_BLOCK_SIZE)
+        if not block:
+            break
+        hasher.update(block)
+    if position is not None:
+        file_obj.seek(position)
+    return hasher.hexdigest()
+
+
+def hash_key(*parts: Any) -> str:
+    """Combina varias partes (convertidas con repr) en una clave hash estable."""
+    hasher = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"\x1f")
+    return hasher.hexdigest()
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Estima el tamaño en bytes de un objeto almacenado en caché."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) \
+            else int(value.memory_usage(deep=True))
+    if isinstance(value, (pa.Table, pa.RecordBatch)):
+        return int(value.nbytes)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    return 1024
+
+
+class LRUByteCache:
+    """
+    Caché en memoria LRU acotada por tamaño en bytes. Segura entre hilos.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+                 sizeof: Callable[[Any], int] = estimate_nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None) -> None:
+        size = self._sizeof(value) if nbytes is None else int(nbytes)
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return  # No cabe: no se almacena
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._current_bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+
+class DiskDatasetCache:
+    """
+    Caché en disco de DataFrames en formato Parquet, direccionada por contenido.
+    La expulsión es LRU (según la fecha de último acceso) acotada por bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_DISK_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            # pandas conserva df.attrs en los metadatos del Parquet
+            df = pd.read_parquet(path)
+            os.utime(path, None)  # Marcar como usado recientemente
+            return df
+        except Exception:
+            # Archivo corrupto o incompleto: se descarta
+            self._remove(path)
+            return None
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """Escribe el DataFrame en disco. Devuelve False si no es serializable."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(key))  # Escritura atómica
+        except Exception:
+            return False
+        self._evict()
+        return True
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            try:
+                entries = [
+                    os.path.join(self.cache_dir, name)
+                    for name in os.listdir(self.cache_dir) if name.endswith(".parquet")
+                ]
+                stats = sorted(((os.stat(p), p) for p in entries), key=lambda item: item[0].st_mtime)
+            except OSError:
+                return
+            total = sum(st.st_size for st, _ in stats)
+            for st, path in stats:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= st.st_size
+
+
+# --- Huellas (fingerprints) de DataFrames ---
+# Se registran por identidad de objeto para no volver a recorrer los datos.
+_fingerprints: dict = {}
+_fingerprints_lock = threading.Lock()
+
+
+def register_fingerprint(df: pd.DataFrame, fingerprint: str) -> pd.DataFrame:
+    """Asocia una huella ya conocida (p.ej. hash del archivo) a un DataFrame."""
+    key = id(df)
+    with _fingerprints_lock:
+        _fingerprints[key] = fingerprint
+    try:
+        weakref.finalize(df, _forget_fingerprint, key)
+    except TypeError:
+        pass
+    return df
+
+
+def _forget_fingerprint(key: int) -> None:
+    with _fingerprints_lock:
+        _fingerprints.pop(key, None)
+
+
+def known_fingerprint(df: Any) -> Optional[str]:
+    """Huella registrada del DataFrame, sin calcularla si no se conoce."""
+    with _fingerprints_lock:
+        return _fingerprints.get(id(df))
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Devuelve la huella de contenido del DataFrame. Si no fue registrada al
+    cargarlo/derivarlo, se calcula una vez con hash_pandas_object.
+    """
+    with _fingerprints_lock:
+        fingerprint = _fingerprints.get(id(df))
+    if fingerprint is not None:
+        return fingerprint
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    fingerprint = hash_key(tuple(df.columns), tuple(map(str, df.dtypes)),
+                           hashlib.blake2b(row_hashes.tobytes(), digest_size=20).hexdigest())
+    register_fingerprint(df, fingerprint)
+    return fingerprint
+
+
+# --- Linaje de selecciones ---
+# Un DataFrame derivado que solo selecciona filas (y/o columnas) de otro, sin
+# modificar valores, se registra con las posiciones de sus filas en la tabla
+# de origen. Las selecciones encadenadas (muestreo -> filtro) se componen al
+# registrarlas, así que el linaje siempre apunta a la huella de la tabla base.
+_selections: dict = {}
+
+
+def register_selection(
+    df: pd.DataFrame,
+    parent: pd.DataFrame,
+    positions: Optional[np.ndarray] = None,
+    columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Registra df como selección de parent: df == parent.take(positions)[columns]
+    (positions None = todas las filas, columns None = todas las columnas). Si
+    no se conoce la tabla base de parent (ni linaje ni huella) no se registra.
+    """
+    parent_selection = known_selection(parent)
+    if parent_selection is not None:
+        base, parent_positions, parent_columns = parent_selection
+        if parent_positions is not None:
+            positions = parent_positions if positions is None else parent_positions[positions]
+        if columns is None:
+            columns = parent_columns
+    else:
+        base = known_fingerprint(parent)
+        if base is None:
+            return df
+    if positions is not None:
+        positions = np.asarray(positions)
+        positions = positions.astype(np.int32 if len(positions) == 0 or positions.max() < 2**31 else np.int64,
+                                     copy=False)
+    key = id(df)
+    with _fingerprints_lock:
+        _selections[key] = (base, positions, tuple(columns) if columns is not None else None)
+    try:
+        weakref.finalize(df, _forget_selection, key)
+    except TypeError:
+        pass
+    return df
+
+
+def _forget_selection(key: int) -> None:
+    with _fingerprints_lock:
+        _selections.pop(key, None)
+
+
+def known_selection(df: Any) -> Optional[Tuple[str, Optional[np.ndarray], Optional[Tuple[str, ...]]]]:
+    """Linaje registrado de df: (huella de la tabla base, posiciones, columnas), o None."""
+    with _fingerprints_lock:
+        return _selections.get(id(df))
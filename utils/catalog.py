@@ -0,0 +1,200 @@
+# utils/catalog.py
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUByteCache, dataset_fingerprint
+from utils.summary import numeric_histograms, summarize_numeric
+
+# Catálogo de estadísticas por columna, calculado una vez por versión del
+# dataset (huella) y compartido por filtros, resúmenes y detección de tipos.
+CATALOG_TOP_K = 20
+CATALOG_HISTOGRAM_BINS = 20
+# Hasta este número de valores distintos el conteo es exacto y se guardan todos los valores
+CATALOG_EXACT_DISTINCT_LIMIT = 10_000
+# Filas usadas para estimar el top-k en columnas de alta cardinalidad
+CATALOG_TOP_K_SAMPLE_ROWS = 200_000
+HLL_PRECISION = 12
+
+_catalog_cache = LRUByteCache(max_bytes=256, sizeof=lambda _: 1)  # Hasta 256 catálogos
+
+
+class HyperLogLog:
+    """
+    Boceto HyperLogLog para estimar el número de valores distintos con memoria
+    constante (2^precision registros). Es combinable: merge() une dos bocetos.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """Añade valores ya hasheados a 64 bits (p.ej. pd.util.hash_array)."""
+        if len(hashes) == 0:
+            return self
+        p = self.precision
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        # Bit centinela para acotar el número de ceros iniciales a 64 - p
+        remainder = (hashes << np.uint64(p)) | np.uint64(1 << (p - 1))
+        bit_length = np.frexp(remainder.astype(np.float64))[1]
+        rho = (65 - bit_length).astype(np.uint8)
+        maxima = pd.Series(rho).groupby(index).max()
+        current = self.registers[maxima.index.to_numpy()]
+        self.registers[maxima.index.to_numpy()] = np.maximum(current, maxima.to_numpy())
+        return self
+
+    def update(self, values: pd.Series) -> "HyperLogLog":
+        values = values.dropna()
+        return self.update_hashes(pd.util.hash_array(values.to_numpy(), categorize=False))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)  # Corrección para cardinalidades pequeñas
+        return float(raw)
+
+
+def column_kind(series: pd.Series) -> str:
+    """Clasifica la columna como en los filtros: 'numeric', 'categorical', 'datetime' u 'other'."""
+    dtype = series.dtype
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_object_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) or \
+            pd.api.types.is_string_dtype(dtype):
+        return 'categorical'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'other'
+
+
+def _histogram(values: np.ndarray, bins: int) -> Optional[Dict[str, List[float]]]:
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+
+def _numeric_entries(df: pd.DataFrame, columns: List[str], bins: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Estadísticas de todas las columnas numéricas en una pasada por bloques 2D
+    (utils.summary) y sus histogramas en una segunda pasada, también conjunta.
+    """
+    stats = summarize_numeric(df, columns).result()
+    binned = [col for col in columns if stats[col]['count'] > 0]
+    if not binned:
+        return stats
+    lo = np.array([stats[col]['min'] for col in binned], dtype=np.float64)
+    hi = np.array([stats[col]['max'] for col in binned], dtype=np.float64)
+    constant = lo == hi  # Mismo rango que np.histogram para columnas constantes
+    lo, hi = np.where(constant, lo - 0.5, lo), np.where(constant, hi + 0.5, hi)
+    counts = numeric_histograms(df, binned, lo, hi, bins)
+    for j, col in enumerate(binned):
+        stats[col]['histogram'] = {'counts': counts[j].tolist(),
+                                   'edges': np.linspace(lo[j], hi[j], bins + 1).tolist()}
+        if pd.api.types.is_integer_dtype(df[col].dtype):
+            stats[col]['min'], stats[col]['max'] = int(stats[col]['min']), int(stats[col]['max'])
+    return stats
+
+
+def _column_entry(series: pd.Series, top_k: int, bins: int, exact_limit: int,
+                  numeric_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    kind = column_kind(series)
+    rows = len(series)
+    null_mask = series.isna().to_numpy()
+    null_count = int(null_mask.sum())
+    entry = {
+        'type': str(series.dtype),
+        'kind': kind,
+        'is_numeric': kind == 'numeric',
+        'is_categorical': isinstance(series.dtype, pd.CategoricalDtype),
+        'is_datetime': kind == 'datetime',
+        'rows': rows,
+        'null_count': null_count,
+        'count': rows - null_count,
+    }
+
+    # Valores distintos: boceto HLL; si son pocos, conteo exacto con value_counts
+    non_null = series[~null_mask] if null_count else series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        approx_distinct = float(np.count_nonzero(np.bincount(non_null.cat.codes.to_numpy(),
+                                                             minlength=len(series.cat.categories))))
+    else:
+        approx_distinct = HyperLogLog().update(non_null).estimate()
+    if approx_distinct <= exact_limit:
+        counts = non_null.value_counts(sort=False)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            counts = counts[counts > 0]
+        entry['unique_count'] = int(len(counts))
+        entry['unique_exact'] = True
+        entry['top_k'] = list(counts.nlargest(top_k).items())
+        if kind == 'categorical':
+            # Orden de primera aparición, como series.unique()
+            entry['values'] = pd.unique(non_null).tolist()
+    else:
+        entry['unique_count'] = int(round(approx_distinct))
+        entry['unique_exact'] = False
+        sample = non_null if len(non_null) <= CATALOG_TOP_K_SAMPLE_ROWS else \
+            non_null.sample(CATALOG_TOP_K_SAMPLE_ROWS, random_state=42)
+        scale = len(non_null) / max(len(sample), 1)
+        # Solo valores repetidos en la muestra: los únicos no dan una estimación útil
+        entry['top_k'] = [(value, int(round(count * scale)))
+                          for value, count in sample.value_counts().nlargest(top_k).items() if count > 1]
+
+    if kind == 'numeric' and entry['count'] > 0:
+        entry.update({key: numeric_stats[key] for key in ('min', 'max', 'mean', 'std', 'percentiles', 'histogram')})
+    elif kind == 'datetime' and entry['count'] > 0:
+        entry.update({
+            'min': non_null.min(),
+            'max': non_null.max(),
+            'histogram': _histogram(non_null.astype('int64').to_numpy(dtype=np.float64), bins),
+        })
+    return entry
+
+
+def build_column_catalog(
+    df: pd.DataFrame,
+    top_k: int = CATALOG_TOP_K,
+    bins: int = CATALOG_HISTOGRAM_BINS,
+    exact_limit: int = CATALOG_EXACT_DISTINCT_LIMIT
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula el catálogo de estadísticas de todas las columnas.
+
+    Args:
+        df: DataFrame a analizar
+        top_k: Número de valores más frecuentes a guardar
+        bins: Número de bins del histograma (numéricas y fechas)
+        exact_limit: Máximo de distintos para el conteo exacto
+
+    Returns:
+        dict: Columna -> tipo, nulos, min/max, distintos (aprox. con HLL para
+        alta cardinalidad), top-k, histograma y, en numéricas, media/std/percentiles
+        (aproximados con un boceto combinable en datasets grandes)
+    """
+    numeric_cols = [col for col in df.columns if column_kind(df[col]) == 'numeric']
+    numeric_stats = _numeric_entries(df, numeric_cols, bins) if numeric_cols else {}
+    return {col: _column_entry(df[col], top_k, bins, exact_limit, numeric_stats.get(col)) for col in df.columns}
+
+
+def get_column_catalog(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Devuelve el catálogo del DataFrame, calculándolo solo la primera vez para
+    cada versión del dataset (identificada por su huella).
+    """
+    key = ("catalog", dataset_fingerprint(df))
+    catalog = _catalog_cache.get(key)
+    if catalog is None:
+        catalog = build_column_catalog(df)
+        _catalog_cache.put(key, catalog)
+    return catalog
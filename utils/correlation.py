@@ -0,0 +1,253 @@
+# utils/correlation.py
+from typing import List, Optional, Sequence
+
+import dask
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUByteCache, dataset_fingerprint, hash_key, known_fingerprint
+from utils.lazy import AnyFrame, is_lazy
+from utils.summary import QuantileSketch, block_rows, merge_summaries, numeric_block, summarize_numeric
+
+# Matrices de correlación por co-momentos acumulados bloque a bloque. Los
+# acumuladores se combinan (merge), así que se calculan por bloques de filas
+# o por particiones de Dask. Las columnas se dividen en teselas fijas de
+# CORRELATION_TILE_COLUMNS: cada par de teselas se calcula y cachea por
+# separado, de modo que ver una submatriz solo calcula las teselas que faltan.
+CORRELATION_METHODS = ("pearson", "spearman")
+CORRELATION_TILE_COLUMNS = 64
+CORRELATION_CACHE_BYTES = 256 * 1024**2
+
+_tile_cache = LRUByteCache(max_bytes=CORRELATION_CACHE_BYTES)
+
+
+class CoMoments:
+    """
+    Co-momentos de dos grupos de columnas (X: filas, Y: columnas de la matriz)
+    con eliminación de nulos por pares: para cada par (i, j) solo cuentan las
+    filas donde ambas columnas tienen valor. Se acumulan sumas desplazadas
+    (x - shift) para conservar precisión; merge() lleva el otro acumulador al
+    desplazamiento propio antes de sumar.
+    """
+
+    def __init__(self, shift_x: np.ndarray, shift_y: np.ndarray):
+        self.shift_x = np.asarray(shift_x, dtype=np.float64)
+        self.shift_y = np.asarray(shift_y, dtype=np.float64)
+        shape = (len(self.shift_x), len(self.shift_y))
+        self.n = np.zeros(shape)
+        self.sx = np.zeros(shape)
+        self.sy = np.zeros(shape)
+        self.sxx = np.zeros(shape)
+        self.syy = np.zeros(shape)
+        self.sxy = np.zeros(shape)
+
+    def update(self, block_x: np.ndarray, block_y: np.ndarray) -> "CoMoments":
+        """Añade las mismas filas de ambos grupos (bloques float64 con NaN en los nulos)."""
+        mask_x, mask_y = ~np.isnan(block_x), ~np.isnan(block_y)
+        x = np.where(mask_x, block_x - self.shift_x, 0.0)
+        y = np.where(mask_y, block_y - self.shift_y, 0.0)
+        mx, my = mask_x.astype(np.float64), mask_y.astype(np.float64)
+        # Todas las sumas por pares son productos matriciales
+        self.n += mx.T @ my
+        self.sx += x.T @ my
+        self.sy += mx.T @ y
+        self.sxx += (x * x).T @ my
+        self.syy += mx.T @ (y * y)
+        self.sxy += x.T @ y
+        return self
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        dx = (other.shift_x - self.shift_x)[:, None]
+        dy = (other.shift_y - self.shift_y)[None, :]
+        n = other.n
+        self.n += n
+        self.sxx += other.sxx + 2 * dx * other.sx + n * dx ** 2
+        self.syy += other.syy + 2 * dy * other.sy + n * dy ** 2
+        self.sxy += other.sxy + dy * other.sx + dx * other.sy + n * dx * dy
+        self.sx += other.sx + n * dx
+        self.sy += other.sy + n * dy
+        return self
+
+    def correlation(self, min_periods: int = 1) -> np.ndarray:
+        """Correlación de Pearson de cada par (NaN con menos de min_periods filas comunes)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n = np.where(self.n > 0, self.n, np.nan)
+            cov = self.sxy - self.sx * self.sy / n
+            var_x = self.sxx - self.sx ** 2 / n
+            var_y = self.syy - self.sy ** 2 / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[(self.n < max(min_periods, 2)) | ~(var_x > 0) | ~(var_y > 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+def _block_shift(block: np.ndarray) -> np.ndarray:
+    """Desplazamiento de cada columna: su media en el bloque (0 si no tiene valores)."""
+    with np.errstate(invalid='ignore'):
+        counts = np.count_nonzero(~np.isnan(block), axis=0)
+        return np.where(counts > 0, np.nansum(block, axis=0) / np.maximum(counts, 1), 0.0)
+
+
+def comoments(
+    df: pd.DataFrame,
+    columns_x: Sequence[str],
+    columns_y: Sequence[str],
+    chunk_rows: Optional[int] = None
+) -> CoMoments:
+    """Co-momentos de columns_x contra columns_y recorriendo df por bloques de filas."""
+    chunk_rows = chunk_rows or block_rows(len(columns_x) + len(columns_y))
+    moments = None
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        block_x = numeric_block(chunk, columns_x)
+        block_y = block_x if list(columns_y) == list(columns_x) else numeric_block(chunk, columns_y)
+        if moments is None:
+            moments = CoMoments(_block_shift(block_x), _block_shift(block_y))
+        moments.update(block_x, block_y)
+    return moments if moments is not None else CoMoments(np.zeros(len(columns_x)), np.zeros(len(columns_y)))
+
+
+def _rank_frame(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """Rangos medios por columna (los nulos siguen nulos), para Spearman."""
+    return pd.DataFrame({col: df[col].rank(method='average') for col in columns})
+
+
+def _null_mask_groups(df: pd.DataFrame, columns: Sequence[str]) -> List[int]:
+    """Grupo de cada columna según su máscara de nulos (mismo grupo = nulos en las mismas filas)."""
+    representatives, groups = [], []
+    for col in columns:
+        mask = df[col].isna().to_numpy()
+        group = next((g for g, rep in enumerate(representatives) if np.array_equal(rep, mask)), None)
+        if group is None:
+            group = len(representatives)
+            representatives.append(mask)
+        groups.append(group)
+    return groups
+
+
+def _pair_rank_comoments(df: pd.DataFrame, col_x: str, col_y: str) -> CoMoments:
+    """Co-momentos de Spearman de un par, ordenando solo sus filas comunes."""
+    pair = df[[col_x, col_y]].dropna()
+    return comoments(_rank_frame(pair, [col_x, col_y]), [col_x], [col_y])
+
+
+def _numeric_columns(df: AnyFrame) -> List[str]:
+    return [col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col].dtype) and not pd.api.types.is_bool_dtype(df[col].dtype)]
+
+
+def _eager_correlation(df: pd.DataFrame, columns: List[str], method: str, min_periods: int) -> np.ndarray:
+    """Matriz por teselas cacheadas por huella del dataset; solo se calculan las teselas que faltan."""
+    all_columns = _numeric_columns(df)
+    position = {col: i for i, col in enumerate(all_columns)}
+    tile_of = {col: position[col] // CORRELATION_TILE_COLUMNS for col in columns}
+    tiles = sorted(set(tile_of.values()))
+    tile_columns = {t: all_columns[t * CORRELATION_TILE_COLUMNS:(t + 1) * CORRELATION_TILE_COLUMNS] for t in tiles}
+    fingerprint = dataset_fingerprint(df)
+
+    def tile_key(ti, tj):
+        return hash_key("correlation", fingerprint, method, tile_columns[ti], tile_columns[tj])
+
+    pairs = [(ti, tj) for i, ti in enumerate(tiles) for tj in tiles[i:]]
+    missing = [(ti, tj) for ti, tj in pairs if tile_key(ti, tj) not in _tile_cache]
+    if missing:
+        needed = list(dict.fromkeys(col for pair in missing for t in pair for col in tile_columns[t]))
+        source = _rank_frame(df, needed) if method == "spearman" else df
+        for ti, tj in missing:
+            moments = comoments(source, tile_columns[ti], tile_columns[tj])
+            _tile_cache.put(tile_key(ti, tj), moments, nbytes=6 * moments.n.nbytes)
+
+    result = np.empty((len(columns), len(columns)))
+    for ti, tj in pairs:
+        corr = _tile_cache.get(tile_key(ti, tj)).correlation(min_periods)
+        rows = [i for i, col in enumerate(columns) if tile_of[col] == ti]
+        cols = [j for j, col in enumerate(columns) if tile_of[col] == tj]
+        local_rows = [position[columns[i]] - ti * CORRELATION_TILE_COLUMNS for i in rows]
+        local_cols = [position[columns[j]] - tj * CORRELATION_TILE_COLUMNS for j in cols]
+        sub = corr[np.ix_(local_rows, local_cols)]
+        result[np.ix_(rows, cols)] = sub
+        result[np.ix_(cols, rows)] = sub.T
+    if method == "spearman":
+        # Las teselas ordenan cada columna una vez con todas sus filas; si dos
+        # columnas tienen nulos en filas distintas, el par se ordena de nuevo
+        # solo con sus filas comunes (como pandas)
+        groups = _null_mask_groups(df, columns)
+        for i, j in ((i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))):
+            if groups[i] == groups[j]:
+                continue
+            key = hash_key("spearman_pair", fingerprint, columns[i], columns[j])
+            moments = _tile_cache.get(key)
+            if moments is None:
+                moments = _pair_rank_comoments(df, columns[i], columns[j])
+                _tile_cache.put(key, moments, nbytes=6 * moments.n.nbytes)
+            result[i, j] = result[j, i] = moments.correlation(min_periods)[0, 0]
+    return result
+
+
+def _partition_comoments(part: pd.DataFrame, columns: List[str], sketch: Optional[QuantileSketch] = None) -> CoMoments:
+    if sketch is not None:
+        # Spearman: rangos aproximados a partir del boceto de cuantiles global
+        ranks = pd.DataFrame(sketch.ranks(numeric_block(part, columns)), columns=columns)
+        return comoments(ranks, columns, columns)
+    return comoments(part, columns, columns)
+
+
+def _merge_comoments(partials: List[CoMoments]) -> CoMoments:
+    merged = partials[0]
+    for moments in partials[1:]:
+        merged.merge(moments)
+    return merged
+
+
+def _lazy_correlation(ddf, columns: List[str], method: str, min_periods: int) -> np.ndarray:
+    """Un acumulador por partición de Dask, combinados al final."""
+    parts = ddf[columns].to_delayed()
+    sketch = None
+    if method == "spearman":
+        # Pasada previa: boceto de cuantiles global, del que salen los rangos
+        (summary,) = dask.compute(dask.delayed(merge_summaries)(
+            [dask.delayed(summarize_numeric)(part, columns) for part in parts]))
+        sketch = summary.sketch
+    partials = [dask.delayed(_partition_comoments)(part, columns, sketch) for part in parts]
+    (moments,) = dask.compute(dask.delayed(_merge_comoments)(partials))
+    return moments.correlation(min_periods)
+
+
+def compute_correlation(
+    df: AnyFrame,
+    columns: Optional[List[str]] = None,
+    method: str = "pearson",
+    min_periods: int = 1
+) -> pd.DataFrame:
+    """
+    Matriz de correlación de columnas numéricas con nulos eliminados por pares.
+
+    Args:
+        df: DataFrame (pandas o Dask)
+        columns: Columnas numéricas a correlacionar (por defecto, todas)
+        method: 'pearson' o 'spearman' (Pearson sobre los rangos; los pares con
+            nulos en filas distintas se ordenan de nuevo con sus filas comunes. En
+            Dask los rangos salen del boceto de cuantiles global de cada columna,
+            por lo que son aproximados y no se recalculan por pares)
+        min_periods: Mínimo de filas comunes para dar un valor
+
+    Returns:
+        pd.DataFrame: Matriz simétrica columnas x columnas
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Método de correlación '{method}' no soportado")
+    numeric_cols = _numeric_columns(df)
+    columns = [col for col in (columns or numeric_cols) if col in numeric_cols]
+    columns = list(dict.fromkeys(columns))
+    if not columns:
+        return pd.DataFrame()
+    if is_lazy(df):
+        fingerprint = known_fingerprint(df)
+        key = hash_key("lazy_correlation", fingerprint, method, columns, min_periods) if fingerprint else None
+        corr = _tile_cache.get(key) if key else None
+        if corr is None:
+            corr = _lazy_correlation(df, columns, method, min_periods)
+            if key:
+                _tile_cache.put(key, corr)
+    else:
+        corr = _eager_correlation(df, columns, method, min_periods)
+    return pd.DataFrame(corr, index=columns, columns=columns)
@@ -1,52 +1,329 @@
+import datetime
+import functools
+import itertools
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
 import pandas as pd
 import streamlit as st
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 import pyarrow.parquet as pq
 import dask.dataframe as dd
-from typing import Union, List
+from typing import Optional, Union, List, Dict, Any
 import io
+from utils.cache import (LRUByteCache, DiskDatasetCache, hash_bytes_stream, hash_key,
+                         register_fingerprint)
+from utils.lazy import LAZY_THRESHOLD_BYTES, read_lazy, source_size, scan_parquet
+from utils.filters import build_arrow_filter, build_mongo_query
+from utils.catalog import build_column_catalog, get_column_catalog
+from utils.reservoir import reservoir_sample_source
+from utils.rest_client import REST_CONCURRENCY, fetch_pages
+import pyarrow.dataset as ds
 
-def load_data(file: Union[str, List[str], io.BytesIO]) -> pd.DataFrame:
+# Cachés de datasets ya parseados, compartidas entre reruns y sesiones.
+# Clave: hash del contenido del archivo (más las opciones de lectura).
+_dataset_memory_cache = LRUByteCache()
+_dataset_disk_cache = DiskDatasetCache()
+# Evita volver a hashear el mismo archivo subido en cada rerun de Streamlit
+_upload_hash_memo = LRUByteCache(max_bytes=10_000, sizeof=lambda _: 1)
+
+# Ingesta por bloques con tipos compactos
+CSV_CHUNK_SIZE = 250_000
+CATEGORY_MAX_UNIQUE_RATIO = 0.5  # Proporción máxima de valores únicos para usar 'category'
+DATETIME_MIN_PARSE_RATIO = 0.9   # Proporción mínima de valores parseables como fecha
+DATETIME_NAME_PATTERN = re.compile(r"fecha|date|time|hora|dia|periodo", re.IGNORECASE)
+# Excel: hojas en paralelo (un proceso por hoja) y caché Parquet por hoja
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+EXCEL_CHUNK_ROWS = 100_000
+EXCEL_MAX_WORKERS = int(os.environ.get("DASHBOARD_EXCEL_WORKERS", os.cpu_count() or 1))
+EXCEL_PARALLEL_MIN_BYTES = 20 * 1024**2
+_excel_sheets_memo = LRUByteCache(max_bytes=1_000, sizeof=lambda _: 1)
+# Lectura de varios archivos en paralelo
+INGEST_MAX_WORKERS = int(os.environ.get("DASHBOARD_INGEST_WORKERS", min(8, (os.cpu_count() or 1) + 2)))
+
+# MongoDB: un MongoClient por URI compartido por todo el proceso (cada cliente
+# mantiene su pool de conexiones) y el cursor se lee por lotes convertidos a Arrow.
+MONGO_URI_ENV = "MONGODB_URI"
+MONGO_BATCH_SIZE = int(os.environ.get("DASHBOARD_MONGO_BATCH_SIZE", 50_000))
+MONGO_MAX_POOL_SIZE = int(os.environ.get("DASHBOARD_MONGO_MAX_POOL_SIZE", 20))
+MONGO_CACHE_TTL_SECONDS = int(os.environ.get("DASHBOARD_MONGO_CACHE_TTL", 600))
+# APIs REST: durante el TTL la misma consulta no vuelve a pedir ninguna página
+API_CACHE_TTL_SECONDS = int(os.environ.get("DASHBOARD_API_CACHE_TTL", 600))
+# (consulta, intervalo TTL) -> clave del dataset con la huella de sus páginas
+_api_versions = LRUByteCache(max_bytes=10_000, sizeof=lambda _: 1)
+_mongo_clients: Dict[str, Any] = {}
+_mongo_clients_lock = threading.Lock()
+
+def _file_name(file) -> str:
+    return file if isinstance(file, str) else getattr(file, "name", "")
+
+def _source_hash(file) -> str:
+    """
+    Calcula la huella de contenido de la fuente de datos.
+    Para rutas locales se usa ruta + tamaño + fecha de modificación.
+    """
+    if isinstance(file, list):
+        return hash_key(*[_source_hash(f) for f in file])
+    if isinstance(file, str) and os.path.isdir(file):
+        return hash_key(*[
+            _source_hash(os.path.join(root, name))
+            for root, _, names in sorted(os.walk(file)) for name in sorted(names)
+        ])
+    if isinstance(file, str):
+        stat = os.stat(file)
+        return hash_key(os.path.abspath(file), stat.st_size, stat.st_mtime_ns)
+    # UploadedFile de Streamlit expone un file_id estable por subida
+    upload_id = getattr(file, "file_id", None)
+    memo_key = (upload_id, _file_name(file), getattr(file, "size", None)) if upload_id else None
+    if memo_key is not None:
+        cached_hash = _upload_hash_memo.get(memo_key)
+        if cached_hash is not None:
+            return cached_hash
+    content_hash = hash_bytes_stream(file)
+    if memo_key is not None:
+        _upload_hash_memo.put(memo_key, content_hash)
+    return content_hash
+
+def _read_single_file(file, optimize: bool = False) -> pd.DataFrame:
+    name = _file_name(file)
+    if name.endswith('.csv'):
+        return read_csv_optimized(file) if optimize else pd.read_csv(file)
+    elif name.endswith('.parquet') or (isinstance(file, str) and os.path.isdir(file)):
+        df = pd.read_parquet(file)
+        return optimize_dtypes(df) if optimize else df
+    else:
+        raise ValueError("Formato de archivo no soportado")
+
+def _is_hive_directory(path: str) -> bool:
+    """Directorio particionado al estilo hive (subcarpetas columna=valor)."""
+    return any("=" in name for _, dirs, _ in os.walk(path) for name in dirs)
+
+def _expand_sources(file) -> List:
+    """
+    Lista de archivos de una fuente con varias partes: listas de archivos y
+    directorios planos de CSV/Parquet. Un directorio hive o un archivo suelto
+    devuelven [] (se leen como una sola fuente).
+    """
+    if isinstance(file, list):
+        return [part for item in file for part in (_expand_sources(item) or [item])]
+    if isinstance(file, str) and os.path.isdir(file) and not _is_hive_directory(file):
+        return [os.path.join(root, name)
+                for root, _, names in sorted(os.walk(file)) for name in sorted(names)
+                if name.endswith(('.csv', '.parquet') + EXCEL_EXTENSIONS)]
+    return []
+
+def _read_arrow_table(file) -> pa.Table:
+    """Lee un archivo CSV o Parquet (ruta o archivo subido) como tabla Arrow."""
+    name = _file_name(file)
+    if isinstance(file, str) and os.path.isdir(file):
+        return ds.dataset(file, format="parquet", partitioning="hive").to_table()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    if name.endswith('.csv'):
+        return pa_csv.read_csv(file)
+    elif name.endswith('.parquet'):
+        return pq.read_table(file)
+    elif is_excel_source(file):
+        return read_excel_sheet(file, list_excel_sheets(file)[0])
+    raise ValueError(f"Formato de archivo no soportado: {name}")
+
+def read_tables_parallel(files: List, source_column: Optional[str] = None,
+                         max_workers: int = INGEST_MAX_WORKERS) -> pa.Table:
+    """
+    Lee varios archivos en un pool de hilos (pyarrow libera el GIL al parsear)
+    y los concatena a nivel Arrow: las columnas se alinean por nombre, las que
+    faltan en un archivo quedan nulas y los tipos se amplían (int -> float...).
+    La concatenación no copia los datos, solo encadena los bloques.
+
+    Args:
+        files: Rutas o archivos subidos (CSV/Parquet)
+        source_column: Si se indica, columna con el nombre del archivo de cada fila
+        max_workers: Hilos de lectura
+
+    Returns:
+        pa.Table: Filas de todos los archivos, en el orden de `files`
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as executor:
+        tables = list(executor.map(_read_arrow_table, files))
+    if source_column:
+        labeled = []
+        for file, table in zip(files, tables):
+            # Columna diccionario: un único valor por archivo, códigos int32 por fila
+            source = pa.DictionaryArray.from_arrays(pa.array(np.zeros(table.num_rows, dtype=np.int32)),
+                                                    pa.array([os.path.basename(_file_name(file))]))
+            labeled.append(table.append_column(source_column, source))
+        tables = labeled
+    return _concat_tables(tables)
+
+def _read_source(file, optimize: bool = False, source_column: Optional[str] = None) -> pd.DataFrame:
+    parts = _expand_sources(file)
+    if parts:
+        # Varias partes: lectura en paralelo y una sola conversión a pandas
+        return arrow_to_pandas(read_tables_parallel(parts, source_column), optimize)
+    # Si es un solo archivo
+    return _read_single_file(file, optimize)
+
+def get_cached_dataset(key: str, disk: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Busca un dataset parseado en la caché de memoria y, si no está, en disco.
+    Los DataFrames devueltos se comparten entre reruns: tratarlos como de solo lectura.
+    Con disk=False solo se consulta la memoria (claves que no valen entre procesos).
+    """
+    df = _dataset_memory_cache.get(key)
+    if df is None:
+        df = _dataset_disk_cache.get(key) if disk else None
+        if df is None:
+            return None
+        _dataset_memory_cache.put(key, df)
+    # Copia superficial: no duplica los datos, pero aísla cambios de columnas
+    return register_fingerprint(df.copy(deep=False), key)
+
+def store_cached_dataset(key: str, df: pd.DataFrame, disk: bool = True) -> pd.DataFrame:
+    """Guarda el dataset en ambas cachés (o solo en memoria con disk=False) y devuelve una vista registrada con su huella."""
+    _dataset_memory_cache.put(key, df)
+    if disk:
+        _dataset_disk_cache.put(key, df)
+    return register_fingerprint(df.copy(deep=False), key)
+
+def load_data(
+    file: Union[str, List[str], io.BytesIO],
+    use_cache: bool = True,
+    optimize: bool = False,
+    lazy: Optional[bool] = None,
+    sample_size: Optional[int] = None,
+    sample_strata: Optional[str] = None,
+    source_column: Optional[str] = None,
+    sheets: Optional[List[str]] = None
+) -> Union[pd.DataFrame, dd.DataFrame]:
     """
     Carga datos desde diferentes fuentes y formatos.
+    Los datasets parseados se guardan en una caché (memoria + Parquet en disco)
+    indexada por el hash del contenido, de modo que los reruns y las nuevas
+    subidas del mismo archivo no vuelven a parsearlo.
+    
+    Las listas de archivos y los directorios planos se leen en paralelo con
+    pyarrow y se unifican sus esquemas (ver read_tables_parallel).
     
     Args:
-        file: Puede ser un archivo individual, lista de archivos o BytesIO
+        file: Puede ser un archivo individual, lista de archivos, directorio o BytesIO
+        use_cache: Si es False, siempre se vuelve a leer la fuente
+        optimize: Lee los CSV por bloques y reduce los tipos de columnas
+            (ver read_csv_optimized). El ahorro queda en df.attrs['memory_report']
+        lazy: Si es True, devuelve un DataFrame perezoso de Dask. Por defecto se
+            activa solo para rutas locales mayores que LAZY_THRESHOLD_BYTES
+        sample_size: Si se indica, la fuente se lee por bloques y solo se conserva
+            una muestra aleatoria uniforme de ese número de filas (reservorio),
+            con memoria acotada aunque el archivo no quepa en memoria
+        sample_strata: Columna para mantener un reservorio de sample_size filas por estrato
+        source_column: Con varios archivos, columna con el archivo de origen de cada fila
+            (con varias hojas de Excel, columna con la hoja)
+        sheets: Hojas a cargar de un libro de Excel (por defecto la primera; ver
+            load_excel). A los libros no se les aplica lazy ni sample_size
         
     Returns:
-        pd.DataFrame: DataFrame con los datos cargados
+        pd.DataFrame: DataFrame con los datos cargados (dd.DataFrame en modo perezoso)
     """
     try:
-        if isinstance(file, list):
-            # Si es una lista de archivos, los concatenamos
-            dfs = []
-            for f in file:
-                if f.name.endswith('.csv'):
-                    df = pd.read_csv(f)
-                elif f.name.endswith('.parquet'):
-                    df = pd.read_parquet(f)
-                dfs.append(df)
-            return pd.concat(dfs, ignore_index=True)
-        
-        else:
-            # Si es un solo archivo
-            if file.name.endswith('.csv'):
-                return pd.read_csv(file)
-            elif file.name.endswith('.parquet'):
-                return pd.read_parquet(file)
-            else:
-                raise ValueError("Formato de archivo no soportado")
+        if not isinstance(file, list) and is_excel_source(file):
+            return load_excel(file, sheets=sheets, optimize=optimize, use_cache=use_cache, source_column=source_column)
+
+        if sample_size:
+            # Muestreo al cargar: nunca se materializa la fuente completa
+            key = hash_key("load_sample", _source_hash(file), int(sample_size), sample_strata, optimize)
+            cached_df = get_cached_dataset(key) if use_cache else None
+            if cached_df is not None:
+                return cached_df
+            sample_df = reservoir_sample_source(file, int(sample_size), strata=sample_strata or None)
+            if optimize:
+                reservoir_info = sample_df.attrs.get('reservoir')
+                sample_df = optimize_dtypes(sample_df)
+                sample_df.attrs['reservoir'] = reservoir_info
+            return store_cached_dataset(key, sample_df) if use_cache else register_fingerprint(sample_df, key)
+
+        is_path = isinstance(file, str) or (isinstance(file, list) and all(isinstance(f, str) for f in file))
+        if lazy is None:
+            lazy = is_path and source_size(file) > LAZY_THRESHOLD_BYTES
+        if lazy:
+            if not is_path:
+                raise ValueError("El modo perezoso requiere rutas locales")
+            return register_fingerprint(read_lazy(file), hash_key("load_lazy", _source_hash(file)))
+
+        if not use_cache:
+            return _read_source(file, optimize, source_column)
+
+        key = hash_key("load_data", _source_hash(file), optimize, source_column)
+        cached_df = get_cached_dataset(key)
+        if cached_df is not None:
+            return cached_df
+        return store_cached_dataset(key, _read_source(file, optimize, source_column))
                 
     except Exception as e:
         st.error(f"Error al cargar el archivo: {str(e)}")
         return None
 
-def detect_column_types(df: pd.DataFrame) -> dict:
+def load_parquet_pushdown(
+    source: Union[str, List[str], io.BytesIO],
+    filter_configs: Optional[dict] = None,
+    columns: Optional[List[str]] = None,
+    lazy: bool = False
+) -> Union[pd.DataFrame, dd.DataFrame]:
+    """
+    Lee un dataset Parquet empujando los filtros del dashboard y la proyección
+    de columnas a pyarrow.dataset: no se leen los row groups/particiones que no
+    pueden cumplir los filtros ni las columnas no pedidas.
+    
+    Args:
+        source: Archivo, directorio (particionado hive), lista de rutas o archivo subido
+        filter_configs: Configuraciones de filtro (formato de apply_filters_ui)
+        columns: Columnas necesarias (p.ej. visualizations.get_required_columns);
+            None lee todas
+        lazy: Si es True devuelve un DataFrame de Dask (una partición por row group)
+        
+    Returns:
+        pd.DataFrame: Filas que pueden cumplir los filtros (aplicar get_filtered_df
+        para el resultado exacto)
+    """
+    if lazy:
+        schema = ds.dataset(source, format="parquet", partitioning="hive").schema
+        return scan_parquet(source, build_arrow_filter(filter_configs, schema), columns)
+
+    key = hash_key("load_parquet_pushdown", _source_hash(source), repr(filter_configs), columns)
+    cached_df = get_cached_dataset(key)
+    if cached_df is not None:
+        return cached_df
+    if isinstance(source, (str, list)):
+        dataset = ds.dataset(source, format="parquet", partitioning="hive")
+        schema = dataset.schema
+    else:
+        # Archivo subido: se leen solo los metadatos para conocer el esquema
+        schema = pq.read_schema(source)
+        source.seek(0)
+    filter_expr = build_arrow_filter(filter_configs, schema)
+    if columns is not None:
+        columns = [col for col in dict.fromkeys(columns) if col in schema.names]
+    if isinstance(source, (str, list)):
+        table = dataset.to_table(columns=columns, filter=filter_expr)
+    else:
+        table = pq.read_table(source, columns=columns, filters=filter_expr)
+    return store_cached_dataset(key, table.to_pandas())
+
+def detect_column_types(df: pd.DataFrame, use_cache: bool = True) -> dict:
     """
     Detecta automáticamente los tipos de columnas y genera estadísticas básicas.
+    Las estadísticas salen del catálogo de columnas (utils.catalog), que se
+    calcula una sola vez por versión del dataset.
     
     Args:
         df: DataFrame a analizar
+        use_cache: Si es False, el catálogo se calcula sin guardarlo (p.ej. muestras)
         
     Returns:
         dict: Diccionario con información de las columnas
@@ -54,55 +331,631 @@ def detect_column_types(df: pd.DataFrame) -> dict:
     if df is None:
         return {}
         
+    catalog = get_column_catalog(df) if use_cache else build_column_catalog(df)
     column_info = {}
     
-    for col in df.columns:
-        info = {
-            'type': str(df[col].dtype),
-            'null_count': df[col].isnull().sum(),
-            'unique_count': df[col].nunique(),
-            'is_numeric': pd.api.types.is_numeric_dtype(df[col]),
-            'is_categorical': pd.api.types.is_categorical_dtype(df[col]),
-            'is_datetime': pd.api.types.is_datetime64_any_dtype(df[col])
-        }
+    for col, entry in catalog.items():
+        info = {key: entry[key] for key in
+                ('type', 'null_count', 'unique_count', 'is_numeric', 'is_categorical', 'is_datetime')}
         
         if info['is_numeric']:
-            info.update({
-                'min': df[col].min(),
-                'max': df[col].max(),
-                'mean': df[col].mean(),
-                'std': df[col].std()
-            })
+            info.update({key: entry.get(key, np.nan) for key in ('min', 'max', 'mean', 'std')})
         
         column_info[col] = info
     
     return column_info
 
+def plan_column_dtypes(sample: pd.DataFrame) -> Dict[str, str]:
+    """
+    Decide el tipo compacto de cada columna a partir de una muestra (el primer
+    bloque leído), usando la información de detect_column_types.
+    
+    Args:
+        sample: DataFrame de muestra
+        
+    Returns:
+        dict: Columna -> 'integer', 'float', 'category', 'datetime' o 'keep'
+    """
+    plan = {}
+    column_info = detect_column_types(sample, use_cache=False)
+    for col, info in column_info.items():
+        series = sample[col]
+        non_null = len(series) - info['null_count']
+        if info['is_datetime']:
+            plan[col] = 'keep'
+        elif info['is_numeric'] and not pd.api.types.is_bool_dtype(series):
+            plan[col] = 'integer' if pd.api.types.is_integer_dtype(series) else 'float'
+        elif pd.api.types.is_object_dtype(series) and non_null > 0:
+            if DATETIME_NAME_PATTERN.search(str(col)):
+                parsed = pd.to_datetime(series, errors='coerce')
+                if parsed.notna().sum() >= DATETIME_MIN_PARSE_RATIO * non_null:
+                    plan[col] = 'datetime'
+                    continue
+            unique_ratio = info['unique_count'] / non_null
+            plan[col] = 'category' if unique_ratio <= CATEGORY_MAX_UNIQUE_RATIO else 'keep'
+        else:
+            plan[col] = 'keep'
+    return plan
+
+def _apply_dtype_plan(df: pd.DataFrame, plan: Dict[str, str]) -> pd.DataFrame:
+    """Convierte cada columna al tipo compacto indicado en el plan."""
+    converted = {}
+    for col, kind in plan.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if kind == 'integer' and pd.api.types.is_integer_dtype(series):
+            converted[col] = pd.to_numeric(series, downcast='integer')
+        elif kind in ('integer', 'float') and pd.api.types.is_numeric_dtype(series):
+            # Enteros con NaN llegan como float64: pasan a float32
+            converted[col] = pd.to_numeric(series, downcast='float')
+        elif kind == 'category':
+            if not pd.api.types.is_object_dtype(series):
+                # En otro bloque la columna puede llegar toda nula (float64) o con
+                # solo números: se pasa a texto para que las categorías sean del
+                # mismo tipo en todos los bloques (union_categoricals lo exige)
+                series = series.map(str, na_action='ignore').astype(object)
+            converted[col] = series.astype('category')
+        elif kind == 'datetime':
+            converted[col] = pd.to_datetime(series, errors='coerce')
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+def _concat_chunks(chunks: List[pd.DataFrame], plan: Dict[str, str]) -> pd.DataFrame:
+    """
+    Concatena los bloques unificando las categorías de cada columna
+    (pd.concat convertiría a object categorías distintas).
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+    category_cols = [
+        col for col, kind in plan.items()
+        if kind == 'category' and all(isinstance(c[col].dtype, pd.CategoricalDtype) for c in chunks)
+    ]
+    result = pd.concat([c.drop(columns=category_cols) for c in chunks], ignore_index=True)
+    for col in category_cols:
+        result[col] = pd.api.types.union_categoricals([c[col] for c in chunks])
+    return result[chunks[0].columns]
+
+def build_memory_report(original_bytes: int, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Resume el ahorro de memoria obtenido al compactar los tipos.
+    
+    Args:
+        original_bytes: Memoria (deep) que ocuparían los datos con tipos por defecto
+        df: DataFrame optimizado
+        
+    Returns:
+        dict: Bytes originales, optimizados, ahorrados, proporción y tipos finales
+    """
+    optimized_bytes = int(df.memory_usage(deep=True).sum())
+    saved = original_bytes - optimized_bytes
+    return {
+        'original_bytes': int(original_bytes),
+        'optimized_bytes': optimized_bytes,
+        'saved_bytes': int(saved),
+        'saved_ratio': float(saved / original_bytes) if original_bytes else 0.0,
+        'dtypes': {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+    }
+
+def read_csv_optimized(file, chunksize: int = CSV_CHUNK_SIZE, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Lee un CSV por bloques, compactando los tipos de cada bloque antes de leer
+    el siguiente: categorías para texto de baja cardinalidad, int8/16/32 y
+    float32 para numéricos y fechas parseadas para columnas tipo 'fecha'.
+    
+    Args:
+        file: Ruta o archivo CSV
+        chunksize: Filas por bloque
+        **read_csv_kwargs: Parámetros adicionales para pd.read_csv
+        
+    Returns:
+        pd.DataFrame: DataFrame compacto; el ahorro queda en df.attrs['memory_report']
+    """
+    plan = None
+    chunks = []
+    original_bytes = 0
+    for chunk in pd.read_csv(file, chunksize=chunksize, **read_csv_kwargs):
+        if plan is None:
+            plan = plan_column_dtypes(chunk)
+        original_bytes += int(chunk.memory_usage(deep=True).sum())
+        chunks.append(_apply_dtype_plan(chunk, plan))
+
+    if not chunks:
+        return pd.read_csv(file, **read_csv_kwargs) if isinstance(file, str) else pd.DataFrame()
+
+    df = _concat_chunks(chunks, plan)
+    df.attrs['memory_report'] = build_memory_report(original_bytes, df)
+    return df
+
+def arrow_to_pandas(table: pa.Table, optimize: bool = False) -> pd.DataFrame:
+    """
+    Convierte una tabla Arrow a pandas una sola vez. self_destruct libera cada
+    bloque Arrow al convertirlo, así que no se tienen dos copias enteras.
+    Con optimize, el plan de tipos se decide con las primeras CSV_CHUNK_SIZE
+    filas y el texto de baja cardinalidad se codifica como diccionario en
+    Arrow: llega a pandas como category sin crear un objeto str por fila.
+    
+    Returns:
+        pd.DataFrame: DataFrame (compacto con optimize; el ahorro queda en df.attrs['memory_report'])
+    """
+    if not optimize:
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    sample = table.slice(0, CSV_CHUNK_SIZE).to_pandas()
+    plan = plan_column_dtypes(sample)
+    # Memoria estimada con los tipos por defecto, extrapolada desde la muestra
+    original_bytes = int(sample.memory_usage(deep=True).sum() * table.num_rows / max(len(sample), 1))
+    for col, kind in plan.items():
+        index = table.schema.get_field_index(col)
+        if kind == 'category' and index >= 0 and \
+                (pa.types.is_string(table.schema.field(index).type) or pa.types.is_large_string(table.schema.field(index).type)):
+            table = table.set_column(index, col, pc.dictionary_encode(table.column(index)))
+    df = _apply_dtype_plan(table.to_pandas(split_blocks=True, self_destruct=True), plan)
+    df.attrs['memory_report'] = build_memory_report(original_bytes, df)
+    return df
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compacta los tipos de un DataFrame ya cargado (p.ej. desde Parquet).
+    
+    Args:
+        df: DataFrame original
+        
+    Returns:
+        pd.DataFrame: DataFrame compacto; el ahorro queda en df.attrs['memory_report']
+    """
+    original_bytes = int(df.memory_usage(deep=True).sum())
+    optimized = _apply_dtype_plan(df, plan_column_dtypes(df))
+    if optimized is df:
+        optimized = df.copy(deep=False)
+    optimized.attrs['memory_report'] = build_memory_report(original_bytes, optimized)
+    return optimized
+
 def load_local_file():
-    uploaded_file = st.file_uploader(
-        "Sube tu archivo de datos", 
+    uploaded_files = st.file_uploader(
+        "Sube tus archivos de datos", 
         type=["csv", "parquet"],
         accept_multiple_files=True
     )
     
-    if not uploaded_file:
+    if not uploaded_files:
         return None
     
+    source_column = None
+    if len(uploaded_files) > 1 and st.checkbox("Añadir columna con el archivo de origen", key="local_source_column"):
+        source_column = "archivo_origen"
+    # Varios archivos: lectura en paralelo y esquemas unificados (load_data muestra los errores)
+    return load_data(uploaded_files if len(uploaded_files) > 1 else uploaded_files[0], source_column=source_column)
+
+def is_excel_source(file) -> bool:
+    """Indica si la fuente es un libro de Excel (.xlsx/.xlsm)."""
+    return _file_name(file).lower().endswith(EXCEL_EXTENSIONS)
+
+def list_excel_sheets(file) -> List[str]:
+    """Nombres de las hojas de un libro (solo lee el índice del libro; memoizado por hash)."""
+    key = _source_hash(file)
+    sheets = _excel_sheets_memo.get(key)
+    if sheets is None:
+        from openpyxl import load_workbook
+        if hasattr(file, "seek"):
+            file.seek(0)
+        workbook = load_workbook(file, read_only=True)
+        try:
+            sheets = list(workbook.sheetnames)
+        finally:
+            workbook.close()
+        _excel_sheets_memo.put(key, sheets)
+    return list(sheets)
+
+def _excel_header(row: tuple) -> List[str]:
+    """Nombres de columna desde la fila de cabecera: vacíos -> columna_N, repetidos -> sufijo _N."""
+    names, seen = [], {}
+    for i, value in enumerate(row):
+        name = str(value).strip() if value is not None else ""
+        name = name or f"columna_{i + 1}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _rows_to_table(rows: List[tuple], names: List[str]) -> pa.Table:
+    width = len(names)
+    if not rows:
+        return pa.table({name: pa.array([], type=pa.null()) for name in names})
+    # Filas más cortas que la cabecera se completan con nulos; las celdas de más se ignoran
+    columns = zip(*(row[:width] + (None,) * (width - len(row)) for row in rows))
+    return pa.Table.from_arrays([_column_array(list(values)) for values in columns], names=names)
+
+def read_excel_sheet(source, sheet: str, chunk_rows: int = EXCEL_CHUNK_ROWS) -> pa.Table:
+    """
+    Lee una hoja con openpyxl en modo read-only (las filas se recorren en
+    streaming, sin construir el libro en memoria) y la convierte a Arrow por
+    bloques de chunk_rows filas. La primera fila no vacía es la cabecera; las
+    filas vacías se descartan.
+
+    Args:
+        source: Ruta o archivo del libro
+        sheet: Nombre de la hoja
+        chunk_rows: Filas por bloque
+
+    Returns:
+        pa.Table: Contenido de la hoja (valores calculados, no fórmulas)
+    """
+    from openpyxl import load_workbook
+    if hasattr(source, "seek"):
+        source.seek(0)
+    workbook = load_workbook(source, read_only=True, data_only=True)
     try:
-        if uploaded_file.type == "text/csv":
-            dfs = [pd.read_csv(file) for file in uploaded_file]
-        elif uploaded_file.type == "application/octet-stream":  # Parquet
-            dfs = [pq.read_table(BytesIO(file.read())) for file in uploaded_file]
-        
-        return pd.concat(dfs, ignore_index=True)
+        rows = (row for row in workbook[sheet].iter_rows(values_only=True)
+                if any(value is not None for value in row))
+        header = next(rows, None)
+        if header is None:
+            return pa.table({})
+        names = _excel_header(header)
+        tables = []
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk and tables:
+                break
+            tables.append(_rows_to_table(chunk, names))
+            if len(chunk) < chunk_rows:
+                break
+        return _concat_tables(tables)
+    finally:
+        workbook.close()
+
+def read_excel_tables(file, sheets: List[str], max_workers: int = EXCEL_MAX_WORKERS) -> Dict[str, pa.Table]:
+    """
+    Lee varias hojas de un libro. El parseo del XML es Python puro (no libera
+    el GIL), así que en libros grandes cada hoja se parsea en su propio proceso
+    (arrancar uno cuesta unos segundos: en libros pequeños no compensa).
+
+    Returns:
+        dict: Hoja -> tabla Arrow
+    """
+    size = os.path.getsize(file) if isinstance(file, str) else getattr(file, "size", 0)
+    if len(sheets) == 1 or max_workers <= 1 or size < EXCEL_PARALLEL_MIN_BYTES:
+        return {sheet: read_excel_sheet(file, sheet) for sheet in sheets}
+    path, temp_path = file if isinstance(file, str) else None, None
+    if path is None:
+        # Los procesos necesitan una ruta: el archivo subido se vuelca una vez a disco
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
+            file.seek(0)
+            shutil.copyfileobj(file, temp_file)
+            path = temp_path = temp_file.name
+    try:
+        # spawn: no hereda hilos ni locks del proceso de Streamlit
+        with ProcessPoolExecutor(max_workers=min(len(sheets), max_workers),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            return dict(zip(sheets, executor.map(read_excel_sheet, [path] * len(sheets), sheets)))
+    finally:
+        if temp_path is not None:
+            os.remove(temp_path)
+
+def load_excel(
+    file,
+    sheets: Optional[List[str]] = None,
+    optimize: bool = False,
+    use_cache: bool = True,
+    source_column: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Carga hojas de un libro de Excel. Cada hoja se parsea una sola vez y se
+    guarda en la caché de datasets (Parquet en disco) con una clave formada
+    por el hash del libro y el nombre de la hoja: los reruns y otras sesiones
+    la leen a velocidad de Parquet, y al añadir una hoja solo se parsea esa.
+
+    Args:
+        file: Ruta o archivo subido (.xlsx/.xlsm)
+        sheets: Hojas a cargar (por defecto la primera)
+        optimize: Compacta los tipos (ver arrow_to_pandas)
+        use_cache: Si es False, siempre se vuelve a parsear el libro
+        source_column: Con varias hojas, nombre de la columna con la hoja de
+            origen de cada fila (por defecto 'hoja')
+
+    Returns:
+        pd.DataFrame: Filas de las hojas elegidas, concatenadas en orden
+    """
+    available = list_excel_sheets(file)
+    sheets = [sheet for sheet in (sheets or available[:1]) if sheet in available]
+    if not sheets:
+        raise ValueError("El libro no tiene ninguna de las hojas indicadas")
+    workbook_hash = _source_hash(file)
+    keys = {sheet: hash_key("load_excel", workbook_hash, sheet, optimize) for sheet in sheets}
+    frames = {sheet: get_cached_dataset(key) for sheet, key in keys.items()} if use_cache else {}
+    missing = [sheet for sheet in sheets if frames.get(sheet) is None]
+    if missing:
+        for sheet, table in read_excel_tables(file, missing).items():
+            df = arrow_to_pandas(table, optimize)
+            frames[sheet] = store_cached_dataset(keys[sheet], df) if use_cache else register_fingerprint(df, keys[sheet])
+    if len(sheets) == 1:
+        return frames[sheets[0]]
+    column = source_column or "hoja"
+    combined = pd.concat([frames[sheet].assign(**{column: sheet}) for sheet in sheets], ignore_index=True)
+    combined[column] = combined[column].astype(pd.CategoricalDtype(sheets))
+    return register_fingerprint(combined, hash_key("load_excel", workbook_hash, sheets, optimize, column))
+
+def get_mongo_client(uri: Optional[str] = None):
+    """
+    Devuelve el MongoClient del proceso para `uri`, creándolo la primera vez.
+    Reutilizarlo entre reruns y sesiones evita abrir conexiones (y handshakes
+    TLS con Atlas) en cada carga.
+
+    Args:
+        uri: URI de conexión; por defecto la variable de entorno MONGODB_URI
+            (que puede venir de un archivo .env)
+
+    Returns:
+        pymongo.MongoClient
+    """
+    if uri is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        uri = os.environ.get(MONGO_URI_ENV)
+        if not uri:
+            raise ValueError(f"Define la variable de entorno {MONGO_URI_ENV} con la URI de MongoDB")
+    with _mongo_clients_lock:
+        client = _mongo_clients.get(uri)
+        if client is None:
+            from pymongo import MongoClient
+            client = MongoClient(uri, maxPoolSize=MONGO_MAX_POOL_SIZE, appname="DashboardMultimedia")
+            _mongo_clients[uri] = client
+        return client
+
+def _bson_scalar(value: Any) -> Any:
+    """Tipos BSON sin equivalente en Arrow: Decimal128 -> float, ObjectId y demás -> str."""
+    if value is None or isinstance(value, (str, bool, int, float, dict, list, datetime.datetime)):
+        return value
+    to_decimal = getattr(value, "to_decimal", None)
+    if to_decimal is not None:
+        return float(to_decimal())
+    return str(value)
+
+def _column_array(values: list) -> pa.Array:
+    """
+    Array Arrow de una columna de valores Python. Los tipos BSON sin
+    equivalente se convierten (ver _bson_scalar) y, si la columna mezcla tipos
+    que Arrow no puede unificar, se guarda como texto.
+    """
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        values = [_bson_scalar(value) for value in values]
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+def _documents_to_table(documents: List[dict]) -> pa.Table:
+    """
+    Convierte un lote de documentos en una tabla Arrow, columna a columna. Los
+    documentos anidados quedan como struct/list.
+    """
+    columns = list(dict.fromkeys(key for document in documents for key in document))
+    arrays = [_column_array([document.get(col) for document in documents]) for col in columns]
+    return pa.Table.from_arrays(arrays, names=columns)
+
+def _concat_tables(tables: List[pa.Table]) -> pa.Table:
+    """
+    Concatena tablas con esquemas parecidos: columnas ausentes -> nulos y tipos
+    compatibles promovidos (int64 -> double...). Las columnas con tipos
+    incompatibles entre tablas se pasan a texto.
+    """
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        types: Dict[str, set] = {}
+        for table in tables:
+            for field in table.schema:
+                if not pa.types.is_null(field.type):
+                    types.setdefault(field.name, set()).add(field.type)
+        conflicting = {name for name, field_types in types.items() if len(field_types) > 1}
+        unified = []
+        for table in tables:
+            for name in conflicting & set(table.column_names):
+                index = table.schema.get_field_index(name)
+                table = table.set_column(index, name, pc.cast(table.column(name), pa.string()))
+            unified.append(table)
+        return pa.concat_tables(unified, promote_options="permissive")
+
+def read_mongo_collection(
+    collection,
+    query: Optional[dict] = None,
+    projection: Optional[dict] = None,
+    batch_size: int = MONGO_BATCH_SIZE,
+    limit: Optional[int] = None,
+    sort: Optional[List[tuple]] = None
+) -> pa.Table:
+    """
+    Lee el resultado de find() por lotes de batch_size documentos: cada lote se
+    convierte a Arrow antes de pedir el siguiente, así que nunca se guardan
+    en memoria todos los documentos como diccionarios.
+
+    Args:
+        collection: Colección de pymongo (o compatible, p.ej. mongomock)
+        query: Filtro de find()
+        projection: Proyección de find()
+        batch_size: Documentos por lote (también el tamaño de lote del cursor)
+        limit: Máximo de documentos
+        sort: Orden, lista de (campo, 1 | -1)
+
+    Returns:
+        pa.Table: Documentos leídos
+    """
+    cursor = collection.find(query or {}, projection=projection, batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(int(limit))
+    tables = []
+    documents_iter = iter(cursor)
+    try:
+        while True:
+            documents = list(itertools.islice(documents_iter, batch_size))
+            if not documents:
+                break
+            tables.append(_documents_to_table(documents))
+    finally:
+        cursor.close()
+    if not tables:
+        fields = [name for name, include in (projection or {}).items() if include]
+        return pa.table({name: pa.array([], type=pa.null()) for name in fields})
+    return _concat_tables(tables)
+
+def load_from_db(
+    database: str,
+    collection: str,
+    filter_configs: Optional[dict] = None,
+    columns: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    sort: Optional[List[tuple]] = None,
+    uri: Optional[str] = None,
+    client=None,
+    batch_size: int = MONGO_BATCH_SIZE,
+    use_cache: bool = True,
+    cache_ttl: int = MONGO_CACHE_TTL_SECONDS
+) -> Optional[pd.DataFrame]:
+    """
+    Carga una colección de MongoDB (Atlas o local) empujando los filtros del
+    dashboard (build_mongo_query) y la proyección de columnas a la consulta.
+    El resultado se guarda en la caché de datasets con una clave formada por
+    la consulta completa, válida durante cache_ttl segundos. Con un cliente
+    inyectado sin URI solo se cachea en memoria (su clave no vale en otro proceso).
+
+    Args:
+        database: Nombre de la base de datos
+        collection: Nombre de la colección
+        filter_configs: Configuraciones de filtro (formato de apply_filters_ui)
+        columns: Campos necesarios; None lee todos (incluido _id como texto)
+        limit: Máximo de documentos
+        sort: Orden, lista de (campo, 1 | -1)
+        uri: URI de conexión (por defecto MONGODB_URI)
+        client: Cliente ya creado (p.ej. mongomock.MongoClient() en pruebas);
+            por defecto el cliente compartido de get_mongo_client
+        batch_size: Documentos por lote
+        use_cache: Si es False, siempre se consulta la base de datos
+        cache_ttl: Segundos durante los que se reutiliza un resultado
+
+    Returns:
+        pd.DataFrame: Documentos que pueden cumplir los filtros (aplicar
+        get_filtered_df para el resultado exacto), o None si hay un error
+    """
+    try:
+        query = build_mongo_query(filter_configs)
+        projection = None
+        if columns is not None:
+            projection = {col: 1 for col in dict.fromkeys(columns)}
+            projection.setdefault("_id", 0)
+        # Los clientes inyectados sin URI se identifican por id(): esa clave solo
+        # vale en este proceso, así que su resultado no se guarda en disco
+        source = uri or (os.environ.get(MONGO_URI_ENV) if client is None else None)
+        persistent = source is not None
+        if not persistent:
+            source = id(client)
+        time_bucket = int(time.time() // cache_ttl) if cache_ttl else None
+        key = hash_key("load_from_db", source, database, collection, query, projection, limit, sort, time_bucket)
+        if use_cache:
+            cached_df = get_cached_dataset(key, disk=persistent)
+            if cached_df is not None:
+                return cached_df
+        client = client if client is not None else get_mongo_client(uri)
+        table = read_mongo_collection(client[database][collection], query, projection,
+                                      batch_size=batch_size, limit=limit, sort=sort)
+        df = table.to_pandas()
+        return store_cached_dataset(key, df, disk=persistent) if use_cache else register_fingerprint(df, key)
     except Exception as e:
-        st.error(f"Error al cargar archivo: {e}")
+        st.error(f"Error al cargar desde MongoDB: {str(e)}")
         return None
 
-def load_from_db():
-    # Implementar conexión a MongoDB Atlas
-    pass
+def _json_records(payload: Any, records_field: Optional[str] = None) -> list:
+    """
+    Registros de una página JSON: la propia lista, el campo `records_field`
+    (admite rutas con puntos, p.ej. 'data.items') o la primera lista del objeto.
+    """
+    if records_field:
+        for part in records_field.split("."):
+            payload = payload.get(part) if isinstance(payload, dict) else None
+        return payload or []
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        return next((value for value in payload.values() if isinstance(value, list)), [])
+    return []
+
+def _api_page_table(payload: Any, records_field: Optional[str] = None) -> pa.Table:
+    """Convierte una página de la API en una tabla Arrow (un registro por fila)."""
+    records = [record if isinstance(record, dict) else {"value": record}
+               for record in _json_records(payload, records_field)]
+    return _documents_to_table(records) if records else pa.table({})
 
-def load_from_api():
-    # Implementar conexión a API REST
-    pass
\ No newline at end of file
+def load_from_api(
+    url: str,
+    params: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
+    records_field: Optional[str] = None,
+    page_param: str = "page",
+    first_page: int = 1,
+    pages: Optional[int] = None,
+    total_pages_field: Optional[str] = None,
+    concurrency: int = REST_CONCURRENCY,
+    use_cache: bool = True,
+    cache_ttl: int = API_CACHE_TTL_SECONDS
+) -> Optional[pd.DataFrame]:
+    """
+    Carga un endpoint REST paginado que devuelve JSON, pidiendo las páginas en
+    paralelo (ver utils.rest_client.fetch_pages_async). Cada página se
+    convierte a Arrow al llegar y las tablas se concatenan una sola vez.
+    Durante cache_ttl segundos la misma consulta se sirve de la caché sin
+    ninguna petición (los reruns de Streamlit no repiten la descarga); pasado
+    el TTL, las páginas sin cambios se validan con ETag/If-Modified-Since y, si
+    ninguna cambió, el DataFrame sale de la caché de datasets.
+
+    Args:
+        url: URL del endpoint
+        params: Parámetros fijos de la consulta
+        headers: Cabeceras adicionales (p.ej. {'Authorization': 'Bearer ...'})
+        records_field: Campo con los registros en cada página (por defecto la
+            respuesta si es una lista, o su primera lista)
+        page_param: Nombre del parámetro de página
+        first_page: Número de la primera página
+        pages: Número de páginas, si se conoce (si no, se lee de la respuesta o
+            se piden páginas hasta la primera vacía)
+        total_pages_field: Campo del JSON con el total de páginas
+        concurrency: Máximo de peticiones simultáneas
+        use_cache: Si es False, no se guarda ni se busca el DataFrame en caché
+        cache_ttl: Segundos durante los que se reutiliza el resultado sin
+            contactar con la API (0 = validar siempre las páginas)
+
+    Returns:
+        pd.DataFrame: Registros de todas las páginas, o None si hay un error
+    """
+    try:
+        time_bucket = int(time.time() // cache_ttl) if cache_ttl else None
+        query_key = hash_key("load_from_api_query", url, params, sorted((headers or {}).items()), records_field,
+                             page_param, first_page, pages, time_bucket)
+        if use_cache and time_bucket is not None:
+            version_key = _api_versions.get(query_key)
+            cached_df = get_cached_dataset(version_key) if version_key else None
+            if cached_df is not None:
+                return cached_df
+        parse = functools.partial(_api_page_table, records_field=records_field)
+        results = fetch_pages(url, parse, params=params, headers=headers, page_param=page_param,
+                              first_page=first_page, pages=pages, total_pages_field=total_pages_field,
+                              concurrency=concurrency)
+        # La huella del contenido de cada página identifica la versión del dataset
+        key = hash_key("load_from_api", url, params, records_field, [result.digest for result in results])
+        if use_cache:
+            _api_versions.put(query_key, key)
+            cached_df = get_cached_dataset(key)
+            if cached_df is not None:
+                return cached_df
+        tables = [result.data for result in results if result.data.num_rows]
+        df = _concat_tables(tables).to_pandas() if tables else pd.DataFrame()
+        return store_cached_dataset(key, df) if use_cache else register_fingerprint(df, key)
+    except Exception as e:
+        st.error(f"Error al cargar desde la API: {str(e)}")
+        return None
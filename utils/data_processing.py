@@ -3,6 +3,14 @@ import numpy as np
 from typing import List, Dict, Any, Union
 from sklearn.model_selection import train_test_split
 from datetime import datetime
+from utils.lazy import is_lazy, sample_lazy, lazy_summary
+from utils.catalog import get_column_catalog
+from utils.cache import hash_key, known_fingerprint, register_fingerprint, register_selection
+from utils.temporal import (TEMPORAL_MODES, bucket_downsample, last_periods, temporal_sample, temporal_split,
+                            time_sorted, window_positions)
+
+# Asignaciones del muestreo estratificado
+STRATIFIED_ALLOCATIONS = ("proportional", "equal", "neyman", "fixed")
 
 def process_data(
     df: pd.DataFrame,
@@ -58,44 +66,236 @@ def sample_data(
         **kwargs: Parámetros adicionales específicos del método
         
     Returns:
-        pd.DataFrame: DataFrame muestreado
+        pd.DataFrame: DataFrame muestreado (perezoso si df es de Dask)
     """
+    if is_lazy(df):
+        if method not in ("random", "stratified", "temporal"):
+            raise ValueError(f"Método de muestreo '{method}' no soportado")
+        if method == "stratified" and 'strata' not in kwargs:
+            raise ValueError("Se requiere la columna 'strata' para muestreo estratificado")
+        if method == "temporal" and 'date_column' not in kwargs:
+            raise ValueError("Se requiere la columna 'date_column' para muestreo temporal")
+        if method == "temporal" and kwargs.get('temporal_mode', 'sample') != "sample":
+            raise ValueError("En modo perezoso solo está disponible la muestra temporal ('sample')")
+        allocation = kwargs.get('allocation')
+        if method == "stratified" and allocation not in (None, "fixed") and \
+                not (allocation == "proportional" and isinstance(size, float)):
+            kwargs['fractions'] = _lazy_strata_fractions(df, kwargs['strata'], size, allocation,
+                                                         kwargs.get('value_column'))
+            size = 1
+        return sample_lazy(df, method, size, **kwargs)
+
     if method == "random":
-        if isinstance(size, float):
-            return df.sample(frac=size, random_state=42)
-        return df.sample(n=size, random_state=42)
+        sampled = df.sample(frac=size, random_state=42) if isinstance(size, float) else df.sample(n=size, random_state=42)
+        if df.index.is_unique:
+            # Las filas de la muestra son filas de df: su linaje sale de las etiquetas
+            register_selection(sampled, df, df.index.get_indexer(sampled.index))
+        return sampled
     
     elif method == "stratified":
         if 'strata' not in kwargs:
             raise ValueError("Se requiere la columna 'strata' para muestreo estratificado")
-        
-        strata = kwargs['strata']
-        if isinstance(size, float):
-            return df.groupby(strata).apply(
-                lambda x: x.sample(frac=size, random_state=42)
-            ).reset_index(drop=True)
-        return df.groupby(strata).apply(
-            lambda x: x.sample(n=size, random_state=42)
-        ).reset_index(drop=True)
+        sampled = stratified_sample(df, kwargs['strata'], size,
+                                    allocation=kwargs.get('allocation'),
+                                    value_column=kwargs.get('value_column'),
+                                    random_state=kwargs.get('random_state', 42))
+        parent = known_fingerprint(df)
+        if parent is not None:
+            register_fingerprint(sampled, hash_key("stratified", parent, size, sorted(kwargs.items())))
+        return sampled
     
     elif method == "temporal":
         if 'date_column' not in kwargs:
             raise ValueError("Se requiere la columna 'date_column' para muestreo temporal")
-        
-        date_col = kwargs['date_column']
-        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            df[date_col] = pd.to_datetime(df[date_col])
-        
-        # Ordenar por fecha
-        df = df.sort_values(date_col)
-        
-        if isinstance(size, float):
-            return df.sample(frac=size, random_state=42)
-        return df.sample(n=size, random_state=42)
+        # La columna se ordena/parsea una vez (índice cacheado) sin modificar df
+        sampled = temporal_partition(df, kwargs['date_column'], size, **kwargs)
+        parent = known_fingerprint(df)
+        if parent is not None and known_fingerprint(sampled) is None:
+            register_fingerprint(sampled, hash_key("temporal", parent, size, sorted(kwargs.items())))
+        return sampled
     
     else:
         raise ValueError(f"Método de muestreo '{method}' no soportado")
 
+def temporal_partition(
+    df: pd.DataFrame,
+    date_col: str,
+    size: Union[int, float] = None,
+    temporal_mode: str = "sample",
+    **kwargs
+) -> pd.DataFrame:
+    """
+    Partición temporal del DataFrame (ver utils/temporal.py). Devuelve cortes
+    posicionales del DataFrame ordenado por fecha, sin modificar df.
+    
+    Args:
+        df: DataFrame original
+        date_col: Columna de fechas
+        size: Tamaño de la muestra ('sample') o de la prueba ('split')
+        temporal_mode: 'sample' (muestra aleatoria en orden temporal), 'split'
+            (corte entrenamiento/prueba; part='train'|'test', cutoff opcional),
+            'last_periods' (periods, freq), 'rolling'/'expanding' (window, step,
+            window_index) o 'bucket' (freq, how)
+        
+    Returns:
+        pd.DataFrame: Partición en orden temporal
+    """
+    if temporal_mode not in TEMPORAL_MODES:
+        raise ValueError(f"Modo temporal '{temporal_mode}' no soportado")
+    if temporal_mode == "sample":
+        return temporal_sample(df, date_col, size, random_state=kwargs.get('random_state', 42))
+    if temporal_mode == "split":
+        cutoff = kwargs.get('cutoff')
+        train, test = temporal_split(df, date_col, cutoff=cutoff, test_size=None if cutoff is not None else size)
+        return test if kwargs.get('part', 'train') == 'test' else train
+    if temporal_mode == "last_periods":
+        return last_periods(df, date_col, int(kwargs.get('periods', 1)), kwargs.get('freq', 'D'))
+    if temporal_mode in ("rolling", "expanding"):
+        sorted_df, _ = time_sorted(df, date_col)
+        # Solo se corta la ventana pedida (los límites se calculan vectorizados)
+        starts, ends = window_positions(df, date_col, kwargs.get('window', '7D'), kwargs.get('step'),
+                                        expanding=(temporal_mode == "expanding"))
+        if len(starts) == 0:
+            return register_selection(sorted_df.iloc[:0], sorted_df, np.arange(0))
+        window_index = kwargs.get('window_index', -1)
+        lo, hi = int(starts[window_index]), int(ends[window_index])
+        return register_selection(sorted_df.iloc[lo:hi], sorted_df, np.arange(lo, hi))
+    return bucket_downsample(df, date_col, kwargs.get('freq', 'h'), kwargs.get('how', 'first'))
+
+def _largest_remainder(quotas: np.ndarray, total: int) -> np.ndarray:
+    """Redondea cuotas reales a enteros que suman `total` (método del mayor resto)."""
+    floors = np.floor(quotas).astype(np.int64)
+    remaining = int(total - floors.sum())
+    if remaining > 0:
+        floors[np.argsort(floors - quotas, kind='stable')[:remaining]] += 1
+    return floors
+
+def allocate_strata(
+    counts: np.ndarray,
+    size: Union[int, float],
+    allocation: str = "proportional",
+    stds: np.ndarray = None
+) -> np.ndarray:
+    """
+    Calcula cuántas filas tomar de cada estrato. Nunca supera el tamaño del
+    estrato: lo que no cabe en un estrato se reparte entre los demás.
+
+    Args:
+        counts: Filas de cada estrato (N_h)
+        size: Proporción (float) o número de filas (int). En 'fixed', filas por
+            estrato; en el resto, tamaño total de la muestra
+        allocation: 'proportional' (n_h ∝ N_h), 'equal' (igual por estrato),
+            'neyman' (n_h ∝ N_h·S_h) o 'fixed'
+        stds: Desviación típica de la variable de interés por estrato (Neyman)
+
+    Returns:
+        np.ndarray: Filas a tomar de cada estrato (n_h)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if allocation not in STRATIFIED_ALLOCATIONS:
+        raise ValueError(f"Asignación '{allocation}' no soportada")
+    if allocation == "fixed":
+        per_stratum = np.round(size * counts).astype(np.int64) if isinstance(size, float) else int(size)
+        return np.minimum(counts, per_stratum)
+    if allocation == "proportional" and isinstance(size, float):
+        # Misma fracción en cada estrato, como df.sample(frac=...) por grupo
+        return np.minimum(counts, np.round(size * counts).astype(np.int64))
+
+    total = int(round(size * counts.sum())) if isinstance(size, float) else int(size)
+    total = min(max(total, 0), int(counts.sum()))
+    if allocation == "neyman":
+        if stds is None:
+            raise ValueError("La asignación de Neyman requiere 'value_column'")
+        weights = counts * np.nan_to_num(np.asarray(stds, dtype=np.float64))
+        if weights.sum() == 0:
+            weights = counts.astype(np.float64)
+    elif allocation == "equal":
+        weights = (counts > 0).astype(np.float64)
+    else:
+        weights = counts.astype(np.float64)
+
+    # Reparto iterativo: los estratos que se llenan quedan fijos y el resto
+    # se reparte entre los demás según su peso
+    allocated = np.zeros(len(counts), dtype=np.int64)
+    open_strata = (counts > 0) & (weights > 0)
+    remaining = total
+    while remaining > 0 and open_strata.any():
+        quotas = np.zeros(len(counts))
+        quotas[open_strata] = remaining * weights[open_strata] / weights[open_strata].sum()
+        capacity = counts - allocated
+        full = open_strata & (quotas >= capacity)
+        if full.any():
+            allocated[full] = counts[full]
+            open_strata &= ~full
+            remaining = total - int(allocated.sum())
+            continue
+        allocated += _largest_remainder(quotas, remaining)
+        break
+    return np.minimum(allocated, counts)
+
+def _lazy_strata_fractions(ddf, strata: str, size: Union[int, float], allocation: str,
+                           value_column: str = None) -> pd.Series:
+    """Fracción de Bernoulli por estrato para aplicar una asignación sobre Dask."""
+    grouped = ddf.groupby(strata)
+    counts = grouped.size().compute()
+    stds = None
+    if allocation == "neyman":
+        if value_column is None:
+            raise ValueError("La asignación de Neyman requiere 'value_column'")
+        stds = grouped[value_column].std().compute().reindex(counts.index).to_numpy()
+    per_stratum = allocate_strata(counts.to_numpy(), size, allocation, stds)
+    return pd.Series(per_stratum / counts.to_numpy(), index=counts.index).clip(upper=1.0)
+
+def stratified_sample(
+    df: pd.DataFrame,
+    strata: Union[str, List[str]],
+    size: Union[int, float],
+    allocation: str = None,
+    value_column: str = None,
+    random_state: int = 42
+) -> pd.DataFrame:
+    """
+    Muestreo estratificado vectorizado: una única permutación aleatoria de las
+    filas, ordenada de forma estable por estrato; el rango de cada fila dentro
+    de su estrato decide si entra en la muestra. Sin groupby.apply por grupo.
+
+    Args:
+        df: DataFrame de pandas
+        strata: Columna(s) de estratificación (los estratos nulos se descartan)
+        size: Proporción (float) o número de filas (int)
+        allocation: Ver allocate_strata. Por defecto 'proportional' con
+            proporción y 'fixed' (n filas por estrato) con número de filas
+        value_column: Variable numérica de interés para la asignación de Neyman
+        random_state: Semilla
+
+    Returns:
+        pd.DataFrame: Muestra con el índice original, en el orden original
+    """
+    allocation = allocation or ("proportional" if isinstance(size, float) else "fixed")
+    groups = df.groupby(strata, sort=False, observed=True, dropna=True)
+    codes = groups.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    n_strata = groups.ngroups
+    valid = codes >= 0
+    counts = np.bincount(codes[valid], minlength=n_strata)
+
+    stds = None
+    if allocation == "neyman":
+        if value_column is None:
+            raise ValueError("La asignación de Neyman requiere 'value_column'")
+        stds = groups[value_column].std(ddof=1).to_numpy(dtype=np.float64)
+    per_stratum = allocate_strata(counts, size, allocation, stds)
+
+    # Permutación sembrada + orden estable por estrato = orden aleatorio dentro de cada estrato
+    rng = np.random.default_rng(random_state)
+    positions = np.flatnonzero(valid)
+    order = positions[rng.permutation(len(positions))]
+    order = order[np.argsort(codes[order], kind='stable')]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ordered_codes = codes[order]
+    rank = np.arange(len(order)) - starts[ordered_codes]
+    selected = np.sort(order[rank < per_stratum[ordered_codes]])
+    return register_selection(df.iloc[selected], df, selected)
+
 def generate_summary(df: pd.DataFrame) -> Dict[str, Any]:
     """
     Genera un resumen estadístico del DataFrame.
@@ -106,6 +306,10 @@ def generate_summary(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         dict: Diccionario con estadísticas resumidas
     """
+    if is_lazy(df):
+        return lazy_summary(df)
+
+    catalog = get_column_catalog(df)
     summary = {
         'general': {
             'rows': len(df),
@@ -115,25 +319,16 @@ def generate_summary(df: pd.DataFrame) -> Dict[str, Any]:
         'columns': {}
     }
     
-    for col in df.columns:
+    for col, entry in catalog.items():
         col_info = {
-            'type': str(df[col].dtype),
-            'null_count': df[col].isnull().sum(),
-            'unique_count': df[col].nunique()
+            'type': entry['type'],
+            'null_count': entry['null_count'],
+            'unique_count': entry['unique_count']
         }
         
-        if pd.api.types.is_numeric_dtype(df[col]):
-            col_info.update({
-                'min': df[col].min(),
-                'max': df[col].max(),
-                'mean': df[col].mean(),
-                'std': df[col].std(),
-                'percentiles': {
-                    '25%': df[col].quantile(0.25),
-                    '50%': df[col].quantile(0.50),
-                    '75%': df[col].quantile(0.75)
-                }
-            })
+        if entry['is_numeric']:
+            col_info.update({key: entry.get(key, np.nan) for key in ('min', 'max', 'mean', 'std')})
+            col_info['percentiles'] = entry.get('percentiles', {'25%': np.nan, '50%': np.nan, '75%': np.nan})
         
         summary['columns'][col] = col_info
     
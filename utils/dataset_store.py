@@ -0,0 +1,319 @@
+# utils/dataset_store.py
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import psutil
+
+from utils.cache import (dataset_fingerprint, estimate_nbytes, known_fingerprint, known_selection,
+                         register_fingerprint)
+from utils.lazy import AnyFrame, is_lazy
+
+# Almacén de datasets compartido por todas las sesiones del proceso. Cada tabla
+# base (el dataset cargado) se guarda una sola vez por huella de contenido y es
+# inmutable; las sesiones solo guardan vistas ligeras sobre ella: posiciones de
+# filas (muestreo, filtros) y proyección de columnas. La vista materializada
+# (el DataFrame derivado) se conserva mientras haya memoria y se reconstruye a
+# partir de las posiciones si se expulsó.
+#
+# El presupuesto es la memoria residente del proceso (psutil). Al superarlo se
+# libera, por orden: vistas materializadas de sesiones inactivas, vistas
+# materializadas de las demás sesiones y tablas base que ya no usa ninguna vista.
+DATASET_MEMORY_BUDGET_BYTES = int(os.environ.get(
+    "DASHBOARD_MEMORY_BUDGET_BYTES", psutil.virtual_memory().total * 0.7))
+# Una sesión sin reruns durante este tiempo se considera inactiva
+SESSION_IDLE_SECONDS = int(os.environ.get("DASHBOARD_SESSION_IDLE_SECONDS", 300))
+# Y pasado este, se olvidan sus vistas (sesiones cerradas sin aviso)
+SESSION_EXPIRE_SECONDS = int(os.environ.get("DASHBOARD_SESSION_EXPIRE_SECONDS", 6 * 3600))
+
+
+@dataclass
+class BaseTable:
+    """Tabla base compartida: el DataFrame cargado y su tamaño por columna."""
+    frame: pd.DataFrame
+    column_bytes: pd.Series
+    last_access: float = field(default_factory=time.monotonic)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.column_bytes.sum())
+
+
+@dataclass
+class DatasetView:
+    """
+    Vista de una sesión sobre una tabla base. positions None = todas las filas;
+    columns None = todas las columnas. `frame` es la vista materializada (puede
+    haberse expulsado); si la vista no se puede expresar sobre la base (tabla
+    perezosa, agregación, DataFrame sin linaje registrado...), frame es el
+    propio DataFrame y no se expulsa.
+    """
+    base: Optional[str]
+    positions: Optional[np.ndarray]
+    columns: Optional[Tuple[str, ...]]
+    frame: Optional[AnyFrame]
+    nbytes: int
+    fingerprint: Optional[str] = None
+    owned: bool = False
+
+
+@dataclass
+class SessionViews:
+    views: Dict[str, DatasetView] = field(default_factory=dict)
+    last_access: float = field(default_factory=time.monotonic)
+
+
+def _column_bytes(df: pd.DataFrame) -> pd.Series:
+    # Una sola vez por tabla base (deep=True recorre las cadenas)
+    return df.memory_usage(deep=True, index=False)
+
+
+class DatasetStore:
+    """
+    Tablas base compartidas por huella y vistas por sesión, con un presupuesto
+    global de memoria. Seguro entre hilos (cada sesión de Streamlit ejecuta su
+    script en su propio hilo).
+    """
+
+    def __init__(self, budget_bytes: int = DATASET_MEMORY_BUDGET_BYTES,
+                 idle_seconds: float = SESSION_IDLE_SECONDS,
+                 expire_seconds: float = SESSION_EXPIRE_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self._bases: Dict[str, BaseTable] = {}
+        self._sessions: Dict[str, SessionViews] = {}
+        self._lock = threading.RLock()
+
+    # --- Tablas base ---
+
+    def share_base(self, df: pd.DataFrame) -> Tuple[str, pd.DataFrame]:
+        """
+        Registra df como tabla base (o reutiliza la ya guardada con la misma
+        huella) y devuelve (huella, copia superficial de la base compartida).
+        """
+        fingerprint = known_fingerprint(df) or dataset_fingerprint(df)
+        with self._lock:
+            entry = self._bases.get(fingerprint)
+            if entry is None:
+                entry = self._bases[fingerprint] = BaseTable(df, _column_bytes(df))
+            entry.last_access = time.monotonic()
+            base = entry.frame
+        # Copia superficial (copy-on-write): la sesión puede añadir o quitar columnas sin tocar la base
+        return fingerprint, register_fingerprint(base.copy(deep=False), fingerprint)
+
+    # --- Vistas por sesión ---
+
+    def _session(self, session_id: str) -> SessionViews:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SessionViews()
+        session.last_access = time.monotonic()
+        return session
+
+    def touch(self, session_id: str) -> None:
+        """Marca la sesión como activa (al inicio de cada rerun)."""
+        with self._lock:
+            self._session(session_id)
+
+    def put_view(self, session_id: str, name: str, df: Optional[AnyFrame], base: Optional[AnyFrame] = None) -> Optional[AnyFrame]:
+        """
+        Guarda `df` como la vista `name` de la sesión.
+
+        Args:
+            session_id: Identificador de la sesión
+            name: Nombre de la vista ('raw', 'sampled', 'filtered'...)
+            df: DataFrame de la vista (None la borra)
+            base: Tabla base de la sesión (vista 'raw'); df se guarda como
+                posiciones sobre ella si está registrado como selección suya
+                (register_selection) y, si no, entero. Sin base, df pasa a ser
+                una tabla base
+
+        Returns:
+            El DataFrame a usar: una copia superficial de la base compartida si
+            df es una tabla base, o el propio df
+        """
+        if df is None:
+            self.drop_view(session_id, name)
+            return None
+        if is_lazy(df):
+            # Los DataFrames de Dask son grafos: se guardan tal cual
+            view = DatasetView(None, None, None, df, 0, known_fingerprint(df), owned=True)
+        elif base is None:
+            fingerprint, df = self.share_base(df)
+            view = DatasetView(fingerprint, None, None, df, 0, fingerprint)
+        else:
+            view = self._derived_view(df, base)
+        with self._lock:
+            self._session(session_id).views[name] = view
+        return df
+
+    def _derived_view(self, df: pd.DataFrame, base: AnyFrame) -> DatasetView:
+        fingerprint = known_fingerprint(df)
+        # El linaje solo sale de register_selection (o de ser la propia base):
+        # nunca se deduce de etiquetas, que un DataFrame agregado también puede tener
+        selection = known_selection(df)
+        if selection is None and fingerprint is not None and fingerprint == known_fingerprint(base):
+            selection = (fingerprint, None, None)
+        with self._lock:
+            entry = self._bases.get(selection[0]) if selection else None
+        if entry is None or selection[0] != known_fingerprint(base):
+            return DatasetView(None, None, None, df, estimate_nbytes(df), fingerprint, owned=True)
+        base_fingerprint, positions, columns = selection
+        base_df = entry.frame
+        # Comprobación barata de que df no cambió de forma tras registrarse
+        expected_rows = len(base_df) if positions is None else len(positions)
+        expected_columns = list(base_df.columns) if columns is None else list(columns)
+        if len(df) != expected_rows or list(df.columns) != expected_columns:
+            return DatasetView(None, None, None, df, estimate_nbytes(df), fingerprint, owned=True)
+        # Tamaño estimado a partir de la base, sin recorrer las cadenas de df
+        column_bytes = entry.column_bytes if columns is None else entry.column_bytes[list(columns)]
+        row_fraction = 1.0 if positions is None else len(positions) / max(len(base_df), 1)
+        nbytes = 0 if positions is None else int(column_bytes.sum() * row_fraction)
+        return DatasetView(base_fingerprint, positions, columns, df, nbytes, fingerprint)
+
+    def get_view(self, session_id: str, name: str) -> Optional[AnyFrame]:
+        """Devuelve la vista `name` de la sesión, reconstruyéndola desde la base si se expulsó."""
+        with self._lock:
+            view = self._session(session_id).views.get(name)
+            if view is None:
+                return None
+            frame = view.frame
+            entry = self._bases.get(view.base) if view.base else None
+            if entry is not None:
+                entry.last_access = time.monotonic()
+        if frame is not None:
+            return frame
+        if entry is None:
+            return None
+        frame = entry.frame
+        if view.positions is not None:
+            frame = frame.take(view.positions)
+        if view.columns is not None:
+            frame = frame[list(view.columns)]
+        if view.positions is None:
+            frame = frame.copy(deep=False)
+        if view.fingerprint:
+            register_fingerprint(frame, view.fingerprint)
+        with self._lock:
+            view.frame = frame
+        return frame
+
+    def drop_view(self, session_id: str, name: str) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.views.pop(name, None)
+
+    def release_session(self, session_id: str) -> None:
+        """Olvida todas las vistas de una sesión."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    # --- Presupuesto de memoria ---
+
+    def _referenced_bases(self) -> set:
+        return {view.base for session in self._sessions.values() for view in session.views.values() if view.base}
+
+    def _expire_sessions(self, current_session: Optional[str], now: float) -> None:
+        expired = [sid for sid, session in self._sessions.items() if sid != current_session
+                   and (now - session.last_access > self.expire_seconds or not _session_is_alive(sid))]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def _eviction_candidates(self, current_session: Optional[str], now: float) -> List[Tuple[float, str, str]]:
+        """Vistas materializadas expulsables: (orden, sesión, nombre); primero las de sesiones inactivas."""
+        candidates = []
+        for session_id, session in self._sessions.items():
+            if session_id == current_session:
+                continue
+            idle = now - session.last_access > self.idle_seconds
+            for name, view in session.views.items():
+                if view.frame is not None and not view.owned and view.nbytes > 0:
+                    candidates.append((0 if idle else 1, session.last_access, session_id, name))
+        candidates.sort()
+        return [(rank, session_id, name) for rank, _, session_id, name in candidates]
+
+    def enforce_budget(self, current_session: Optional[str] = None) -> int:
+        """
+        Libera memoria si el proceso supera el presupuesto. Las vistas de la
+        sesión actual no se tocan.
+
+        Returns:
+            int: Bytes liberados (estimados)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire_sessions(current_session, now)
+            excess = psutil.Process().memory_info().rss - self.budget_bytes
+            if excess <= 0:
+                return 0
+            freed = 0
+            for _, session_id, name in self._eviction_candidates(current_session, now):
+                if freed >= excess:
+                    return freed
+                view = self._sessions[session_id].views[name]
+                view.frame = None
+                freed += view.nbytes
+            referenced = self._referenced_bases()
+            unused = sorted((entry.last_access, fingerprint) for fingerprint, entry in self._bases.items()
+                            if fingerprint not in referenced)
+            for _, fingerprint in unused:
+                if freed >= excess:
+                    break
+                freed += self._bases.pop(fingerprint).nbytes
+            return freed
+
+    def stats(self) -> dict:
+        """Resumen del almacén: sesiones, tablas base y bytes (estimados) por tipo."""
+        with self._lock:
+            views = [view for session in self._sessions.values() for view in session.views.values()]
+            return {
+                'sessions': len(self._sessions),
+                'bases': len(self._bases),
+                'base_bytes': sum(entry.nbytes for entry in self._bases.values()),
+                'view_bytes': sum(view.nbytes for view in views if view.frame is not None),
+                'rss_bytes': psutil.Process().memory_info().rss,
+                'budget_bytes': self.budget_bytes,
+            }
+
+
+def _session_is_alive(session_id: str) -> bool:
+    """False si Streamlit ya cerró la sesión (True fuera de Streamlit o si no se sabe)."""
+    try:
+        from streamlit import runtime
+        if runtime.exists():
+            return runtime.get_instance().is_active_session(session_id)
+    except Exception:
+        pass
+    return True
+
+
+_store: Optional[DatasetStore] = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    """Almacén de datasets compartido por el proceso."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
+
+
+def current_session_id() -> str:
+    """Identificador de la sesión de Streamlit del hilo actual."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except ImportError:
+        pass
+    return f"local-{uuid.getnode()}-{os.getpid()}"
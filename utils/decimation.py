@@ -0,0 +1,183 @@
+# utils/decimation.py
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Gráficos de puntos (scatter, pairplot) con muchos datos: por encima del
+# presupuesto de puntos se reduce el número de marcadores conservando la forma
+# de la distribución, o se sustituyen por un mapa de densidad 2D agregado.
+DEFAULT_POINT_BUDGET = 50_000
+# Celdas por eje de la rejilla usada para repartir el presupuesto
+DECIMATION_GRID_SIZE = 64
+# En modo automático, por encima de este múltiplo del presupuesto se usa el mapa de densidad
+DENSITY_MODE_MIN_RATIO = 20
+# Bins por eje de los mapas de densidad (en el pairplot, por panel)
+DENSITY_BINS = 100
+DENSITY_PAIRPLOT_BINS = 40
+
+RENDER_MODES = ["auto", "all", "decimated", "density"]
+
+
+def _axis_values(series: pd.Series) -> Optional[np.ndarray]:
+    """Columna como float64 (fechas en ns), o None si no es numérica ni de fecha."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = series.to_numpy(dtype='datetime64[ns]').view(np.int64).astype(np.float64)
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    if pd.api.types.is_numeric_dtype(dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return None
+
+
+def _quantize(values: np.ndarray, n_cells: int) -> np.ndarray:
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    if not np.isfinite(lo) or hi == lo:
+        return np.zeros(len(values), dtype=np.int64)
+    scaled = (values - lo) * (n_cells / (hi - lo))
+    return np.clip(np.nan_to_num(scaled, nan=0.0).astype(np.int64), 0, n_cells - 1)
+
+
+def _water_fill(counts: np.ndarray, budget: int) -> int:
+    """Mayor cupo q por celda tal que sum(min(counts, q)) <= budget (al menos 1)."""
+    lo, hi = 1, int(counts.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def choose_render_mode(n_rows: int, point_budget: int, mode: str = "auto", panels: int = 1) -> str:
+    """
+    Decide cómo dibujar un gráfico de puntos.
+
+    Args:
+        n_rows: Filas a dibujar
+        point_budget: Máximo de marcadores en total (todos los paneles)
+        mode: 'auto', 'all', 'decimated' o 'density'
+        panels: Paneles en los que aparece cada fila (k² en un pairplot de k dimensiones)
+
+    Returns:
+        str: 'all', 'decimated' o 'density'
+    """
+    if mode != "auto":
+        return mode
+    total_points = n_rows * panels
+    if total_points <= point_budget:
+        return "all"
+    if total_points > DENSITY_MODE_MIN_RATIO * point_budget:
+        return "density"
+    return "decimated"
+
+
+def density_decimate(
+    df: pd.DataFrame,
+    columns: List[str],
+    budget: int,
+    strata: Optional[List[str]] = None,
+    grid_size: int = DECIMATION_GRID_SIZE,
+    random_state: int = 42
+) -> pd.DataFrame:
+    """
+    Reduce el DataFrame a unas `budget` filas conservando la forma de la nube
+    de puntos: se divide el espacio de `columns` en una rejilla y cada celda
+    aporta como mucho el mismo cupo de filas (elegidas al azar). Las celdas
+    poco pobladas (colas y valores atípicos) se conservan enteras y las densas
+    se aclaran; los mínimos y máximos de cada columna se conservan siempre.
+
+    Args:
+        df: DataFrame de pandas
+        columns: Columnas de los ejes (numéricas, de fecha o categóricas)
+        budget: Número aproximado de filas a conservar
+        strata: Columnas adicionales (p.ej. color) que separan celdas, para
+            que las clases poco frecuentes no desaparezcan en zonas densas
+        grid_size: Celdas por eje en 2D (con más ejes se reduce para mantener
+            un número de celdas similar)
+        random_state: Semilla
+
+    Returns:
+        pd.DataFrame: Subconjunto de filas en el orden original
+    """
+    n_rows = len(df)
+    if n_rows <= budget:
+        return df
+
+    cells_per_axis = max(4, int(round(grid_size ** (2 / max(len(columns), 2)))))
+    cell = np.zeros(n_rows, dtype=np.int64)
+    valid = np.ones(n_rows, dtype=bool)
+    extremes = []
+    for col in columns:
+        values = _axis_values(df[col])
+        if values is None:
+            codes, uniques = pd.factorize(df[col])
+            valid &= codes >= 0
+            n_codes = max(len(uniques), 1)
+        else:
+            finite = np.isfinite(values)
+            valid &= finite
+            if finite.any():
+                finite_positions = np.flatnonzero(finite)
+                extremes += [finite_positions[np.argmin(values[finite])], finite_positions[np.argmax(values[finite])]]
+            codes, n_codes = _quantize(values, cells_per_axis), cells_per_axis
+        # Se refactoriza en cada paso para que el identificador de celda no desborde
+        cell = pd.factorize(cell * n_codes + codes)[0]
+    for col in strata or []:
+        codes, uniques = pd.factorize(df[col])
+        cell = pd.factorize(cell * (len(uniques) + 1) + codes + 1)[0]
+
+    positions = np.flatnonzero(valid)
+    if len(positions) <= budget:
+        return df.iloc[positions]
+    cell_codes, cell_of_row = np.unique(cell[positions], return_inverse=True)
+    counts = np.bincount(cell_of_row, minlength=len(cell_codes))
+    quota = _water_fill(counts, budget)
+
+    # Orden aleatorio dentro de cada celda: permutación + ordenación estable por celda
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(positions))
+    order = order[np.argsort(cell_of_row[order], kind='stable')]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(order)) - starts[cell_of_row[order]]
+    kept = positions[order[rank < quota]]
+    kept = np.union1d(kept, np.asarray(extremes, dtype=np.int64))
+    return df.iloc[kept]
+
+
+def density_grid(
+    x: pd.Series,
+    y: pd.Series,
+    bins: int = DENSITY_BINS
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Histograma 2D calculado en el servidor para un mapa de densidad.
+
+    Returns:
+        tuple (conteos [bins_y, bins_x], centros x, centros y) o None si algún
+        eje no es numérico. Los centros de fechas se devuelven como datetime64.
+    """
+    x_values, y_values = _axis_values(x), _axis_values(y)
+    if x_values is None or y_values is None:
+        return None
+    finite = np.isfinite(x_values) & np.isfinite(y_values)
+    x_values, y_values = x_values[finite], y_values[finite]
+    # Rejilla uniforme: bincount sobre los códigos de celda (más rápido que np.histogram2d)
+    cells = _quantize(y_values, bins) * bins + _quantize(x_values, bins)
+    counts = np.bincount(cells, minlength=bins * bins).reshape(bins, bins).astype(np.float64)
+    counts[counts == 0] = np.nan  # Las celdas vacías no se pintan
+    centers = []
+    for series, values in ((x, x_values), (y, y_values)):
+        lo, hi = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+        edges = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+        mid = (edges[:-1] + edges[1:]) / 2
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            mid = mid.round().astype(np.int64).view('datetime64[ns]')
+        centers.append(mid)
+    return counts, centers[0], centers[1]
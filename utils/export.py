@@ -0,0 +1,112 @@
+# utils/export.py
+import io
+import re
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import plotly.graph_objects as go
+
+from utils.visualizations import export_plot
+
+# Exportación de figuras en segundo plano. Kaleido arranca un subproceso de
+# Chromium la primera vez que renderiza; un único hilo renderizador lo mantiene
+# vivo entre exportaciones y serializa el acceso (Kaleido no es thread-safe).
+EXPORT_FORMATS = ["png", "svg", "pdf", "jpeg"]
+EXPORT_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+    "zip": "application/zip",
+}
+
+
+def _safe_file_name(name: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", name).strip("_") or "grafico"
+
+
+class ExportService:
+    """
+    Servicio de exportación con un renderizador persistente. Las peticiones se
+    encolan y se procesan en un hilo propio, sin bloquear el script de Streamlit:
+    cada método devuelve un Future.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="figure-export")
+        self._warm_future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> Future:
+        """Arranca el renderizador (una sola vez) con una figura mínima."""
+        with self._lock:
+            if self._warm_future is None:
+                self._warm_future = self._executor.submit(
+                    export_plot, go.Figure(layout={"annotations": [{"text": ""}]}), "png", 100, 10, 10)
+            return self._warm_future
+
+    def render(self, fig: go.Figure, format: str = "png", dpi: int = 300,
+               width: int = 1000, height: int = 600) -> Future:
+        """Exporta una figura; el Future devuelve los bytes del archivo."""
+        self.warm_up()
+        return self._executor.submit(export_plot, go.Figure(fig), format, dpi, width, height)
+
+    def export_batch(
+        self,
+        figures: Sequence[Tuple[str, go.Figure]],
+        formats: Sequence[str] = ("png",),
+        dpi: int = 300,
+        width: int = 1000,
+        height: int = 600
+    ) -> Future:
+        """
+        Exporta un lote de figuras en uno o varios formatos a un único zip.
+
+        Args:
+            figures: Pares (nombre, figura)
+            formats: Formatos de salida ('png', 'svg', 'pdf', 'jpeg')
+            dpi: Resolución para formatos de imagen
+            width, height: Tamaño en píxeles
+
+        Returns:
+            Future: Bytes del zip. Las figuras que fallen se listan en errores.txt
+        """
+        self.warm_up()
+        # Copias: la sesión puede seguir modificando sus figuras mientras se exporta
+        figures = [(name, go.Figure(fig)) for name, fig in figures]
+        return self._executor.submit(self._render_zip, figures, list(formats), dpi, width, height)
+
+    @staticmethod
+    def _render_zip(figures: List[Tuple[str, go.Figure]], formats: List[str],
+                    dpi: int, width: int, height: int) -> bytes:
+        buffer = io.BytesIO()
+        errors = []
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for i, (name, fig) in enumerate(figures, start=1):
+                base_name = f"{i:02d}_{_safe_file_name(name)}"
+                for format in formats:
+                    try:
+                        content = export_plot(fig, format=format, dpi=dpi, width=width, height=height)
+                    except Exception as e:
+                        errors.append(f"{base_name}.{format}: {e}")
+                        continue
+                    if content:
+                        archive.writestr(f"{base_name}.{format}", content)
+            if errors:
+                archive.writestr("errores.txt", "\n".join(errors))
+        return buffer.getvalue()
+
+
+_export_service: Optional[ExportService] = None
+_export_service_lock = threading.Lock()
+
+
+def get_export_service() -> ExportService:
+    """Devuelve el servicio de exportación del proceso (compartido por todas las sesiones)."""
+    global _export_service
+    with _export_service_lock:
+        if _export_service is None:
+            _export_service = ExportService()
+        return _export_service
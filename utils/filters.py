@@ -2,26 +2,47 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import dask.dataframe as dd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from typing import Any, Callable, Dict, Iterator, Optional
+from utils.lazy import is_lazy, lazy_column_stats, parquet_scan_info, rescan_parquet
+from utils.catalog import get_column_catalog
+from utils.indexes import RANGE_INDEX_MIN_ROWS, get_range_index
+from utils.cache import LRUByteCache, hash_key, known_fingerprint, register_fingerprint, register_selection
+
+# Operadores lógicos admitidos en los grupos de un árbol de filtros
+FILTER_GROUP_OPS = ("and", "or", "not")
+
+# Máscaras por columna ya evaluadas, guardadas como bitmaps (np.packbits, 1 bit por fila).
+# Clave: (huella del dataset, columna, configuración del filtro).
+FILTER_MASK_CACHE_BYTES = 256 * 1024**2
+_filter_mask_cache = LRUByteCache(max_bytes=FILTER_MASK_CACHE_BYTES)
 
 def apply_filters_ui(df: pd.DataFrame, key_prefix="filter_"):
     """
     Genera widgets de Streamlit en la sidebar para filtrar el DataFrame.
-    Devuelve un diccionario con las configuraciones de filtro seleccionadas.
+    Devuelve un diccionario con las configuraciones de filtro seleccionadas
+    (combinadas con AND) o, si el usuario elige OR, un árbol de filtros
+    {"op": "or", "children": [...]} (ver normalize_filter_expr).
     """
-    if df is None or df.empty:
+    if df is None or (not is_lazy(df) and df.empty):
         st.sidebar.warning("No hay datos para aplicar filtros.")
         return {}
 
     filters = {}
+    # Estadísticas de columnas: catálogo calculado una vez por versión del dataset
+    # (en modo perezoso, en una sola pasada sobre las particiones)
+    column_stats = lazy_column_stats(df) if is_lazy(df) else get_column_catalog(df)
     st.sidebar.markdown("#### Filtros de Columnas")
 
     for col in df.columns:
         col_key = f"{key_prefix}{col}"
         
         # Filtro para columnas numéricas (rango)
-        if pd.api.types.is_numeric_dtype(df[col]):
-            if len(df[col].unique()) > 1: # Solo si hay más de un valor único
-                min_val, max_val = float(df[col].min()), float(df[col].max())
+        if pd.api.types.is_numeric_dtype(df[col].dtype):
+            if column_stats[col]['unique_count'] > 1: # Solo si hay más de un valor único
+                min_val, max_val = float(column_stats[col]['min']), float(column_stats[col]['max'])
                 selected_range = st.sidebar.slider(
                     f"Rango para '{col}'",
                     min_value=min_val,
@@ -33,8 +54,11 @@ def apply_filters_ui(df: pd.DataFrame, key_prefix="filter_"):
                     filters[col] = {"type": "numeric_range", "range": selected_range}
         
         # Filtro para columnas categóricas (selección múltiple)
-        elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_categorical_dtype(df[col]):
-            unique_values = df[col].unique().tolist()
+        elif pd.api.types.is_object_dtype(df[col].dtype) or isinstance(df[col].dtype, pd.CategoricalDtype):
+            if 'values' not in column_stats[col]: continue # Demasiados valores distintos
+            unique_values = list(column_stats[col]['values'])
+            if column_stats[col].get('null_count'):
+                unique_values.append(np.nan)
             if len(unique_values) < 1: continue # Saltar si no hay valores o solo NaNs
             
             # Quitar NaNs de las opciones si existen y no son la única opción
@@ -54,9 +78,9 @@ def apply_filters_ui(df: pd.DataFrame, key_prefix="filter_"):
                 filters[col] = {"type": "categorical_multiselect", "values": selected_values}
 
         # Filtro para columnas de fecha/datetime (rango de fechas) - BÁSICO
-        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+        elif pd.api.types.is_datetime64_any_dtype(df[col].dtype):
             try:
-                min_date, max_date = df[col].min(), df[col].max()
+                min_date, max_date = column_stats[col].get('min'), column_stats[col].get('max')
                 if pd.isna(min_date) or pd.isna(max_date): continue # Si hay NaTs que impiden rango
 
                 selected_date_range = st.sidebar.date_input(
@@ -75,53 +99,430 @@ def apply_filters_ui(df: pd.DataFrame, key_prefix="filter_"):
             except Exception as e:
                 st.sidebar.warning(f"No se pudo crear filtro de fecha para {col}: {e}")
                 
-    # Aquí podrías añadir la lógica para condiciones combinadas (AND/OR)
-    # Esto es más complejo y requeriría una UI para construir expresiones.
-    # Por ahora, los filtros aplicados son implícitamente AND.
+    # Combinación de condiciones: por defecto AND; con OR se devuelve un árbol de filtros
+    if len(filters) > 1:
+        combinator = st.sidebar.radio(
+            "Combinar filtros con",
+            ["AND", "OR"],
+            format_func=lambda op: "AND (todos)" if op == "AND" else "OR (alguno)",
+            horizontal=True,
+            key=f"{key_prefix}combinator"
+        )
+        if combinator == "OR":
+            return {"op": "or", "children": [dict(config, column=col) for col, config in filters.items()]}
 
     return filters
 
+def normalize_filter_expr(filter_configs: Optional[dict]) -> Optional[Dict[str, Any]]:
+    """
+    Convierte las configuraciones de filtro a un árbol de expresión.
+    
+    Formatos admitidos:
+        - Diccionario columna -> configuración (formato de apply_filters_ui), AND implícito
+        - Hoja: {"column": col, "type": "numeric_range" | ..., "range"/"values": ...}
+        - Grupo: {"op": "and" | "or" | "not", "children": [nodos]}
+        
+    Returns:
+        dict o None si no hay filtros
+    """
+    if not filter_configs:
+        return None
+    if "op" in filter_configs:
+        op = filter_configs["op"]
+        if op not in FILTER_GROUP_OPS:
+            raise ValueError(f"Operador de filtro '{op}' no soportado")
+        children = [child for child in map(normalize_filter_expr, filter_configs.get("children", [])) if child]
+        if op == "not" and len(children) != 1:
+            raise ValueError("El operador 'not' requiere exactamente un hijo")
+        if not children:
+            return None
+        if op != "not" and len(children) == 1:
+            return children[0]
+        return {"op": op, "children": children}
+    if "column" in filter_configs and "type" in filter_configs:
+        return filter_configs
+    leaves = [dict(config, column=col) for col, config in filter_configs.items()]
+    return leaves[0] if len(leaves) == 1 else {"op": "and", "children": leaves}
+
+def iter_filter_leaves(expr: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Recorre las hojas (filtros de columna) de un árbol de filtros."""
+    if not expr:
+        return
+    if "op" in expr:
+        for child in expr["children"]:
+            yield from iter_filter_leaves(child)
+    else:
+        yield expr
+
+def _fold_filter_expr(expr: Dict[str, Any], leaf_fn: Callable, and_fn: Callable, or_fn: Callable, not_fn: Callable):
+    """Evalúa un árbol de filtros combinando los resultados de las hojas."""
+    if "op" not in expr:
+        return leaf_fn(expr)
+    results = [_fold_filter_expr(child, leaf_fn, and_fn, or_fn, not_fn) for child in expr["children"]]
+    if expr["op"] == "not":
+        return not_fn(results[0])
+    return (and_fn if expr["op"] == "and" else or_fn)(results)
+
+def _leaf_mask(df: pd.DataFrame, leaf: Dict[str, Any], fingerprint: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Máscara booleana (numpy) de un filtro de columna sobre la columna original,
+    sin copiar el DataFrame. Devuelve None si el filtro no puede aplicarse.
+    Los rangos sobre datasets grandes con huella se resuelven con el índice
+    ordenado de la columna (utils.indexes), salvo que la hoja indique use_index=False.
+    """
+    col = leaf["column"]
+    series = df[col]
+    if leaf["type"] in ("numeric_range", "datetime_range") and fingerprint is not None \
+            and leaf.get("use_index", True) and len(df) >= RANGE_INDEX_MIN_ROWS:
+        range_index = get_range_index(df, col, fingerprint)
+        if range_index is not None:
+            return range_index.range_mask(*leaf["range"])
+    if leaf["type"] == "numeric_range":
+        min_val, max_val = leaf["range"]
+        # Tipos nullable (Int64, Float64...) se pasan a float con NaN para comparar con numpy
+        values = series.to_numpy() if isinstance(series.dtype, np.dtype) \
+            else series.to_numpy(dtype=float, na_value=np.nan)
+        return (values >= min_val) & (values <= max_val)
+
+    elif leaf["type"] == "categorical_multiselect":
+        selected_values = leaf["values"]
+        non_nan_selected_values = [v for v in selected_values if pd.notna(v)]
+        is_nan_selected = len(non_nan_selected_values) < len(selected_values)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Se evalúa sobre las categorías y se expande con los códigos (código -1 = NaN)
+            codes = series.cat.codes.to_numpy()
+            lookup = np.append(series.cat.categories.isin(non_nan_selected_values), is_nan_selected)
+            return lookup[codes]
+        mask = series.isin(non_nan_selected_values).to_numpy()
+        if is_nan_selected:
+            mask |= series.isna().to_numpy()
+        return mask
+
+    elif leaf["type"] == "datetime_range":
+        start_date, end_date = leaf["range"]
+        # Asegurarse que la columna es datetime (solo para la comparación, sin modificar df)
+        if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            try:
+                series = pd.to_datetime(series)
+            except Exception:
+                st.warning(f"No se pudo convertir la columna {col} a datetime para filtrar.")
+                return None
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy()
+            return (values >= np.datetime64(start_date)) & (values <= np.datetime64(end_date))
+        return ((series >= start_date) & (series <= end_date)).to_numpy()
+
+    return None
+
+def _leaf_bitmap(df: pd.DataFrame, leaf: Dict[str, Any], fingerprint: Optional[str]) -> Optional[np.ndarray]:
+    """
+    Bitmap (np.packbits) de un filtro de columna. Si el dataset tiene huella, el
+    bitmap se guarda en caché: al mover un solo filtro, los demás no se
+    vuelven a evaluar.
+    """
+    key = None
+    if fingerprint is not None:
+        key = (fingerprint, leaf["column"], hash_key(sorted(leaf.items(), key=lambda item: item[0])))
+        bitmap = _filter_mask_cache.get(key)
+        if bitmap is not None:
+            return bitmap
+    mask = _leaf_mask(df, leaf, fingerprint)
+    if mask is None:
+        return None
+    bitmap = np.packbits(mask)
+    if key is not None:
+        _filter_mask_cache.put(key, bitmap)
+    return bitmap
+
+def compile_filter_mask(df: pd.DataFrame, filter_configs: Optional[dict]) -> Optional[np.ndarray]:
+    """
+    Compila las configuraciones de filtro (diccionario o árbol AND/OR/NOT) en una
+    única máscara booleana evaluada con numpy sobre las columnas originales.
+    Las máscaras de cada columna se combinan como bitmaps (8 filas por byte) y
+    se reutilizan entre reruns mientras no cambie su configuración.
+    
+    Args:
+        df: DataFrame de pandas
+        filter_configs: Configuraciones de filtro o árbol de filtros
+        
+    Returns:
+        np.ndarray de bool o None si no hay filtros aplicables
+    """
+    expr = normalize_filter_expr(filter_configs)
+    if expr is None:
+        return None
+    fingerprint = known_fingerprint(df)
+    bitmap = _fold_filter_expr(
+        expr,
+        leaf_fn=lambda leaf: _leaf_bitmap(df, leaf, fingerprint),
+        and_fn=_and_masks,
+        or_fn=_or_masks,
+        not_fn=lambda bits: None if bits is None else ~bits
+    )
+    if bitmap is None:
+        return None
+    # unpackbits devuelve 0/1 en uint8: se reinterpreta como bool sin copia
+    return np.unpackbits(bitmap, count=len(df)).view(bool)
+
+def _and_masks(masks: list) -> Optional[np.ndarray]:
+    # Los filtros no aplicables (None) se ignoran, como antes en el bucle AND.
+    # Se copia el primero para no modificar los bitmaps guardados en caché.
+    masks = [m for m in masks if m is not None]
+    if not masks:
+        return None
+    result = masks[0].copy()
+    for mask in masks[1:]:
+        result &= mask
+    return result
+
+def _or_masks(masks: list) -> Optional[np.ndarray]:
+    masks = [m for m in masks if m is not None]
+    if not masks:
+        return None
+    result = masks[0].copy()
+    for mask in masks[1:]:
+        result |= mask
+    return result
+
+def _filter_fingerprint(df, expr: Dict[str, Any]) -> Optional[str]:
+    """Huella del resultado de filtrar `df` (si la huella de df es conocida)."""
+    parent = known_fingerprint(df)
+    return None if parent is None else hash_key("filter", parent, repr(expr))
+
 def get_filtered_df(df: pd.DataFrame, filter_configs: dict) -> pd.DataFrame:
     """
     Aplica las configuraciones de filtro al DataFrame y devuelve el DataFrame filtrado.
+    Todas las condiciones se combinan en una sola máscara y el DataFrame se
+    recorta una única vez al final (sin copia previa).
+    
+    Args:
+        df: DataFrame original (pandas o Dask)
+        filter_configs: Diccionario columna -> configuración (AND) o árbol AND/OR/NOT
+        
+    Returns:
+        pd.DataFrame: DataFrame filtrado (el propio df si ninguna fila se descarta)
     """
-    if not filter_configs or df is None or df.empty:
+    expr = normalize_filter_expr(filter_configs)
+    if expr is None or df is None:
         return df
+    if is_lazy(df):
+        scan_info = parquet_scan_info(df)
+        if scan_info is not None:
+            # Fuente Parquet: los filtros se empujan a la lectura (row groups y particiones)
+            df = rescan_parquet(df, filter_expr=build_arrow_filter(expr, scan_info['schema']))
+        filtered_ddf = _filter_lazy(df, expr)
+        fingerprint = _filter_fingerprint(df, expr)
+        if fingerprint is not None and filtered_ddf is not df:
+            register_fingerprint(filtered_ddf, fingerprint)
+        return filtered_ddf
+    if df.empty:
+        return df
+
+    mask = compile_filter_mask(df, expr)
+    if mask is None or mask.all():
+        return df
+    filtered_df = register_selection(df[mask], df, np.flatnonzero(mask))
+    fingerprint = _filter_fingerprint(df, expr)
+    if fingerprint is not None:
+        register_fingerprint(filtered_df, fingerprint)
+    return filtered_df
+
+def _lazy_leaf_mask(ddf: dd.DataFrame, leaf: Dict[str, Any]):
+    series = ddf[leaf["column"]]
+    if leaf["type"] == "numeric_range":
+        min_val, max_val = leaf["range"]
+        return (series >= min_val) & (series <= max_val)
+    elif leaf["type"] == "categorical_multiselect":
+        selected_values = leaf["values"]
+        condition = series.isin([v for v in selected_values if pd.notna(v)])
+        if any(pd.isna(val) for val in selected_values):
+            condition = condition | series.isna()
+        return condition
+    elif leaf["type"] == "datetime_range":
+        start_date, end_date = leaf["range"]
+        if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            series = dd.to_datetime(series)
+        return (series >= start_date) & (series <= end_date)
+    return None
+
+def _filter_lazy(ddf: dd.DataFrame, expr: Dict[str, Any]) -> dd.DataFrame:
+    """
+    Versión perezosa de get_filtered_df: combina todos los filtros en una única
+    máscara que Dask evalúa partición a partición.
+    """
+    def _combine(masks, combine_fn):
+        masks = [m for m in masks if m is not None]
+        if not masks:
+            return None
+        result = masks[0]
+        for mask in masks[1:]:
+            result = combine_fn(result, mask)
+        return result
 
-    filtered_df = df.copy()
+    mask = _fold_filter_expr(
+        expr,
+        leaf_fn=lambda leaf: _lazy_leaf_mask(ddf, leaf),
+        and_fn=lambda masks: _combine(masks, lambda a, b: a & b),
+        or_fn=lambda masks: _combine(masks, lambda a, b: a | b),
+        not_fn=lambda mask: None if mask is None else ~mask
+    )
+    return ddf if mask is None else ddf[mask]
 
-    for col, config in filter_configs.items():
-        if config["type"] == "numeric_range":
-            min_val, max_val = config["range"]
-            filtered_df = filtered_df[(filtered_df[col] >= min_val) & (filtered_df[col] <= max_val)]
+def _arrow_type_accepts(arrow_type: pa.DataType, config: dict) -> bool:
+    """Indica si un filtro puede traducirse con seguridad al tipo Arrow de la columna."""
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if config["type"] == "numeric_range":
+        return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type)
+    if config["type"] == "datetime_range":
+        # Las columnas con zona horaria se filtran solo en memoria
+        return (pa.types.is_timestamp(arrow_type) and arrow_type.tz is None) or pa.types.is_date(arrow_type)
+    if config["type"] == "categorical_multiselect":
+        values = [v for v in config["values"] if pd.notna(v)]
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return all(isinstance(v, str) for v in values)
+        if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+            return all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values)
+        if pa.types.is_boolean(arrow_type):
+            return all(isinstance(v, (bool, np.bool_)) for v in values)
+    return False
+
+def _arrow_leaf_expression(leaf: Dict[str, Any], schema: Optional[pa.Schema]) -> Optional[ds.Expression]:
+    col = leaf["column"]
+    if schema is not None:
+        if col not in schema.names or not _arrow_type_accepts(schema.field(col).type, leaf):
+            return None
+    field = ds.field(col)
+    if leaf["type"] == "numeric_range":
+        min_val, max_val = leaf["range"]
+        return (field >= pa.scalar(float(min_val))) & (field <= pa.scalar(float(max_val)))
+    elif leaf["type"] == "categorical_multiselect":
+        selected_values = leaf["values"]
+        non_nan_values = [v for v in selected_values if pd.notna(v)]
+        is_nan_selected = len(non_nan_values) < len(selected_values)
+        if not non_nan_values:
+            # isin([]) no tiene tipo y Arrow lo rechaza frente a la columna
+            return field.is_null(nan_is_null=True) if is_nan_selected else ds.scalar(False)
+        condition = field.isin(non_nan_values)
+        if is_nan_selected:
+            condition = condition | field.is_null(nan_is_null=True)
+        return condition
+    elif leaf["type"] == "datetime_range":
+        start_date, end_date = leaf["range"]
+        return (field >= pa.scalar(pd.Timestamp(start_date).to_pydatetime())) & \
+               (field <= pa.scalar(pd.Timestamp(end_date).to_pydatetime()))
+    return None
+
+def build_arrow_filter(filter_configs: dict, schema: Optional[pa.Schema] = None) -> Optional[ds.Expression]:
+    """
+    Traduce las configuraciones de filtro de apply_filters_ui (o un árbol
+    AND/OR/NOT) a una expresión de pyarrow.dataset para empujarla a la
+    lectura de Parquet.
+    
+    La traducción es conservadora: los filtros que no pueden expresarse con
+    seguridad para el tipo de la columna se omiten (get_filtered_df los aplica
+    después en memoria), así que la expresión nunca descarta filas válidas.
+    Un OR con alguna rama no traducible y los NOT (Arrow propaga los nulos de
+    forma distinta a pandas) no se empujan.
+    
+    Args:
+        filter_configs: Configuraciones de filtro o árbol de filtros
+        schema: Esquema Arrow del dataset (si se conoce)
         
-        elif config["type"] == "categorical_multiselect":
-            selected_values = config["values"]
-            # Manejar NaNs si fueron una opción seleccionable
-            if any(pd.isna(val) for val in selected_values):
-                # Crear una máscara que incluya NaNs si np.nan está en selected_values
-                # y también incluya los no-NaNs seleccionados.
-                is_nan_selected = np.nan in selected_values
-                non_nan_selected_values = [v for v in selected_values if pd.notna(v)]
-                
-                mask = pd.Series([False] * len(filtered_df), index=filtered_df.index)
-                if non_nan_selected_values:
-                    mask = mask | filtered_df[col].isin(non_nan_selected_values)
-                if is_nan_selected:
-                    mask = mask | filtered_df[col].isna()
-                filtered_df = filtered_df[mask]
-            else:
-                filtered_df = filtered_df[filtered_df[col].isin(selected_values)]
-
-        elif config["type"] == "datetime_range":
-            start_date, end_date = config["range"]
-            # Asegurarse que la columna es datetime
-            if not pd.api.types.is_datetime64_any_dtype(filtered_df[col]):
-                try:
-                    filtered_df[col] = pd.to_datetime(filtered_df[col])
-                except Exception:
-                    st.warning(f"No se pudo convertir la columna {col} a datetime para filtrar.")
-                    continue
-            filtered_df = filtered_df[(filtered_df[col] >= start_date) & (filtered_df[col] <= end_date)]
+    Returns:
+        ds.Expression o None si ningún filtro es traducible
+    """
+    expr = normalize_filter_expr(filter_configs)
+    if expr is None:
+        return None
+
+    def _and(expressions):
+        expressions = [e for e in expressions if e is not None]
+        if not expressions:
+            return None
+        result = expressions[0]
+        for expression in expressions[1:]:
+            result = result & expression
+        return result
+
+    def _or(expressions):
+        if any(e is None for e in expressions):
+            return None
+        result = expressions[0]
+        for expression in expressions[1:]:
+            result = result | expression
+        return result
+
+    return _fold_filter_expr(
+        expr,
+        leaf_fn=lambda leaf: _arrow_leaf_expression(leaf, schema),
+        and_fn=_and,
+        or_fn=_or,
+        not_fn=lambda _: None
+    )
+
+def _mongo_value(value: Any) -> Any:
+    """Convierte escalares de numpy/pandas a tipos que BSON sabe codificar."""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _mongo_leaf_query(leaf: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    col = leaf["column"]
+    if leaf["type"] == "numeric_range":
+        min_val, max_val = leaf["range"]
+        return {col: {"$gte": float(min_val), "$lte": float(max_val)}}
+    elif leaf["type"] == "categorical_multiselect":
+        selected_values = leaf["values"]
+        values = [_mongo_value(v) for v in selected_values if pd.notna(v)]
+        if any(pd.isna(val) for val in selected_values):
+            # En MongoDB, None coincide con nulos y con campos ausentes
+            values.append(None)
+        return {col: {"$in": values}}
+    elif leaf["type"] == "datetime_range":
+        start_date, end_date = leaf["range"]
+        return {col: {"$gte": pd.Timestamp(start_date).to_pydatetime(),
+                      "$lte": pd.Timestamp(end_date).to_pydatetime()}}
+    return None
+
+def build_mongo_query(filter_configs: dict) -> Dict[str, Any]:
+    """
+    Traduce las configuraciones de filtro de apply_filters_ui (o un árbol
+    AND/OR/NOT) a un filtro de consulta de MongoDB para empujarlo a find().
     
-    return filtered_df
\ No newline at end of file
+    Igual que build_arrow_filter, la traducción es conservadora: las hojas que
+    no se pueden traducir, los OR con alguna rama no traducible y los NOT se
+    omiten, así que la consulta nunca descarta documentos válidos
+    (get_filtered_df da después el resultado exacto).
+    
+    Args:
+        filter_configs: Configuraciones de filtro o árbol de filtros
+        
+    Returns:
+        dict: Filtro de MongoDB ({} si ningún filtro es traducible)
+    """
+    expr = normalize_filter_expr(filter_configs)
+    if expr is None:
+        return {}
+
+    def _and(queries):
+        queries = [q for q in queries if q is not None]
+        if not queries:
+            return None
+        return queries[0] if len(queries) == 1 else {"$and": queries}
+
+    def _or(queries):
+        if any(q is None for q in queries):
+            return None
+        return {"$or": queries}
+
+    query = _fold_filter_expr(
+        expr,
+        leaf_fn=_mongo_leaf_query,
+        and_fn=_and,
+        or_fn=_or,
+        not_fn=lambda _: None
+    )
+    return query or {}
@@ -0,0 +1,145 @@
+# utils/indexes.py
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUByteCache, known_fingerprint
+
+# Por debajo de este número de filas comparar la columna entera es más barato
+# que construir y consultar el índice.
+RANGE_INDEX_MIN_ROWS = 100_000
+RANGE_INDEX_CACHE_BYTES = 1024**3
+
+_range_index_cache = LRUByteCache(max_bytes=RANGE_INDEX_CACHE_BYTES)
+
+RangeBound = Union[float, int, pd.Timestamp]
+
+
+class SortedRangeIndex:
+    """
+    Índice ordenado de una columna numérica o de fechas: la permutación que
+    ordena la columna (argsort) y los valores ordenados. Un filtro de rango se
+    resuelve con dos búsquedas binarias (searchsorted), O(log n + k).
+    Los nulos (NaN/NaT) no se indexan, igual que no cumplen ninguna comparación.
+    """
+
+    def __init__(self, values: np.ndarray, n_rows: int, datetime_unit: Optional[str] = None):
+        valid_positions = np.flatnonzero(~np.isnan(values)) if values.dtype.kind == 'f' else None
+        if valid_positions is not None and len(valid_positions) < len(values):
+            order = valid_positions[np.argsort(values[valid_positions], kind='stable')]
+        else:
+            order = np.argsort(values, kind='stable')
+        self.order = order.astype(np.int64, copy=False)
+        self.sorted_values = values[self.order]
+        self.n_rows = n_rows
+        self.datetime_unit = datetime_unit
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> Optional["SortedRangeIndex"]:
+        """Construye el índice, o devuelve None si el tipo de la columna no es indexable."""
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in 'iuf':
+            return cls(series.to_numpy(), len(series))
+        if isinstance(dtype, np.dtype) and dtype.kind == 'M':
+            # Fechas sin zona horaria: se indexan como int64 y los NaT se excluyen
+            unit = np.datetime_data(dtype)[0]
+            values = series.to_numpy().view(np.int64)
+            valid_positions = np.flatnonzero(values != np.iinfo(np.int64).min)
+            index = cls(values[valid_positions], len(series), datetime_unit=unit)
+            index.order = valid_positions[index.order]
+            return index
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.order.nbytes + self.sorted_values.nbytes)
+
+    def _bound(self, value: RangeBound):
+        if self.datetime_unit is not None:
+            # .value siempre está en ns; asm8 conserva la unidad del índice
+            return int(pd.Timestamp(value).as_unit(self.datetime_unit).asm8.view(np.int64))
+        return value
+
+    def searchsorted(self, value: RangeBound, side: str = 'left') -> int:
+        """Posición de `value` dentro de los valores ordenados (como np.searchsorted)."""
+        return int(np.searchsorted(self.sorted_values, self._bound(value), side=side))
+
+    def range_slice(self, min_val: RangeBound, max_val: RangeBound) -> Tuple[int, int]:
+        """Posiciones [inicio, fin) dentro del orden para min_val <= valor <= max_val."""
+        start = np.searchsorted(self.sorted_values, self._bound(min_val), side='left')
+        end = np.searchsorted(self.sorted_values, self._bound(max_val), side='right')
+        return int(start), int(max(start, end))
+
+    def range_positions(self, min_val: RangeBound, max_val: RangeBound) -> np.ndarray:
+        """Posiciones de fila (en orden de valor) que cumplen el rango. Es una vista, sin copia."""
+        start, end = self.range_slice(min_val, max_val)
+        return self.order[start:end]
+
+    def range_mask(self, min_val: RangeBound, max_val: RangeBound) -> np.ndarray:
+        """Máscara booleana de longitud n_rows para el rango."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.range_positions(min_val, max_val)] = True
+        return mask
+
+    def range_bitmap(self, min_val: RangeBound, max_val: RangeBound) -> np.ndarray:
+        """Igual que range_mask pero empaquetada (np.packbits, 1 bit por fila)."""
+        return np.packbits(self.range_mask(min_val, max_val))
+
+
+def get_range_index(df: pd.DataFrame, col: str, fingerprint: Optional[str] = None) -> Optional[SortedRangeIndex]:
+    """
+    Devuelve el índice ordenado de la columna, construyéndolo una sola vez por
+    versión del dataset. Solo se usa para datasets con huella conocida.
+
+    Args:
+        df: DataFrame de pandas
+        col: Columna numérica o de fechas (sin zona horaria)
+        fingerprint: Huella del dataset (por defecto, la registrada para df)
+
+    Returns:
+        SortedRangeIndex o None si la columna no es indexable o df no tiene huella
+    """
+    fingerprint = fingerprint or known_fingerprint(df)
+    if fingerprint is None:
+        return None
+    key = (fingerprint, col)
+    index = _range_index_cache.get(key)
+    if index is None:
+        index = SortedRangeIndex.from_series(df[col])
+        if index is None:
+            return None
+        _range_index_cache.put(key, index)
+    return index
+
+
+def get_datetime_index(df: pd.DataFrame, col: str, fingerprint: Optional[str] = None) -> SortedRangeIndex:
+    """
+    Índice ordenado de una columna de fechas. Si la columna es de texto se
+    parsea con pd.to_datetime (sin modificar df); los valores no parseables
+    quedan como NaT y no se indexan. Se cachea si df tiene huella.
+
+    Args:
+        df: DataFrame de pandas
+        col: Columna de fechas (datetime64 o texto)
+        fingerprint: Huella del dataset (por defecto, la registrada para df)
+
+    Returns:
+        SortedRangeIndex con datetime_unit definido
+    """
+    series = df[col]
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == 'M':
+        return get_range_index(df, col, fingerprint) or SortedRangeIndex.from_series(series)
+
+    # Texto o fechas con zona horaria: se convierten a fechas UTC sin zona, una sola vez
+    fingerprint = fingerprint or known_fingerprint(df)
+    key = (fingerprint, col, "datetime")
+    index = _range_index_cache.get(key) if fingerprint is not None else None
+    if index is None:
+        parsed = pd.to_datetime(series, errors='coerce', utc=isinstance(series.dtype, pd.DatetimeTZDtype))
+        if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+            parsed = parsed.dt.tz_convert(None)
+        index = SortedRangeIndex.from_series(parsed)
+        if fingerprint is not None:
+            _range_index_cache.put(key, index)
+    return index
@@ -0,0 +1,403 @@
+# utils/lazy.py
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import dask
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from utils.cache import LRUByteCache, hash_key, known_fingerprint, register_fingerprint
+from utils.summary import merge_summaries, summarize_numeric
+
+# Por encima de este tamaño en disco, load_data usa el modo perezoso (Dask)
+LAZY_THRESHOLD_BYTES = int(os.environ.get("DASHBOARD_LAZY_THRESHOLD_BYTES", 2 * 1024**3))
+# Tamaño de bloque al leer CSV con Dask
+LAZY_CSV_BLOCKSIZE = "64MB"
+# Máximo de filas que se materializan en pandas para gráficos que necesitan filas crudas
+LAZY_MATERIALIZE_ROWS = 200_000
+# Máximo de valores distintos para ofrecer un filtro de selección múltiple
+LAZY_MAX_FILTER_OPTIONS = 1_000
+
+AnyFrame = Union[pd.DataFrame, dd.DataFrame]
+
+# Estadísticas de filtros y conteos de filas de DataFrames perezosos, por
+# clave estable entre reruns (ver lazy_frame_key): cada una es una pasada
+# completa sobre la fuente
+_lazy_stats_cache = LRUByteCache(max_bytes=64 * 1024**2, sizeof=lambda _: 64 * 1024)
+
+
+def is_lazy(df: Any) -> bool:
+    """Indica si el DataFrame es perezoso (Dask) en lugar de pandas."""
+    return isinstance(df, dd.DataFrame)
+
+
+def is_empty(df: Optional[AnyFrame]) -> bool:
+    """Equivalente a df.empty que también funciona con DataFrames de Dask."""
+    if df is None:
+        return True
+    if not is_lazy(df):
+        return df.empty
+    if len(df.columns) == 0:
+        return True
+    key = hash_key("lazy_is_empty", lazy_frame_key(df))
+    empty = _lazy_stats_cache.get(key)
+    if empty is None:
+        # Solo lee particiones hasta encontrar una fila (una vez por versión del dataset)
+        empty = len(df.head(1, npartitions=-1, compute=True)) == 0
+        _lazy_stats_cache.put(key, empty)
+    return empty
+
+
+# Particiones que se leen para estimar las filas de un DataFrame perezoso sin metadatos
+LAZY_COUNT_SAMPLE_PARTITIONS = 3
+
+
+def lazy_row_count(ddf: dd.DataFrame) -> Tuple[int, bool]:
+    """
+    Número de filas de un DataFrame perezoso sin recorrerlo entero.
+    Escaneos Parquet: suma de filas de los row groups según los metadatos
+    (exacta sin filtro; con filtro, cota superior de los row groups que pueden
+    cumplirlo). Resto: media de unas pocas particiones por el número de
+    particiones. Cacheado por lazy_frame_key.
+
+    Returns:
+        tuple: (filas, True si el número es exacto)
+    """
+    key = hash_key("lazy_row_count", lazy_frame_key(ddf))
+    cached = _lazy_stats_cache.get(key)
+    if cached is not None:
+        return cached
+    info = parquet_scan_info(ddf)
+    if info is not None:
+        dataset = ds.dataset(info['source'], format="parquet", partitioning="hive")
+        n_rows = sum(row_group.num_rows
+                     for fragment in dataset.get_fragments(filter=info['filter'])
+                     for piece in fragment.split_by_row_group(info['filter'], schema=dataset.schema)
+                     for row_group in piece.row_groups)
+        result = (int(n_rows), info['filter'] is None)
+    else:
+        n_parts = ddf.npartitions
+        picks = sorted(set(np.linspace(0, n_parts - 1, min(LAZY_COUNT_SAMPLE_PARTITIONS, n_parts)).astype(int)))
+        (lengths,) = dask.compute([ddf.get_partition(int(i)).shape[0] for i in picks])
+        result = (int(round(np.mean(lengths) * n_parts)), len(picks) == n_parts)
+    _lazy_stats_cache.put(key, result)
+    return result
+
+
+def row_count_label(df: AnyFrame) -> Union[int, str]:
+    """Filas para mostrar en la UI: exactas en pandas, '≈N' en DataFrames perezosos estimados."""
+    if not is_lazy(df):
+        return len(df)
+    n_rows, exact = lazy_row_count(df)
+    return n_rows if exact else f"≈{n_rows:,}"
+
+
+def source_size(path: Union[str, List[str]]) -> int:
+    """Tamaño total en bytes de una ruta (archivo o directorio) o lista de rutas."""
+    if isinstance(path, list):
+        return sum(source_size(p) for p in path)
+    if os.path.isdir(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+    return os.path.getsize(path)
+
+
+def read_lazy(path: Union[str, List[str]]) -> dd.DataFrame:
+    """
+    Abre una fuente CSV/Parquet (archivo, directorio o lista) como DataFrame de Dask.
+
+    Args:
+        path: Ruta o lista de rutas locales
+
+    Returns:
+        dd.DataFrame: DataFrame perezoso particionado
+    """
+    first = path[0] if isinstance(path, list) else path
+    if os.path.isdir(first) or first.endswith('.parquet'):
+        return scan_parquet(path)
+    elif first.endswith('.csv'):
+        return dd.read_csv(path, blocksize=LAZY_CSV_BLOCKSIZE)
+    else:
+        raise ValueError("Formato de archivo no soportado")
+
+
+# Fuentes Parquet de los DataFrames perezosos creados con scan_parquet,
+# registradas por identidad de objeto para poder re-escanear con pushdown.
+_parquet_scans: Dict[int, Dict[str, Any]] = {}
+_parquet_scans_lock = threading.Lock()
+
+
+def _read_parquet_fragment(fragment, columns=None, filter_expr=None, schema=None) -> pd.DataFrame:
+    return fragment.to_table(columns=columns, filter=filter_expr, schema=schema).to_pandas()
+
+
+def scan_parquet(
+    source: Union[str, List[str]],
+    filter_expr: Optional[ds.Expression] = None,
+    columns: Optional[List[str]] = None
+) -> dd.DataFrame:
+    """
+    Abre un dataset Parquet (particionado o no) como DataFrame de Dask con
+    pushdown de predicados y proyección: las particiones y los row groups cuyas
+    estadísticas no pueden cumplir `filter_expr` no se leen, y solo se leen las
+    columnas pedidas. Cada row group restante es una partición de Dask.
+
+    Args:
+        source: Archivo, directorio o lista de archivos Parquet
+        filter_expr: Expresión de pyarrow.dataset (ver filters.build_arrow_filter)
+        columns: Columnas a leer (None = todas)
+
+    Returns:
+        dd.DataFrame: DataFrame perezoso
+    """
+    dataset = ds.dataset(source, format="parquet", partitioning="hive")
+    schema = dataset.schema
+    if columns is not None:
+        columns = [col for col in dict.fromkeys(columns) if col in schema.names]
+
+    fragments = [
+        row_group
+        for fragment in dataset.get_fragments(filter=filter_expr)
+        for row_group in fragment.split_by_row_group(filter_expr, schema=schema)
+    ]
+    projected_schema = schema if columns is None else pa.schema([schema.field(col) for col in columns])
+    meta = projected_schema.empty_table().to_pandas()
+    if fragments:
+        ddf = dd.from_map(_read_parquet_fragment, fragments, columns=columns, filter_expr=filter_expr,
+                          schema=schema, meta=meta, label="read-parquet-pushdown", enforce_metadata=False)
+    else:
+        ddf = dd.from_pandas(meta, npartitions=1)
+
+    key = id(ddf)
+    with _parquet_scans_lock:
+        _parquet_scans[key] = {'source': source, 'schema': schema, 'filter': filter_expr, 'columns': columns}
+    weakref.finalize(ddf, _forget_parquet_scan, key)
+    return ddf
+
+
+def _forget_parquet_scan(key: int) -> None:
+    with _parquet_scans_lock:
+        _parquet_scans.pop(key, None)
+
+
+def parquet_scan_info(ddf: Any) -> Optional[Dict[str, Any]]:
+    """Devuelve la fuente/filtro/columnas si el DataFrame viene directamente de scan_parquet."""
+    with _parquet_scans_lock:
+        return _parquet_scans.get(id(ddf))
+
+
+def rescan_parquet(
+    ddf: dd.DataFrame,
+    filter_expr: Optional[ds.Expression] = None,
+    columns: Optional[List[str]] = None
+) -> dd.DataFrame:
+    """
+    Vuelve a escanear la fuente Parquet de `ddf` añadiendo un filtro (AND con el
+    existente) y/o reduciendo las columnas. Si `ddf` no viene de scan_parquet
+    se devuelve sin cambios (salvo la proyección de columnas).
+    """
+    info = parquet_scan_info(ddf)
+    if info is None:
+        return ddf if columns is None else ddf[[col for col in columns if col in ddf.columns]]
+    if filter_expr is None and columns is None:
+        return ddf
+    combined_filter = info['filter']
+    if filter_expr is not None:
+        combined_filter = filter_expr if combined_filter is None else combined_filter & filter_expr
+    if columns is not None and info['columns'] is not None:
+        columns = [col for col in columns if col in info['columns']]
+    elif columns is None:
+        columns = info['columns']
+    rescanned = scan_parquet(info['source'], combined_filter, columns)
+    return register_fingerprint(rescanned, hash_key(lazy_frame_key(ddf), str(filter_expr), columns))
+
+
+def materialize(df: AnyFrame, max_rows: int = LAZY_MATERIALIZE_ROWS, random_state: int = 42) -> pd.DataFrame:
+    """
+    Convierte un DataFrame perezoso en pandas con como máximo `max_rows` filas
+    (muestra aleatoria uniforme). Los DataFrames de pandas se devuelven tal cual.
+    """
+    if not is_lazy(df):
+        return df
+    n_rows = len(df)
+    if n_rows <= max_rows:
+        return df.compute()
+    return df.sample(frac=max_rows / n_rows, random_state=random_state).compute()
+
+
+def _source_signature(path: Union[str, List[str]]) -> tuple:
+    """(bytes, última modificación) de una ruta o lista: cambia si se reescribe la fuente."""
+    paths = path if isinstance(path, list) else [path]
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files += [os.path.join(root, name) for root, _, names in os.walk(p) for name in names]
+        elif os.path.exists(p):
+            files.append(p)
+    stats = [os.stat(f) for f in files]
+    return sum(st.st_size for st in stats), max((st.st_mtime_ns for st in stats), default=0)
+
+
+def lazy_frame_key(ddf: dd.DataFrame) -> str:
+    """
+    Clave de un DataFrame perezoso estable entre reruns: su huella registrada,
+    la fuente Parquet escaneada (con filtro y columnas) o, si no, el nombre del
+    grafo de Dask (determinista para las mismas operaciones sobre la misma fuente).
+    """
+    fingerprint = known_fingerprint(ddf)
+    if fingerprint is not None:
+        return fingerprint
+    info = parquet_scan_info(ddf)
+    if info is not None:
+        return hash_key("parquet_scan", info['source'], _source_signature(info['source']),
+                        str(info['filter']), info['columns'])
+    return hash_key("dask_graph", ddf._name)
+
+
+def lazy_column_stats(
+    ddf: dd.DataFrame,
+    max_options: int = LAZY_MAX_FILTER_OPTIONS,
+    use_cache: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula en una sola pasada sobre las particiones las estadísticas que
+    necesitan los filtros: min/max de columnas numéricas y de fecha, y una
+    estimación de valores distintos para el resto. Los valores únicos solo se
+    materializan para columnas con pocos distintos. El resultado se cachea por
+    lazy_frame_key, así que los reruns no vuelven a recorrer la fuente.
+
+    Args:
+        ddf: DataFrame de Dask
+        max_options: Máximo de valores distintos para listar opciones
+        use_cache: Si es False, siempre se recorre la fuente
+
+    Returns:
+        dict: Columna -> {'min', 'max', 'unique_count', 'values'}
+    """
+    key = hash_key("lazy_column_stats", lazy_frame_key(ddf), max_options) if use_cache else None
+    stats = _lazy_stats_cache.get(key) if key else None
+    if stats is None:
+        stats = _compute_lazy_column_stats(ddf, max_options)
+        if key:
+            _lazy_stats_cache.put(key, stats)
+    return stats
+
+
+def _compute_lazy_column_stats(ddf: dd.DataFrame, max_options: int) -> Dict[str, Dict[str, Any]]:
+    tasks = {}
+    for col in ddf.columns:
+        dtype = ddf[col].dtype
+        if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+            tasks[col] = (ddf[col].min(), ddf[col].max(), ddf[col].nunique_approx())
+        else:
+            tasks[col] = (ddf[col].nunique_approx(),)
+    (computed,) = dask.compute(tasks)
+
+    stats = {}
+    low_cardinality = []
+    for col, values in computed.items():
+        if len(values) == 3:
+            stats[col] = {'min': values[0], 'max': values[1], 'unique_count': int(values[2])}
+        else:
+            stats[col] = {'unique_count': int(values[0])}
+            if values[0] <= max_options:
+                low_cardinality.append(col)
+    if low_cardinality:
+        (uniques,) = dask.compute({col: ddf[col].drop_duplicates() for col in low_cardinality})
+        for col, values in uniques.items():
+            stats[col]['values'] = values.tolist()
+    return stats
+
+
+def lazy_summary(ddf: dd.DataFrame) -> Dict[str, Any]:
+    """
+    Versión perezosa de generate_summary: construye un único grafo de Dask con
+    todas las estadísticas y lo ejecuta una vez. Las numéricas salen de un
+    resumen por partición (utils.summary) y los percentiles son aproximados.
+    """
+    numeric_cols = [col for col in ddf.columns if pd.api.types.is_numeric_dtype(ddf[col].dtype)]
+    tasks = {
+        'rows': ddf.shape[0],
+        'memory_usage': ddf.memory_usage(deep=True).sum(),
+        'null_count': ddf.isnull().sum(),
+        'unique_count': {col: ddf[col].nunique_approx() for col in ddf.columns},
+    }
+    if numeric_cols:
+        # Un resumen combinable por partición (una pasada por bloques) unido al final
+        partials = [dask.delayed(summarize_numeric)(part, numeric_cols)
+                    for part in ddf[numeric_cols].to_delayed()]
+        tasks['numeric'] = dask.delayed(merge_summaries)(partials)
+    (result,) = dask.compute(tasks)
+    numeric_stats = result['numeric'].result() if numeric_cols else {}
+
+    summary = {
+        'general': {
+            'rows': int(result['rows']),
+            'columns': len(ddf.columns),
+            'memory_usage': result['memory_usage'] / 1024**2  # MB
+        },
+        'columns': {}
+    }
+    for col in ddf.columns:
+        col_info = {
+            'type': str(ddf[col].dtype),
+            'null_count': int(result['null_count'][col]),
+            'unique_count': int(result['unique_count'][col])
+        }
+        if col in numeric_cols:
+            col_info.update({key: numeric_stats[col][key] for key in ('min', 'max', 'mean', 'std', 'percentiles')})
+        summary['columns'][col] = col_info
+    return summary
+
+
+def sample_lazy(ddf: dd.DataFrame, method: str, size: Union[int, float], random_state: int = 42, **kwargs) -> dd.DataFrame:
+    """
+    Muestreo sobre particiones de Dask. El resultado sigue siendo perezoso.
+
+    Args:
+        ddf: DataFrame de Dask
+        method: 'random', 'stratified' o 'temporal'
+        size: Proporción (float) o número de filas (int; por estrato en 'stratified')
+        random_state: Semilla
+
+    Returns:
+        dd.DataFrame: Muestra perezosa
+    """
+    if method in ("random", "temporal"):
+        frac = size if isinstance(size, float) else min(1.0, size / max(len(ddf), 1))
+        sampled = ddf.sample(frac=frac, random_state=random_state)
+        if method == "temporal":
+            date_col = kwargs['date_column']
+            if not pd.api.types.is_datetime64_any_dtype(sampled[date_col].dtype):
+                sampled = sampled.assign(**{date_col: dd.to_datetime(sampled[date_col])})
+        return sampled
+
+    strata = kwargs['strata']
+    if isinstance(size, float):
+        # Muestreo proporcional: cada partición muestrea la misma fracción por estrato
+        return ddf.map_partitions(
+            lambda part: part.groupby(strata, group_keys=False, observed=True).sample(frac=size, random_state=random_state),
+            meta=ddf._meta
+        )
+
+    # n filas por estrato: fracción de Bernoulli por estrato a partir de los conteos globales
+    # (o las fracciones ya calculadas por el llamador, p.ej. con otra asignación)
+    fractions = kwargs.get('fractions')
+    if fractions is None:
+        counts = ddf[strata].value_counts().compute()
+        fractions = (size / counts).clip(upper=1.0)
+
+    def _bernoulli_partition(part: pd.DataFrame, partition_info=None) -> pd.DataFrame:
+        seed = random_state + (partition_info['number'] if partition_info else 0)
+        rng = np.random.default_rng(seed)
+        keep = rng.random(len(part)) < part[strata].map(fractions).fillna(0).to_numpy(dtype=float)
+        return part[keep]
+
+    return ddf.map_partitions(_bernoulli_partition, meta=ddf._meta)
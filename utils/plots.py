@@ -2,12 +2,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.visualizations import create_visualization, create_coupled_plot, export_plot
+import plotly.graph_objects as go
+from utils.visualizations import create_visualization, create_coupled_plot, progressive_visualization, supports_progressive
+from utils.export import EXPORT_FORMATS, EXPORT_MIME_TYPES, get_export_service
+from utils.lazy import is_empty, is_lazy
+from utils.decimation import DEFAULT_POINT_BUDGET, RENDER_MODES
+from utils.aggregations import CROSSTAB_TOP_K
 
 def get_bar_chart_controls(df_columns, key_prefix=""):
     params = {}
     params['orientation'] = st.sidebar.radio(f"Orientación {key_prefix}", ['v', 'h'], index=0, key=f"{key_prefix}bar_orient") # index=0 para default 'v'
     params['barmode'] = st.sidebar.selectbox(f"Modo de Barra {key_prefix}", ['relative', 'group', 'overlay'], key=f"{key_prefix}bar_mode")
+    params['bar_agg'] = st.sidebar.selectbox(f"Agregación de Y {key_prefix}", ['sum', 'mean'], format_func=lambda x: 'Suma' if x == 'sum' else 'Media', key=f"{key_prefix}bar_agg")
+    params['max_categories'] = st.sidebar.number_input(f"Máx. categorías en frecuencias (0 = todas) {key_prefix}", 0, 10000, 0, 5, help="El resto de categorías se agrupa en 'Otros'", key=f"{key_prefix}bar_max_categories")
     return params
 
 def get_histogram_controls(key_prefix=""):
@@ -33,9 +40,93 @@ def get_radar_controls(df_columns, key_prefix=""):
     params = {}
     return params
 
+RENDER_MODE_LABELS = {"auto": "Automático", "all": "Todos los puntos", "decimated": "Submuestreo por densidad", "density": "Mapa de densidad"}
+
+def get_large_data_controls(key_prefix=""):
+    params = {}
+    params['point_budget'] = st.sidebar.number_input(f"Presupuesto de Puntos {key_prefix}", 1_000, 1_000_000, DEFAULT_POINT_BUDGET, 5_000, key=f"{key_prefix}point_budget")
+    params['large_data_mode'] = st.sidebar.selectbox(f"Modo con Muchos Datos {key_prefix}", RENDER_MODES, format_func=lambda x: RENDER_MODE_LABELS[x], key=f"{key_prefix}large_data_mode")
+    return params
+
+def describe_render_mode(fig):
+    """Texto para la UI con el modo de dibujo que guardó create_visualization en fig.layout.meta."""
+    meta = fig.layout.meta if isinstance(fig.layout.meta, dict) else None
+    if not meta or meta.get("render_mode") in (None, "all"):
+        return None
+    if meta["render_mode"] == "decimated":
+        note = f"Submuestreo por densidad: {meta['points']:,} puntos dibujados de {meta['rows']:,} filas (se conservan extremos y zonas poco densas)."
+    else:
+        note = f"Mapa de densidad: {meta['rows']:,} filas agregadas en {meta['points']:,} celdas."
+    trendline = meta.get("trendline")
+    if trendline == "off":
+        note += " Línea de tendencia desactivada: con facetas solo se ajusta al dibujar todos los puntos."
+    elif trendline:
+        note += f" Línea de tendencia ajustada sobre una muestra aleatoria uniforme de {trendline:,} filas."
+    return note
+
+
+def _export_jobs():
+    if 'export_jobs' not in st.session_state:
+        st.session_state.export_jobs = {} # clave -> (Future, nombre de archivo)
+    return st.session_state.export_jobs
+
+def _render_export_job(container, job_key):
+    """Muestra el estado de una exportación en segundo plano y, al terminar, su descarga."""
+    job = _export_jobs().get(job_key)
+    if job is None: return
+    future, file_name = job
+    if not future.done():
+        container.info("Exportando en segundo plano... puedes seguir usando el dashboard.")
+        container.button("Actualizar estado", key=f"{job_key}refresh_export")
+    elif future.exception() is not None:
+        container.error(f"Error al exportar: {future.exception()}")
+    elif not future.result():
+        container.error("No se pudo generar archivo.")
+    else:
+        extension = file_name.rsplit(".", 1)[-1]
+        container.download_button(label=f"Descargar {file_name}", data=future.result(), file_name=file_name,
+                                  mime=EXPORT_MIME_TYPES.get(extension, "application/octet-stream"), key=f"{job_key}download_export")
+
+def render_export_controls(export_container, fig, name, key_prefix=""):
+    """Controles de exportación de una figura: descarga directa (uno o varios formatos) o añadir a la cola."""
+    get_export_service().warm_up() # Arranca Kaleido antes de que se pida la primera exportación
+    col1_exp, col2_exp = export_container.columns(2)
+    export_formats = col1_exp.multiselect("Formatos", EXPORT_FORMATS, default=["png"], key=f"{key_prefix}export_formats")
+    dpi_val = 300
+    if set(export_formats) & {"png", "jpeg"}: dpi_val = col2_exp.slider("DPI/Escala", 100, 600, 300, 50, key=f"{key_prefix}export_dpi")
+    col_prepare, col_queue = export_container.columns(2)
+    if col_prepare.button("Preparar Descarga", key=f"{key_prefix}prepare_export", disabled=not export_formats):
+        service = get_export_service()
+        if len(export_formats) == 1:
+            job = (service.render(fig, format=export_formats[0], dpi=dpi_val), f"{name}.{export_formats[0]}")
+        else:
+            job = (service.export_batch([(name, fig)], export_formats, dpi=dpi_val), f"{name}.zip")
+        _export_jobs()[key_prefix] = job
+    if col_queue.button("Añadir a la cola", key=f"{key_prefix}queue_export"):
+        st.session_state.setdefault('export_queue', []).append((name, go.Figure(fig)))
+        export_container.success(f"Añadido a la cola ({len(st.session_state.export_queue)} gráficos).")
+    _render_export_job(export_container, key_prefix)
+
+def render_export_queue_ui(container):
+    """Cola de exportación por lotes: todas las figuras añadidas, en los formatos elegidos, en un zip."""
+    export_queue = st.session_state.get('export_queue', [])
+    if not export_queue and 'queue' not in _export_jobs(): return
+    queue_expander = container.expander(f"Cola de Exportación ({len(export_queue)} gráficos)")
+    for i, (name, _) in enumerate(export_queue, start=1):
+        queue_expander.text(f"{i:02d}. {name}")
+    col1_exp, col2_exp = queue_expander.columns(2)
+    export_formats = col1_exp.multiselect("Formatos", EXPORT_FORMATS, default=["png"], key="queue_export_formats")
+    dpi_val = col2_exp.slider("DPI/Escala", 100, 600, 300, 50, key="queue_export_dpi")
+    col_export, col_clear = queue_expander.columns(2)
+    if col_export.button("Exportar Lote (ZIP)", key="queue_prepare_export", disabled=not (export_queue and export_formats)):
+        _export_jobs()['queue'] = (get_export_service().export_batch(export_queue, export_formats, dpi=dpi_val), "graficos.zip")
+    if col_clear.button("Vaciar Cola", key="queue_clear"):
+        st.session_state.export_queue = []
+    _render_export_job(queue_expander, 'queue')
+
 
 def render_main_plot_ui(df: pd.DataFrame, plot_area_container):
-    if df is None or df.empty:
+    if is_empty(df):
         plot_area_container.warning("No hay datos cargados para visualizar.")
         return
 
@@ -76,12 +167,17 @@ def render_main_plot_ui(df: pd.DataFrame, plot_area_container):
         color_col = st.sidebar.selectbox("Columna para Color", [None] + all_cols, format_func=lambda x: 'Ninguna' if x is None else x, key="main_scatter_color")
         size_col = st.sidebar.selectbox("Columna para Tamaño (Numérica)", [None] + (numeric_cols if numeric_cols else all_cols), format_func=lambda x: 'Ninguno' if x is None else x, key="main_scatter_size")
         specific_params['trendline'] = st.sidebar.selectbox("Línea de Tendencia", [None, "ols", "lowess"], format_func=lambda x: 'Ninguna' if x is None else x.upper(), key="main_scatter_trend")
+        specific_params.update(get_large_data_controls())
 
     elif selected_plot_type == "heatmap_corr":
         st.sidebar.info("Heatmap de correlación usa columnas numéricas.")
+        specific_params['corr_method'] = st.sidebar.selectbox("Método de Correlación", ['pearson', 'spearman'], format_func=lambda x: x.capitalize(), key="main_corr_method")
+        specific_params['corr_columns'] = st.sidebar.multiselect("Columnas (vacío = todas)", numeric_cols, key="main_corr_columns")
     elif selected_plot_type == "heatmap_crosstab":
         x_col = st.sidebar.selectbox("Columna X (Categórica 1)", all_cols, key="main_heatc_x")
         y_col = st.sidebar.selectbox("Columna Y (Categórica 2)", all_cols, key="main_heatc_y")
+        specific_params['crosstab_top_x'] = st.sidebar.slider("Máx. categorías en X", 2, 200, CROSSTAB_TOP_K, key="main_heatc_top_x", help="El resto de categorías se agrupa en 'Otros'")
+        specific_params['crosstab_top_y'] = st.sidebar.slider("Máx. categorías en Y", 2, 200, CROSSTAB_TOP_K, key="main_heatc_top_y", help="El resto de categorías se agrupa en 'Otros'")
     elif selected_plot_type == "pie":
         x_col = st.sidebar.selectbox("Columna de Nombres (Categorías)", all_cols, key="main_pie_names")
         y_col = st.sidebar.selectbox("Columna de Valores (Numérica)", numeric_cols if numeric_cols else all_cols, key="main_pie_values")
@@ -93,6 +189,7 @@ def render_main_plot_ui(df: pd.DataFrame, plot_area_container):
             selected_dimensions = st.sidebar.multiselect("Dimensiones (Numéricas)", numeric_cols, default=default_dims, key="main_pairplot_dims")
             specific_params['dimensions'] = selected_dimensions
             color_col = st.sidebar.selectbox("Columna para Color (Hue)", [None] + all_cols, format_func=lambda x: 'Ninguna' if x is None else x, key="main_pairplot_color")
+            specific_params.update(get_large_data_controls())
     elif selected_plot_type == "slope":
         color_col = st.sidebar.selectbox("Columna de Categorías/Entidades", all_cols, key="main_slope_entity")
         x_col = st.sidebar.selectbox("Columna de Período/Condición (2 valores)", all_cols, key="main_slope_period")
@@ -108,33 +205,35 @@ def render_main_plot_ui(df: pd.DataFrame, plot_area_container):
         x_col = st.sidebar.selectbox("Columna X (Categoría)", all_cols, key="main_divbar_x")
         y_col = st.sidebar.selectbox("Columna Y (Valor Numérico)", numeric_cols if numeric_cols else all_cols, key="main_divbar_y")
 
-    if not df.empty:
+    if not is_empty(df):
         ready_to_plot = True # Simplificado, create_visualization maneja columnas faltantes
         if ready_to_plot:
-            fig = create_visualization(df, selected_plot_type, x=x_col, y=y_col, y2=y2_col, color=color_col, size=size_col, **specific_params)
+            plot_params = dict(x=x_col, y=y_col, y2=y2_col, color=color_col, size=size_col, **specific_params)
+            progressive = supports_progressive(selected_plot_type, **plot_params) and st.sidebar.checkbox(
+                "Agregación progresiva", True, key="main_progressive", help="En tablas grandes dibuja primero una estimación con el 1% y el 10% de las filas (con intervalos de confianza) y después el resultado exacto. En modo perezoso (Dask) la muestra son particiones completas.")
+            chart_slot, progress_slot = plot_area_container.empty(), plot_area_container.empty()
+            if progressive:
+                for fraction, fig in progressive_visualization(df, selected_plot_type, **plot_params):
+                    if fraction < 1 and fig.data:
+                        chart_slot.plotly_chart(fig, use_container_width=True)
+                        sample_label = "una muestra de particiones" if is_lazy(df) else f"el {fraction:.0%} de las filas"
+                        progress_slot.caption(f"Estimación con {sample_label}; calculando el resultado exacto...")
+                progress_slot.empty()
+            else:
+                fig = create_visualization(df, selected_plot_type, **plot_params)
             if fig.data or fig.layout.annotations:
-                plot_area_container.plotly_chart(fig, use_container_width=True)
+                chart_slot.plotly_chart(fig, use_container_width=True)
+                render_note = describe_render_mode(fig)
+                if render_note: plot_area_container.caption(render_note)
                 # Exportación
                 export_container = plot_area_container.expander("Exportar Gráfico Principal")
-                col1_exp, col2_exp = export_container.columns(2)
-                export_format = col1_exp.selectbox("Formato", ["png", "svg", "pdf", "jpeg"], key="main_export_format")
-                dpi_val = 300
-                if export_format in ["png", "jpeg"]: dpi_val = col2_exp.slider("DPI/Escala", 100, 600, 300, 50, key="main_export_dpi")
-                if export_container.button("Preparar Descarga", key="main_prepare_export"):
-                    try:
-                        fig_bytes = export_plot(fig, format=export_format, dpi=dpi_val)
-                        if fig_bytes:
-                            mime = f"image/{export_format}" if export_format != "pdf" else "application/pdf"
-                            if export_format == "svg": mime = "image/svg+xml"
-                            export_container.download_button(label=f"Descargar como {export_format.upper()}", data=fig_bytes, file_name=f"grafico_{selected_plot_type}.{export_format}", mime=mime)
-                        else: export_container.error("No se pudo generar archivo.")
-                    except Exception as e: export_container.error(f"Error al exportar: {e}")
-            else: plot_area_container.info(f"No se pudo generar '{selected_plot_type}'.")
+                render_export_controls(export_container, fig, f"grafico_{selected_plot_type}", key_prefix="main_")
+            else: chart_slot.info(f"No se pudo generar '{selected_plot_type}'.")
         else: plot_area_container.info(f"Selecciona columnas para '{selected_plot_type}'.")
 
 
 def render_coupled_plot_ui(df: pd.DataFrame, plot_area_container):
-    if df is None or df.empty:
+    if is_empty(df):
         plot_area_container.warning("No hay datos cargados para visualizar.")
         return
 
@@ -161,11 +260,13 @@ def render_coupled_plot_ui(df: pd.DataFrame, plot_area_container):
         plot_configs.append(config)
 
     if st.sidebar.button("Generar Gráficos Acoplados", key="generate_coupled"):
+        st.session_state.show_coupled_plot = True # Se mantiene en los reruns (p.ej. al exportar)
+    if st.session_state.get('show_coupled_plot', False):
         if plot_configs:
             coupled_fig = create_coupled_plot(df, plot_configs, **layout_params) # Pasa layout_params aquí
             if coupled_fig.data or coupled_fig.layout.annotations:
                 plot_area_container.plotly_chart(coupled_fig, use_container_width=True)
                 # Exportación para acoplados
                 export_container_coupled = plot_area_container.expander("Exportar Gráficos Acoplados")
-                # ... (lógica de exportación similar a la de main_plot_ui) ...
+                render_export_controls(export_container_coupled, coupled_fig, "graficos_acoplados", key_prefix="coupled_")
             else: plot_area_container.error("No se pudieron generar gráficos acoplados.")
\ No newline at end of file
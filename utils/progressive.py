@@ -0,0 +1,215 @@
+# utils/progressive.py
+from statistics import NormalDist
+from typing import List, Union
+
+import dask
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUByteCache, dataset_fingerprint, hash_key, register_fingerprint
+from utils.lazy import lazy_frame_key
+
+# Agregación progresiva: los gráficos agregados se dibujan primero con un
+# prefijo aleatorio pequeño de las filas (1%, luego 10%) y se refinan hasta el
+# resultado exacto (100%). Las estimaciones intermedias llevan intervalos de
+# confianza. El prefijo sale de una permutación de filas cacheada por dataset,
+# así que cada etapa reutiliza las filas de la anterior.
+PROGRESSIVE_FRACTIONS = (0.01, 0.1, 1.0)
+# Por debajo de este número de filas el resultado exacto es inmediato
+PROGRESSIVE_MIN_ROWS = 200_000
+PROGRESSIVE_TYPES = {"bar", "pie", "radar", "diverging_bars"}
+CONFIDENCE_LEVEL = 0.95
+PERMUTATION_CACHE_BYTES = 512 * 1024**2
+# En DataFrames de Dask el prefijo es de particiones (muestreo por
+# conglomerados): cada etapa usa al menos este número de particiones, para
+# poder estimar la varianza entre ellas
+PROGRESSIVE_MIN_PARTITIONS = 2
+PARTITION_MOMENTS_CACHE_BYTES = 64 * 1024**2
+
+_permutations = LRUByteCache(max_bytes=PERMUTATION_CACHE_BYTES)
+_partition_moments = LRUByteCache(max_bytes=PARTITION_MOMENTS_CACHE_BYTES,
+                                  sizeof=lambda moments: int(moments.memory_usage(deep=True).sum()))
+
+
+def row_permutation(df: pd.DataFrame, random_state: int = 42) -> np.ndarray:
+    """Permutación aleatoria de las posiciones de df, cacheada por huella del dataset."""
+    key = (dataset_fingerprint(df), random_state)
+    permutation = _permutations.get(key)
+    if permutation is None:
+        permutation = np.random.default_rng(random_state).permutation(len(df))
+        _permutations.put(key, permutation)
+    return permutation
+
+
+def random_prefix(df: pd.DataFrame, fraction: float, random_state: int = 42) -> pd.DataFrame:
+    """
+    Muestra aleatoria simple formada por el primer `fraction` de la permutación
+    de filas. Las muestras de fracciones crecientes están anidadas.
+
+    Returns:
+        pd.DataFrame: Filas de la muestra, en el orden original de df
+    """
+    if fraction >= 1:
+        return df
+    n_sample = max(int(np.ceil(fraction * len(df))), 1)
+    positions = np.sort(row_permutation(df, random_state)[:n_sample])
+    sample = df.iloc[positions]
+    register_fingerprint(sample, hash_key("prefix", dataset_fingerprint(df), fraction, random_state))
+    return sample
+
+
+def estimate_aggregate(
+    sample: pd.DataFrame,
+    keys: List[str],
+    value_cols: Union[str, List[str]],
+    how: str,
+    population_rows: int,
+    confidence: float = CONFIDENCE_LEVEL
+) -> pd.DataFrame:
+    """
+    Estima por grupo la media o la suma de la población a partir de una muestra
+    aleatoria simple sin reemplazo, con la semiamplitud del intervalo de
+    confianza (aproximación normal, con corrección por población finita: con
+    la muestra completa el error es 0).
+
+    Args:
+        sample: Muestra (ver random_prefix)
+        keys: Columnas de agrupación (lista vacía = un único grupo)
+        value_cols: Columna o columnas numéricas a agregar
+        how: 'mean' o 'sum'
+        population_rows: Filas de la población de la que sale la muestra
+        confidence: Nivel de confianza
+
+    Returns:
+        pd.DataFrame: keys + por cada columna `col` (estimación) y `col_error`
+    """
+    if how not in ("mean", "sum"):
+        raise ValueError(f"Agregación '{how}' no soportada")
+    value_cols = [value_cols] if isinstance(value_cols, str) else list(value_cols)
+    n_sample = len(sample)
+    finite_correction = max(1 - n_sample / max(population_rows, 1), 0.0)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    subset = sample[keys + value_cols].dropna(subset=keys)
+    if keys:
+        grouped = subset.groupby(keys, observed=True, sort=True)[value_cols]
+    else:
+        grouped = subset.assign(_group=0).groupby('_group')[value_cols]
+    result = {}
+    if how == "mean":
+        n_group = grouped.count()
+        means = grouped.mean()
+        std_error = grouped.std() / np.sqrt(n_group) * np.sqrt(finite_correction)
+        for col in value_cols:
+            result[col] = means[col]
+            result[f"{col}_error"] = z * std_error[col]
+    else:
+        # Total del grupo = N * media de y·1{grupo} sobre toda la muestra
+        sums = grouped.sum()
+        sums_sq = subset[value_cols].pow(2).groupby(
+            [subset[k] for k in keys] if keys else np.zeros(len(subset)), observed=True, sort=True).sum()
+        scale = population_rows / max(n_sample, 1)
+        for col in value_cols:
+            variance = (sums_sq[col].to_numpy() - sums[col].to_numpy() ** 2 / n_sample) / max(n_sample - 1, 1)
+            result[col] = sums[col] * scale
+            result[f"{col}_error"] = z * population_rows * np.sqrt(np.clip(variance, 0, None) * finite_correction / n_sample)
+    estimates = pd.DataFrame(result)
+    return estimates.reset_index(drop=not keys)
+
+
+def partition_prefix(ddf: dd.DataFrame, fraction: float, random_state: int = 42) -> List[int]:
+    """
+    Particiones de la etapa `fraction` de un DataFrame de Dask: el primer
+    `fraction` de una permutación aleatoria de sus particiones (al menos
+    PROGRESSIVE_MIN_PARTITIONS). Las etapas de fracciones crecientes están anidadas.
+
+    Returns:
+        list: Índices de partición ordenados
+    """
+    n_parts = ddf.npartitions
+    n_sample = min(max(int(np.ceil(fraction * n_parts)), PROGRESSIVE_MIN_PARTITIONS), n_parts)
+    permutation = np.random.default_rng(random_state).permutation(n_parts)
+    return sorted(int(i) for i in permutation[:n_sample])
+
+
+def _group_moments(part: pd.DataFrame, keys: List[str], value_cols: List[str]) -> pd.DataFrame:
+    """Suma y número de valores por grupo de una partición (columnas col y col_count)."""
+    subset = part[keys + value_cols].dropna(subset=keys)
+    grouped = subset.groupby(keys if keys else np.zeros(len(subset)), observed=True, sort=True)[value_cols]
+    moments = grouped.sum().join(grouped.count().add_suffix("_count"))
+    if not keys:
+        moments.index = pd.Index([0] * len(moments), name="_group")
+    return moments
+
+
+def estimate_aggregate_partitions(
+    ddf: dd.DataFrame,
+    partitions: List[int],
+    keys: List[str],
+    value_cols: Union[str, List[str]],
+    how: str,
+    confidence: float = CONFIDENCE_LEVEL
+) -> pd.DataFrame:
+    """
+    Como estimate_aggregate, pero a partir de una muestra aleatoria de
+    particiones completas (partition_prefix) de un DataFrame de Dask. Las
+    filas de una partición no son independientes (p.ej. datos ordenados por
+    fecha), así que la varianza sale de la variación entre particiones:
+    estimador de expansión para la suma y de razón para la media, con
+    corrección por población finita de particiones e intervalos t de Student. Solo se leen las
+    particiones de la muestra; sus agregados se cachean, de modo que cada
+    etapa reutiliza los de la anterior.
+
+    Args:
+        ddf: DataFrame de Dask
+        partitions: Índices de las particiones de la muestra
+        keys: Columnas de agrupación (lista vacía = un único grupo)
+        value_cols: Columna o columnas numéricas a agregar
+        how: 'mean' o 'sum'
+        confidence: Nivel de confianza
+
+    Returns:
+        pd.DataFrame: keys + por cada columna `col` (estimación) y `col_error`
+    """
+    if how not in ("mean", "sum"):
+        raise ValueError(f"Agregación '{how}' no soportada")
+    value_cols = [value_cols] if isinstance(value_cols, str) else list(value_cols)
+    frame_key = lazy_frame_key(ddf)
+    keys_of = {i: hash_key("partition_moments", frame_key, i, keys, value_cols) for i in partitions}
+    moments = {i: _partition_moments.get(key) for i, key in keys_of.items()}
+    missing = [i for i, cached in moments.items() if cached is None]
+    if missing:
+        parts = ddf[keys + value_cols].to_delayed()
+        computed = dask.compute(*[dask.delayed(_group_moments)(parts[i], keys, value_cols) for i in missing])
+        for i, part_moments in zip(missing, computed):
+            _partition_moments.put(keys_of[i], part_moments)
+            moments[i] = part_moments
+
+    # Matriz partición x grupo (0 donde el grupo no aparece en la partición)
+    stacked = pd.concat([moments[i] for i in partitions], keys=range(len(partitions)), names=["_part"])
+    stacked = stacked.groupby(level=list(range(stacked.index.nlevels)), sort=True).sum()
+    from scipy.stats import t as student_t
+    n_sample, n_total = len(partitions), ddf.npartitions
+    finite_correction = max(1 - n_sample / n_total, 0.0)
+    # Con pocas particiones, cuantil de la t de Student en lugar del normal
+    z = student_t.ppf(0.5 + confidence / 2, df=max(n_sample - 1, 1))
+    result = {}
+    for col in value_cols:
+        sums = stacked[col].unstack(level=0, fill_value=0).reindex(columns=range(n_sample), fill_value=0)
+        counts = stacked[f"{col}_count"].unstack(level=0, fill_value=0).reindex(columns=range(n_sample), fill_value=0)
+        if how == "sum":
+            result[col] = sums.sum(axis=1) * n_total / n_sample
+            result[f"{col}_error"] = z * n_total * np.sqrt(sums.var(axis=1, ddof=1) * finite_correction / n_sample)
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = sums.sum(axis=1) / counts.sum(axis=1)
+                residuals = sums.sub(counts.mul(ratio, axis=0))
+                mean_count = counts.sum(axis=1) / n_sample
+                result[col] = ratio
+                result[f"{col}_error"] = z * np.sqrt(residuals.var(axis=1, ddof=1) * finite_correction / n_sample) \
+                    / mean_count
+    estimates = pd.DataFrame(result)
+    if keys:
+        estimates.index.names = keys
+    return estimates.reset_index(drop=not keys)
@@ -0,0 +1,165 @@
+# utils/reservoir.py
+import os
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Muestreo por reservorio durante la lectura: la fuente se recorre por bloques
+# y solo se conservan en memoria las filas de la muestra (más un bloque).
+RESERVOIR_CHUNK_ROWS = 250_000
+
+
+def _source_name(file) -> str:
+    return file if isinstance(file, str) else getattr(file, 'name', '')
+
+
+def iter_source_chunks(file: Union[str, List[str], object], chunk_rows: int = RESERVOIR_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Recorre una fuente CSV/Parquet por bloques de como mucho `chunk_rows` filas.
+
+    Args:
+        file: Ruta (archivo o directorio Parquet), lista de rutas o archivo subido
+
+    Yields:
+        pd.DataFrame: Bloques consecutivos de la fuente
+    """
+    if isinstance(file, list):
+        for item in file:
+            yield from iter_source_chunks(item, chunk_rows)
+        return
+    name = _source_name(file)
+    if name.endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunk_rows)
+    elif isinstance(file, str) and (name.endswith('.parquet') or os.path.isdir(file)):
+        dataset = ds.dataset(file, format="parquet", partitioning="hive")
+        for batch in dataset.to_batches(batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+    elif name.endswith('.parquet'):
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        raise ValueError("Formato de archivo no soportado")
+
+
+class ReservoirSampler:
+    """
+    Reservorio de tamaño fijo por "bottom-k": cada fila recibe una clave
+    aleatoria uniforme y la muestra son las k filas con menor clave, es decir,
+    una muestra aleatoria simple sin reemplazo de todo lo visto. Con `strata`
+    se mantiene un reservorio de k filas por cada valor de esa columna.
+    Las filas cuya clave no puede entrar se descartan sin copiarlas.
+    """
+
+    def __init__(self, size: int, strata: Optional[str] = None, random_state: int = 42):
+        if size <= 0:
+            raise ValueError("El tamaño del reservorio debe ser positivo")
+        self.size = int(size)
+        self.strata = strata
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(random_state)
+        self._sample: Optional[pd.DataFrame] = None
+        self._keys = np.empty(0)
+        self._rows = np.empty(0, dtype=np.int64)  # Posición original, para conservar el orden
+
+    def _thresholds(self, chunk: pd.DataFrame) -> Union[float, np.ndarray]:
+        """Clave máxima que aún puede entrar en el reservorio (por fila del bloque si hay estratos)."""
+        if self._sample is None:
+            return np.inf
+        if self.strata is None:
+            return np.inf if len(self._keys) < self.size else self._keys.max()
+        per_stratum = pd.Series(self._keys).groupby(self._sample[self.strata].to_numpy(), dropna=True)
+        full = per_stratum.agg(['size', 'max'])
+        full = full.loc[full['size'] >= self.size, 'max']
+        return chunk[self.strata].map(full).fillna(np.inf).to_numpy()
+
+    def update(self, chunk: pd.DataFrame) -> "ReservoirSampler":
+        """Añade un bloque de filas al reservorio."""
+        n_rows = len(chunk)
+        keys = self._rng.random(n_rows)
+        rows = np.arange(self.rows_seen, self.rows_seen + n_rows)
+        self.rows_seen += n_rows
+        if self.strata is not None:
+            keep = chunk[self.strata].notna().to_numpy()  # Los estratos nulos no se muestrean
+        else:
+            keep = np.ones(n_rows, dtype=bool)
+        keep &= keys < self._thresholds(chunk)
+        if not keep.any():
+            return self
+
+        candidates = chunk[keep].reset_index(drop=True)
+        if self._sample is None:
+            sample, all_keys, all_rows = candidates, keys[keep], rows[keep]
+        else:
+            sample = pd.concat([self._sample, candidates], ignore_index=True)
+            all_keys = np.concatenate([self._keys, keys[keep]])
+            all_rows = np.concatenate([self._rows, rows[keep]])
+
+        if self.strata is None:
+            if len(all_keys) > self.size:
+                selected = np.argpartition(all_keys, self.size - 1)[:self.size]
+            else:
+                selected = np.arange(len(all_keys))
+        else:
+            # Orden por (estrato, clave): las k primeras de cada estrato se quedan
+            codes = pd.factorize(sample[self.strata])[0]
+            order = np.lexsort((all_keys, codes))
+            counts = np.bincount(codes, minlength=codes.max() + 1)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            rank = np.arange(len(order)) - starts[codes[order]]
+            selected = order[rank < self.size]
+
+        self._sample = sample.iloc[selected].reset_index(drop=True)
+        self._keys = all_keys[selected]
+        self._rows = all_rows[selected]
+        return self
+
+    def result(self) -> pd.DataFrame:
+        """
+        Devuelve la muestra en el orden original de la fuente. En
+        df.attrs['reservoir'] quedan las filas vistas y el tamaño de la muestra.
+        """
+        if self._sample is None:
+            return pd.DataFrame()
+        order = np.argsort(self._rows, kind='stable')
+        sample = self._sample.iloc[order].reset_index(drop=True)
+        sample.attrs['reservoir'] = {
+            'rows_seen': int(self.rows_seen),
+            'sample_rows': int(len(sample)),
+            'size': self.size,
+            'strata': self.strata,
+        }
+        return sample
+
+
+def reservoir_sample_source(
+    file: Union[str, List[str], object],
+    size: int,
+    strata: Optional[str] = None,
+    random_state: int = 42,
+    chunk_rows: int = RESERVOIR_CHUNK_ROWS
+) -> pd.DataFrame:
+    """
+    Lee una fuente CSV/Parquet por bloques y devuelve una muestra aleatoria
+    uniforme de `size` filas (o de `size` filas por estrato) con memoria acotada
+    a la muestra más un bloque.
+
+    Args:
+        file: Ruta, lista de rutas o archivo subido
+        size: Filas de la muestra (por estrato si se indica `strata`)
+        strata: Columna de estratificación (opcional)
+        random_state: Semilla
+        chunk_rows: Filas por bloque de lectura
+
+    Returns:
+        pd.DataFrame: Muestra en el orden original de la fuente
+    """
+    sampler = ReservoirSampler(size, strata=strata, random_state=random_state)
+    for chunk in iter_source_chunks(file, chunk_rows):
+        if strata is not None and strata not in chunk.columns:
+            raise ValueError(f"La columna de estratos '{strata}' no existe en la fuente")
+        sampler.update(chunk)
+    return sampler.result()
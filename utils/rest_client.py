@@ -0,0 +1,304 @@
+# utils/rest_client.py
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from utils.cache import LRUByteCache, estimate_nbytes, hash_key
+
+# Descarga concurrente de APIs REST paginadas. Las peticiones salen por un
+# pool de conexiones keep-alive (http.client) por host, compartido por todo el
+# proceso; asyncio reparte las páginas entre los hilos del pool con un máximo
+# de peticiones en vuelo. Cada página se decodifica (parse) en cuanto llega y
+# se guarda con su ETag/Last-Modified: al repetir la descarga se envían
+# peticiones condicionales y las páginas sin cambios (304) no se vuelven a bajar.
+REST_CONCURRENCY = int(os.environ.get("DASHBOARD_REST_CONCURRENCY", 16))
+REST_TIMEOUT_SECONDS = 30
+REST_MAX_RETRIES = 5
+REST_BACKOFF_SECONDS = 0.5
+REST_MAX_BACKOFF_SECONDS = 30
+REST_PAGE_CACHE_BYTES = 512 * 1024**2
+# Códigos que se reintentan (además de los errores de conexión)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+TOTAL_PAGES_FIELDS = ("total_pages", "totalPages", "pages", "page_count", "pageCount")
+
+_page_cache = LRUByteCache(max_bytes=REST_PAGE_CACHE_BYTES)
+
+
+class HTTPStatusError(Exception):
+    """Respuesta HTTP con un código de error que no se reintenta (o sin reintentos restantes)."""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} en {url}")
+        self.status = status
+        self.url = url
+
+
+class ConnectionPool:
+    """
+    Conexiones HTTP(S) keep-alive a un host. Cada conexión la usa un solo hilo
+    a la vez; las que fallan se cierran y se descartan.
+    """
+
+    def __init__(self, scheme: str, netloc: str, size: int = REST_CONCURRENCY, timeout: float = REST_TIMEOUT_SECONDS):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.netloc, timeout=self.timeout)
+
+    def request(self, method: str, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Envía una petición por una conexión libre (o nueva).
+
+        Returns:
+            tuple: (código de estado, cabeceras en minúsculas, cuerpo)
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            response_headers = {name.lower(): value for name, value in response.getheaders()}
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self._idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, response_headers, body
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools: Dict[Tuple[str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(url: str) -> ConnectionPool:
+    """Pool de conexiones del proceso para el host de `url`."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(parts.scheme, parts.netloc)
+        return pool
+
+
+@dataclass
+class PageResult:
+    """Página descargada: resultado de parse, validadores HTTP, huella del contenido y total de páginas anunciado."""
+    page: int
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: str
+    total_pages: Optional[int] = None
+    not_modified: bool = False
+
+
+def page_url(url: str, params: Optional[dict], page_param: str, page: int) -> str:
+    """URL de una página: parámetros fijos más el número de página."""
+    query = dict(params or {})
+    query[page_param] = page
+    separator = "&" if urlsplit(url).query else "?"
+    return f"{url}{separator}{urlencode(query, doseq=True)}"
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """Espera antes del reintento: Retry-After si viene en segundos, si no backoff exponencial con jitter."""
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), REST_MAX_BACKOFF_SECONDS)
+    return min(REST_BACKOFF_SECONDS * 2 ** attempt, REST_MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
+
+
+def fetch_page(
+    url: str,
+    page: int,
+    parse: Callable[[Any], Any],
+    headers: Optional[Dict[str, str]] = None,
+    max_retries: int = REST_MAX_RETRIES,
+    total_pages_field: Optional[str] = None
+) -> PageResult:
+    """
+    Descarga y decodifica una página (bloqueante; se ejecuta en los hilos del pool).
+    Si la página ya se descargó, la petición es condicional y un 304 reutiliza
+    el resultado guardado.
+
+    Args:
+        url: URL completa de la página
+        page: Número de página
+        parse: Convierte el JSON de la página en su resultado (p.ej. una tabla Arrow)
+        headers: Cabeceras adicionales (autenticación...)
+        max_retries: Reintentos ante errores de conexión, 429 y 5xx
+        total_pages_field: Campo del JSON con el total de páginas (ver total_pages_hint)
+
+    Returns:
+        PageResult
+    """
+    pool = get_connection_pool(url)
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    # repr(parse) entra en la clave: una función de módulo o un functools.partial
+    # reutilizan las páginas guardadas; una lambda nueva en cada llamada, no
+    cache_key = hash_key("rest_page", url, sorted((headers or {}).items()), parse)
+    cached: Optional[PageResult] = _page_cache.get(cache_key)
+    request_headers = {"Accept": "application/json", "Accept-Encoding": "identity", **(headers or {})}
+    if cached is not None:
+        if cached.etag:
+            request_headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            request_headers["If-Modified-Since"] = cached.last_modified
+
+    for attempt in range(max_retries + 1):
+        try:
+            status, response_headers, body = pool.request("GET", path, request_headers)
+        except (OSError, http.client.HTTPException):
+            if attempt == max_retries:
+                raise
+            time.sleep(_retry_delay(attempt, None))
+            continue
+        if status in RETRY_STATUS_CODES and attempt < max_retries:
+            time.sleep(_retry_delay(attempt, response_headers.get("retry-after")))
+            continue
+        break
+
+    if status == 304 and cached is not None:
+        return PageResult(page, cached.data, cached.etag, cached.last_modified, cached.digest,
+                          cached.total_pages, not_modified=True)
+    if status >= 400:
+        raise HTTPStatusError(status, url)
+    payload = json.loads(body)
+    result = PageResult(page, parse(payload), response_headers.get("etag"), response_headers.get("last-modified"),
+                        hashlib.blake2b(body, digest_size=20).hexdigest(),
+                        total_pages_hint(payload, response_headers, total_pages_field))
+    if result.etag or result.last_modified:
+        _page_cache.put(cache_key, result, nbytes=estimate_nbytes(result.data) + len(body) // 8)
+    else:
+        _page_cache.pop(cache_key)
+    return result
+
+
+def total_pages_hint(payload: Any, response_headers: Optional[Dict[str, str]] = None, field: Optional[str] = None) -> Optional[int]:
+    """Número total de páginas anunciado por la API (campo del JSON o cabecera X-Total-Pages)."""
+    if isinstance(payload, dict):
+        for name in ([field] if field else TOTAL_PAGES_FIELDS):
+            value = payload.get(name)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    value = (response_headers or {}).get("x-total-pages")
+    return int(value) if value and value.isdigit() else None
+
+
+async def fetch_pages_async(
+    url: str,
+    parse: Callable[[Any], Any],
+    params: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
+    page_param: str = "page",
+    first_page: int = 1,
+    pages: Optional[int] = None,
+    total_pages_field: Optional[str] = None,
+    concurrency: int = REST_CONCURRENCY,
+    on_page: Optional[Callable[[PageResult], None]] = None
+) -> List[PageResult]:
+    """
+    Descarga todas las páginas de un endpoint con como mucho `concurrency`
+    peticiones en vuelo.
+
+    El número de páginas sale de `pages`, del JSON de la primera página
+    (total_pages_field o un nombre habitual) o de la cabecera X-Total-Pages. Si
+    la API no lo anuncia, se piden tandas de `concurrency` páginas hasta la
+    primera página vacía (len(resultado) == 0) o inexistente (404).
+
+    Args:
+        url: URL base del endpoint
+        parse: Convierte el JSON de una página en su resultado; debe admitir len()
+        params: Parámetros fijos de la consulta
+        headers: Cabeceras adicionales
+        page_param: Nombre del parámetro de página
+        first_page: Número de la primera página
+        pages: Número de páginas, si se conoce
+        total_pages_field: Campo del JSON con el total de páginas
+        concurrency: Máximo de peticiones simultáneas
+        on_page: Se llama con cada página en cuanto llega (en el bucle de eventos)
+
+    Returns:
+        list: PageResult en orden de página, sin las páginas vacías del final
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="rest-fetch") as executor:
+        async def fetch(page: int) -> PageResult:
+            async with semaphore:
+                result = await loop.run_in_executor(
+                    executor, fetch_page, page_url(url, params, page_param, page), page, parse, headers,
+                    REST_MAX_RETRIES, total_pages_field)
+            if on_page is not None:
+                on_page(result)
+            return result
+
+        first = await fetch(first_page)
+        results = [first]
+        total = pages or first.total_pages
+        if total is not None:
+            # Total conocido: todas las páginas a la vez, limitadas por el semáforo
+            results += await asyncio.gather(*(fetch(page) for page in range(first_page + 1, first_page + total)))
+            return results
+        if len(first.data) == 0:
+            return []
+        next_page = first_page + 1
+        while True:
+            batch = await asyncio.gather(*(fetch(page) for page in range(next_page, next_page + concurrency)),
+                                         return_exceptions=True)
+            for result in batch:
+                # Una página vacía o un 404 marcan el final
+                if isinstance(result, HTTPStatusError) and result.status == 404:
+                    return results
+                if isinstance(result, BaseException):
+                    raise result
+                if len(result.data) == 0:
+                    return results
+                results.append(result)
+            next_page += concurrency
+
+
+def fetch_pages(url: str, parse: Callable[[Any], Any], **kwargs) -> List[PageResult]:
+    """
+    Versión síncrona de fetch_pages_async (para el script de Streamlit). Si el
+    hilo ya tiene un bucle de eventos en marcha, se ejecuta en otro hilo.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_pages_async(url, parse, **kwargs))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, fetch_pages_async(url, parse, **kwargs)).result()
@@ -1,6 +1,32 @@
 import streamlit as st
 import pandas as pd
 from utils.data_processing import sample_data
+from utils.lazy import is_lazy
+from utils.temporal import BUCKET_AGGREGATIONS
+
+STRATIFIED_ALLOCATION_LABELS = {
+    "proportional": "Proporcional al estrato",
+    "equal": "Igual por estrato",
+    "neyman": "Neyman (según variabilidad)",
+    "fixed": "Fija por estrato",
+}
+
+TEMPORAL_MODE_LABELS = {
+    "sample": "Muestra aleatoria (orden temporal)",
+    "split": "Partición entrenamiento/prueba",
+    "last_periods": "Últimos N periodos",
+    "rolling": "Ventana móvil",
+    "expanding": "Ventana expansiva",
+    "bucket": "Una fila por intervalo",
+}
+
+TEMPORAL_FREQUENCIES = {
+    "min": "Minuto",
+    "h": "Hora",
+    "D": "Día",
+    "W": "Semana",
+    "ME": "Mes",
+}
 
 def apply_sampling(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -45,14 +71,63 @@ def apply_sampling(df: pd.DataFrame) -> pd.DataFrame:
             "Columna para estratificación",
             df.columns
         )
-        return sample_data(df, "stratified", size, strata=strata_col)
+        allocation = st.selectbox(
+            "Asignación por estrato",
+            list(STRATIFIED_ALLOCATION_LABELS),
+            index=0 if sample_type == "Proporción" else 3,
+            format_func=lambda x: STRATIFIED_ALLOCATION_LABELS[x],
+            help="Con 'Fija por estrato' el número de registros es por estrato; en el resto es el total."
+        )
+        value_col = None
+        if allocation == "neyman":
+            numeric_cols = df.select_dtypes(include='number').columns.tolist()
+            if not numeric_cols:
+                st.warning("Neyman requiere una columna numérica.")
+                return df
+            value_col = st.selectbox("Variable de interés (Neyman)", numeric_cols)
+        return sample_data(df, "stratified", size, strata=strata_col,
+                           allocation=allocation, value_column=value_col)
     
     elif method == "Temporal":
         date_col = st.selectbox(
             "Columna de fecha",
             df.columns
         )
-        return sample_data(df, "temporal", size, date_column=date_col)
+        modes = ["sample"] if is_lazy(df) else list(TEMPORAL_MODE_LABELS)
+        mode = st.selectbox(
+            "Partición temporal",
+            modes,
+            format_func=lambda x: TEMPORAL_MODE_LABELS[x]
+        )
+        params = {}
+        if mode == "split":
+            params['part'] = st.radio(
+                "Parte",
+                ["train", "test"],
+                format_func=lambda x: "Entrenamiento" if x == "train" else "Prueba",
+                help="La prueba son los registros más recientes (tamaño de la muestra)."
+            )
+            cutoff = st.text_input("Fecha de corte (opcional, p.ej. 2024-03-01)")
+            if cutoff:
+                params['cutoff'] = cutoff
+        elif mode == "last_periods":
+            params['periods'] = st.number_input("Periodos", min_value=1, value=30)
+            params['freq'] = st.selectbox("Periodo", list(TEMPORAL_FREQUENCIES), index=2,
+                                          format_func=lambda x: TEMPORAL_FREQUENCIES[x])
+        elif mode in ("rolling", "expanding"):
+            params['window'] = st.text_input("Duración de la ventana", "7D")
+            params['step'] = st.text_input("Avance entre ventanas", "7D")
+            params['window_index'] = st.number_input(
+                "Ventana (0 = primera, -1 = última)", value=-1, step=1)
+        elif mode == "bucket":
+            params['freq'] = st.selectbox("Intervalo", list(TEMPORAL_FREQUENCIES), index=1,
+                                          format_func=lambda x: TEMPORAL_FREQUENCIES[x])
+            params['how'] = st.selectbox("Valor por intervalo", list(BUCKET_AGGREGATIONS))
+        try:
+            return sample_data(df, "temporal", size, date_column=date_col, temporal_mode=mode, **params)
+        except (ValueError, IndexError) as e:
+            st.error(f"Partición temporal no válida: {e}")
+            return df
     
     else:  # Aleatorio Simple
         return sample_data(df, "random", size)
\ No newline at end of file
@@ -0,0 +1,334 @@
+# utils/summary.py
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Resumen numérico de todas las columnas en una sola pasada: los datos se leen
+# por bloques 2D (filas x columnas numéricas) y cada bloque actualiza a la vez
+# los momentos (conteo, media, M2, min, max) y un boceto de cuantiles de todas
+# las columnas. Los resúmenes son combinables (merge), así que se pueden
+# calcular por bloques o por particiones de Dask y unirse después.
+SUMMARY_BLOCK_BYTES = 128 * 1024**2
+# Con pocos datos (un solo bloque de hasta estos valores) los percentiles son exactos
+SUMMARY_EXACT_QUANTILE_VALUES = 5_000_000
+SUMMARY_PERCENTILES = (0.25, 0.50, 0.75)
+# Boceto de cuantiles: error relativo del valor devuelto y rango de magnitudes
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_MIN_VALUE = 1e-9
+SKETCH_MAX_VALUE = 1e12
+
+
+def numeric_block(df: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """
+    Bloque float64 [filas, columnas] con NaN en los nulos (booleanos como 0/1).
+    En orden Fortran: cada columna es contigua, igual que en el DataFrame.
+    """
+    block = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+    for j, col in enumerate(columns):
+        block[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return block
+
+
+def block_rows(n_columns: int, block_bytes: int = SUMMARY_BLOCK_BYTES) -> int:
+    """Filas por bloque para que el bloque float64 ocupe como mucho block_bytes."""
+    return max(block_bytes // (8 * max(n_columns, 1)), 1024)
+
+
+class QuantileSketch:
+    """
+    Boceto de cuantiles con error relativo acotado (estilo DDSketch) para
+    varias columnas a la vez. Cada valor cae en un bucket logarítmico de base
+    gamma = (1 + a) / (1 - a), de modo que el cuantil devuelto está a menos de
+    un factor a del real. Actualizar un bloque 2D es un único bincount, sin
+    ordenar, y dos bocetos se combinan sumando sus conteos.
+
+    El error relativo se mide respecto a un centro por columna (la media del
+    primer bloque con valores): sin él, una columna como un año (2000-2024)
+    tendría un error de ±20. Al combinar bocetos con centros distintos, los
+    buckets del otro se reubican en los propios (error adicional de un bucket).
+    """
+
+    def __init__(self, n_columns: int, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.n_columns = n_columns
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self._min_index = int(np.floor(np.log(SKETCH_MIN_VALUE) / self._log_gamma))
+        self._n_buckets = int(np.ceil(np.log(SKETCH_MAX_VALUE) / self._log_gamma)) - self._min_index + 1
+        # Por columna: [negativos (de mayor a menor magnitud), cero, positivos (de menor a mayor)]
+        self.counts = np.zeros((n_columns, 2 * self._n_buckets + 1), dtype=np.int64)
+        self.center = np.zeros(n_columns)
+        self._has_center = np.zeros(n_columns, dtype=bool)
+
+    def set_centers(self, block: np.ndarray) -> None:
+        """Fija el centro de las columnas que aún no tienen datos (media del bloque)."""
+        pending = ~self._has_center
+        if not pending.any():
+            return
+        counts = np.count_nonzero(~np.isnan(block), axis=0)
+        ready = pending & (counts > 0) & (self.counts.sum(axis=1) == 0)
+        if ready.any():
+            self.center[ready] = np.nansum(block[:, ready], axis=0) / counts[ready]
+            self._has_center |= ready
+
+    def _positions(self, block: np.ndarray) -> np.ndarray:
+        """
+        Posición plana (columna * ancho + bucket) de cada valor ya centrado,
+        columna tras columna; NaN -> descarte. Se calcula en float32: basta
+        para distinguir buckets del 1% y mueve la mitad de memoria.
+        """
+        n_rows = block.shape[0]
+        values = np.asfortranarray(block, dtype=np.float32).ravel(order='F')
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            position = np.log(magnitude)
+            position *= np.float32(1 / self._log_gamma)
+            np.ceil(position, out=position)
+            np.clip(position, self._min_index, self._min_index + self._n_buckets - 1, out=position)
+            # Posición en la fila de conteos: n ± (índice + 1) según el signo; cero -> n
+            position -= self._min_index - 1
+            np.copysign(position, values, out=position)
+            position += self._n_buckets
+        position[magnitude < SKETCH_MIN_VALUE] = self._n_buckets
+        width = self.counts.shape[1]
+        position = position.reshape(self.n_columns, n_rows)
+        position += (np.arange(self.n_columns, dtype=np.float32) * width)[:, None]
+        position = position.ravel()
+        nulls = np.isnan(values)
+        if nulls.any():
+            position[nulls] = self.counts.size  # Bucket de descarte
+        return position.astype(np.int64)
+
+    def update(self, block: np.ndarray, centered: Optional[np.ndarray] = None) -> "QuantileSketch":
+        """
+        Añade un bloque float64 [filas, n_columns]; los NaN se ignoran.
+        `centered` (block - self.center) evita restarlo otra vez si ya se tiene.
+        """
+        if centered is None:
+            self.set_centers(block)
+            centered = block - self.center
+        counts = np.bincount(self._positions(centered), minlength=self.counts.size + 1)
+        self.counts += counts[:-1].reshape(self.counts.shape)
+        return self
+
+    def ranks(self, block: np.ndarray) -> np.ndarray:
+        """
+        Rango aproximado (1..n, medio en empates) de cada valor del bloque dentro
+        de todo lo añadido al boceto: los valores del mismo bucket comparten rango.
+
+        Returns:
+            np.ndarray: Bloque [filas, n_columns] de rangos (NaN en los nulos)
+        """
+        counts = self.counts.ravel().astype(np.float64)
+        mid_rank = (np.cumsum(self.counts, axis=1) - self.counts).ravel() + (counts + 1) / 2
+        mid_rank = np.append(mid_rank, np.nan)  # Bucket de descarte
+        return mid_rank[self._positions(block - self.center)].reshape(block.shape, order='F')
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        # Las columnas sin datos adoptan el centro del otro boceto
+        adopt = (self.counts.sum(axis=1) == 0) & other._has_center
+        self.center[adopt] = other.center[adopt]
+        self._has_center |= adopt
+        if np.array_equal(self.center, other.center):
+            self.counts += other.counts
+            return self
+        # Reubicación: el valor representativo de cada bucket del otro, en los propios
+        values = self._bucket_values()[:, None] + (other.center - self.center)
+        weights = other.counts.ravel()
+        counts = np.bincount(self._positions(values), weights=weights, minlength=self.counts.size + 1)
+        self.counts += np.rint(counts[:-1]).astype(np.int64).reshape(self.counts.shape)
+        return self
+
+    def _bucket_values(self) -> np.ndarray:
+        magnitudes = 2 * self.gamma ** (np.arange(self._n_buckets) + self._min_index) / (self.gamma + 1)
+        return np.concatenate((-magnitudes[::-1], [0.0], magnitudes))
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Cuantiles aproximados de cada columna.
+
+        Returns:
+            np.ndarray: [n_columns, len(qs)] (NaN en columnas sin valores)
+        """
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1]
+        bucket_values = self._bucket_values()
+        result = np.full((self.n_columns, len(qs)), np.nan)
+        for k, q in enumerate(qs):
+            rank = q * (totals - 1)
+            bucket = np.argmax(cumulative > rank[:, None], axis=1)
+            result[:, k] = bucket_values[bucket] + self.center
+        result[totals == 0] = np.nan
+        return result
+
+
+def _exact_quantiles(block: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """Cuantiles exactos (interpolación lineal, como np.quantile) de cada columna del bloque."""
+    ordered = np.sort(block, axis=0)  # Los NaN quedan al final de cada columna
+    counts = np.count_nonzero(~np.isnan(block), axis=0)
+    columns = np.arange(block.shape[1])
+    result = np.full((block.shape[1], len(qs)), np.nan)
+    has_values = counts > 0
+    for k, q in enumerate(qs):
+        position = q * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        weight = position - lower
+        values = ordered[lower, columns] * (1 - weight) + ordered[upper, columns] * weight
+        result[has_values, k] = values[has_values]
+    return result
+
+
+class NumericSummary:
+    """
+    Resumen combinable de columnas numéricas: conteo, media y M2 (suma de
+    cuadrados de las desviaciones, combinada con la fórmula de Chan), mínimo,
+    máximo y boceto de cuantiles.
+    """
+
+    def __init__(self, columns: Sequence[str], relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.columns = list(columns)
+        n_columns = len(self.columns)
+        self.rows = 0
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.sketch = QuantileSketch(n_columns, relative_accuracy)
+        self._exact_quantiles = None  # Solo mientras el resumen venga de un único bloque pequeño
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum) -> None:
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            ratio = np.where(total > 0, count / np.maximum(total, 1), 0.0)
+            self.mean = self.mean + delta * ratio
+            self.m2 = self.m2 + m2 + delta ** 2 * self.count * ratio
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def update_block(self, block: np.ndarray) -> "NumericSummary":
+        """Añade un bloque float64 [filas, columnas] (NaN = nulo)."""
+        if block.shape[0] == 0:
+            return self
+        # Un único bloque centrado (en el centro del boceto) sirve para los
+        # momentos, como sumas desplazadas, y para el boceto
+        self.sketch.set_centers(block)
+        shift = self.sketch.center
+        centered = block - shift
+        valid = ~np.isnan(centered)
+        count = np.count_nonzero(valid, axis=0)
+        filled = np.where(valid, centered, 0.0)
+        sums = filled.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, shift + sums / np.maximum(count, 1), 0.0)
+            m2 = np.maximum(np.einsum('ij,ij->j', filled, filled) - sums ** 2 / np.maximum(count, 1), 0.0)
+        # fmin/fmax ignoran los NaN; una columna sin valores queda en NaN -> ±inf
+        minimum = np.nan_to_num(np.fmin.reduce(block, axis=0), nan=np.inf)
+        maximum = np.nan_to_num(np.fmax.reduce(block, axis=0), nan=-np.inf)
+        self._exact_quantiles = _exact_quantiles(block, SUMMARY_PERCENTILES) \
+            if self.rows == 0 and block.size <= SUMMARY_EXACT_QUANTILE_VALUES else None
+        self._merge_moments(count, mean, m2, minimum, maximum)
+        self.sketch.update(block, centered)
+        self.rows += block.shape[0]
+        return self
+
+    def update(self, df: pd.DataFrame, chunk_rows: Optional[int] = None) -> "NumericSummary":
+        """Añade las filas de un DataFrame, leído por bloques de chunk_rows filas."""
+        chunk_rows = chunk_rows or block_rows(len(self.columns))
+        for start in range(0, len(df), chunk_rows):
+            self.update_block(numeric_block(df.iloc[start:start + chunk_rows], self.columns))
+        return self
+
+    def merge(self, other: "NumericSummary") -> "NumericSummary":
+        """Combina otro resumen de las mismas columnas (p.ej. de otra partición)."""
+        if other.rows == 0:
+            return self
+        exact = other._exact_quantiles if self.rows == 0 else None
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+        self.rows += other.rows
+        self._exact_quantiles = exact
+        return self
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            dict: Columna -> count, min, max, mean, std (ddof=1) y percentiles
+            (exactos con un solo bloque pequeño, del boceto en otro caso)
+        """
+        if self._exact_quantiles is not None:
+            quantiles = self._exact_quantiles
+        else:
+            quantiles = self.sketch.quantiles(SUMMARY_PERCENTILES)
+            # El boceto no conoce los extremos: se acotan con el mínimo y el máximo reales
+            quantiles = np.clip(quantiles, self.min[:, None], self.max[:, None])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(self.count > 1, np.sqrt(self.m2 / np.maximum(self.count - 1, 1)), np.nan)
+        summary = {}
+        for j, col in enumerate(self.columns):
+            has_values = self.count[j] > 0
+            summary[col] = {
+                'count': int(self.count[j]),
+                'min': self.min[j] if has_values else np.nan,
+                'max': self.max[j] if has_values else np.nan,
+                'mean': self.mean[j] if has_values else np.nan,
+                'std': std[j],
+                'percentiles': {f"{q:.0%}": quantiles[j, k] for k, q in enumerate(SUMMARY_PERCENTILES)},
+            }
+        return summary
+
+
+def summarize_numeric(df: pd.DataFrame, columns: Optional[List[str]] = None,
+                      chunk_rows: Optional[int] = None) -> NumericSummary:
+    """
+    Resumen de las columnas numéricas de df (todas si columns es None) en una
+    pasada por bloques. Devuelve el resumen combinable; ver NumericSummary.result.
+    """
+    if columns is None:
+        columns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col].dtype)]
+    return NumericSummary(columns).update(df, chunk_rows)
+
+
+def merge_summaries(summaries: Sequence[NumericSummary]) -> NumericSummary:
+    """Une una lista de resúmenes parciales (p.ej. uno por partición)."""
+    merged = NumericSummary(summaries[0].columns)
+    for summary in summaries:
+        merged.merge(summary)
+    return merged
+
+
+def numeric_histograms(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    minimum: np.ndarray,
+    maximum: np.ndarray,
+    bins: int,
+    chunk_rows: Optional[int] = None
+) -> np.ndarray:
+    """
+    Histogramas de bins uniformes entre minimum y maximum de varias columnas a
+    la vez (un bincount por bloque 2D).
+
+    Returns:
+        np.ndarray: Conteos [columnas, bins]
+    """
+    n_columns = len(columns)
+    counts = np.zeros(n_columns * bins, dtype=np.int64)
+    span = np.where(maximum > minimum, maximum - minimum, 1.0)
+    chunk_rows = chunk_rows or block_rows(n_columns)
+    for start in range(0, len(df), chunk_rows):
+        block = numeric_block(df.iloc[start:start + chunk_rows], columns)
+        index = block - minimum
+        index *= bins / span
+        np.clip(index, 0, bins - 1, out=index)
+        np.floor(index, out=index)
+        index += np.arange(n_columns) * bins  # Desplazamiento de cada columna
+        nulls = np.isnan(index)
+        if nulls.any():
+            index[nulls] = counts.size  # Bucket de descarte
+        flat = index.ravel(order='F').astype(np.int64)
+        counts += np.bincount(flat, minlength=counts.size + 1)[:-1]
+    return counts.reshape(n_columns, bins)
@@ -0,0 +1,264 @@
+# utils/temporal.py
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUByteCache, hash_key, known_fingerprint, register_fingerprint, register_selection
+from utils.indexes import SortedRangeIndex, get_datetime_index
+
+# Particiones temporales. La columna de fechas se ordena una sola vez por
+# versión del dataset (índice ordenado cacheado); todas las particiones son
+# cortes posicionales (iloc[a:b]) del DataFrame ordenado por fecha.
+TEMPORAL_MODES = ("sample", "split", "last_periods", "rolling", "expanding", "bucket")
+BUCKET_AGGREGATIONS = ("first", "last", "mean", "sum", "min", "max", "count")
+SORTED_FRAME_CACHE_BYTES = 2 * 1024**3
+
+_sorted_frames = LRUByteCache(max_bytes=SORTED_FRAME_CACHE_BYTES)
+
+TimeBound = Union[str, pd.Timestamp]
+
+
+def time_sorted(df: pd.DataFrame, date_col: str) -> Tuple[pd.DataFrame, SortedRangeIndex]:
+    """
+    Devuelve el DataFrame en orden temporal (sin filas de fecha nula) y el
+    índice ordenado de la fecha. Si df ya está ordenado por fecha se devuelve
+    tal cual (sin copia); si no, la versión ordenada se construye una vez y se
+    cachea por huella del dataset. df nunca se modifica.
+
+    Returns:
+        tuple: (DataFrame ordenado, índice: sus fechas en index.sorted_values)
+    """
+    index = get_datetime_index(df, date_col)
+    order = index.order
+    in_order = len(order) == len(df) and bool(np.all(order[1:] > order[:-1]))
+    if in_order:
+        return df, index
+
+    fingerprint = known_fingerprint(df)
+    key = (fingerprint, date_col) if fingerprint is not None else None
+    sorted_df = _sorted_frames.get(key) if key is not None else None
+    if sorted_df is None:
+        sorted_df = register_selection(df.take(order), df, order)
+        if fingerprint is not None:
+            register_fingerprint(sorted_df, hash_key("time_sorted", fingerprint, date_col))
+            _sorted_frames.put(key, sorted_df)
+    return sorted_df, index
+
+
+def _rows(sorted_df: pd.DataFrame, rows: Union[slice, np.ndarray]) -> pd.DataFrame:
+    """sorted_df.iloc[rows], registrado como selección de filas de sorted_df."""
+    positions = np.arange(*rows.indices(len(sorted_df))) if isinstance(rows, slice) else rows
+    return register_selection(sorted_df.iloc[rows], sorted_df, positions)
+
+
+def _register_slice(part: pd.DataFrame, source: pd.DataFrame, *key_parts) -> pd.DataFrame:
+    parent = known_fingerprint(source)
+    if parent is not None:
+        register_fingerprint(part, hash_key("temporal", parent, *key_parts))
+    return part
+
+
+def temporal_split(
+    df: pd.DataFrame,
+    date_col: str,
+    cutoff: Optional[TimeBound] = None,
+    test_size: Optional[Union[int, float]] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Partición entrenamiento/prueba respetando el tiempo: todo lo anterior al
+    corte es entrenamiento y lo posterior (incluido) es prueba.
+
+    Args:
+        df: DataFrame de pandas
+        date_col: Columna de fechas
+        cutoff: Fecha de corte
+        test_size: Alternativa a cutoff: proporción (float) o número de filas
+            (int) más recientes que forman la prueba
+
+    Returns:
+        tuple: (entrenamiento, prueba), ambos cortes iloc del DataFrame ordenado
+    """
+    sorted_df, index = time_sorted(df, date_col)
+    n_rows = len(index.order)
+    if cutoff is not None:
+        split_at = index.searchsorted(cutoff, side='left')
+    elif test_size is not None:
+        n_test = int(round(test_size * n_rows)) if isinstance(test_size, float) else int(test_size)
+        split_at = n_rows - min(max(n_test, 0), n_rows)
+    else:
+        raise ValueError("Se requiere 'cutoff' o 'test_size' para la partición temporal")
+    train = _register_slice(_rows(sorted_df, slice(0, split_at)), df, "train", date_col, split_at)
+    test = _register_slice(_rows(sorted_df, slice(split_at, n_rows)), df, "test", date_col, split_at)
+    return train, test
+
+
+def window_positions(
+    df: pd.DataFrame,
+    date_col: str,
+    window: str,
+    step: Optional[str] = None,
+    expanding: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Límites posicionales [inicio, fin) de las ventanas no vacías, como dos
+    arrays (ver window_bounds). Todos los límites se buscan a la vez con
+    np.searchsorted sobre las fechas ordenadas, en la unidad del índice.
+    """
+    _, index = time_sorted(df, date_col)
+    if len(index.order) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    window_td, step_td = pd.Timedelta(window), pd.Timedelta(step or window)
+    if step_td <= pd.Timedelta(0):
+        raise ValueError("El avance de las ventanas debe ser positivo")
+    unit = index.datetime_unit
+    first = pd.Timestamp(np.datetime64(int(index.sorted_values[0]), unit))
+    last = pd.Timestamp(np.datetime64(int(index.sorted_values[-1]), unit))
+    ends = pd.date_range(first + window_td, last + step_td, freq=step_td)
+    if len(ends) == 0:  # La ventana es más larga que la serie: una sola ventana con todo
+        ends = pd.DatetimeIndex([last + pd.Timedelta(1, 'ns')])
+    end_values = ends.as_unit(unit).asi8
+    start_values = np.full(len(ends), index.sorted_values[0]) if expanding else (ends - window_td).as_unit(unit).asi8
+    lo = np.searchsorted(index.sorted_values, start_values, side='left')
+    hi = np.searchsorted(index.sorted_values, end_values, side='left')
+    non_empty = hi > lo
+    return lo[non_empty], hi[non_empty]
+
+
+def window_bounds(
+    df: pd.DataFrame,
+    date_col: str,
+    window: str,
+    step: Optional[str] = None,
+    expanding: bool = False
+) -> List[Tuple[int, int]]:
+    """
+    Límites posicionales [inicio, fin) de ventanas móviles o expansivas sobre
+    el DataFrame ordenado por fecha (ver time_sorted).
+
+    Args:
+        df: DataFrame de pandas
+        date_col: Columna de fechas
+        window: Duración de la ventana (p.ej. '7D', '1h'); en expansivas, el
+            tamaño mínimo de la primera ventana
+        step: Avance entre ventanas (por defecto, igual a window)
+        expanding: Si es True todas las ventanas empiezan en la primera fecha
+    """
+    lo, hi = window_positions(df, date_col, window, step, expanding)
+    return list(zip(lo.tolist(), hi.tolist()))
+
+
+def rolling_windows(
+    df: pd.DataFrame,
+    date_col: str,
+    window: str,
+    step: Optional[str] = None,
+    expanding: bool = False
+) -> Iterator[pd.DataFrame]:
+    """
+    Recorre ventanas móviles (o expansivas) como cortes iloc del DataFrame
+    ordenado por fecha, sin copiar datos. Ver window_bounds.
+    """
+    sorted_df, _ = time_sorted(df, date_col)
+    for lo, hi in window_bounds(df, date_col, window, step, expanding):
+        yield sorted_df.iloc[lo:hi]
+
+
+def last_periods(df: pd.DataFrame, date_col: str, periods: int, freq: str = "D") -> pd.DataFrame:
+    """
+    Últimos `periods` periodos de `freq` contados desde la fecha más reciente:
+    con frecuencias fijas (p.ej. 30 'D') un intervalo móvil; con frecuencias de
+    calendario ('W', 'M') los últimos periodos completos más el actual.
+    Es un corte iloc del DataFrame ordenado por fecha.
+    """
+    sorted_df, index = time_sorted(df, date_col)
+    n_rows = len(index.order)
+    if n_rows == 0:
+        return _rows(sorted_df, slice(0, 0))
+    last = pd.Timestamp(np.datetime64(int(index.sorted_values[-1]), index.datetime_unit))
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick):
+        lo = index.searchsorted(last - offset * periods, side='right')
+    else:
+        lo = index.searchsorted((last.to_period(offset) - (periods - 1)).start_time, side='left')
+    return _register_slice(_rows(sorted_df, slice(lo, n_rows)), df, "last_periods", date_col, periods, freq)
+
+
+def _bucket_starts(index: SortedRangeIndex, freq: str) -> np.ndarray:
+    """Posición de la primera fila de cada intervalo de `freq` en el orden temporal."""
+    dates = pd.DatetimeIndex(index.sorted_values.view(f'datetime64[{index.datetime_unit}]'))
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick):
+        keys = dates.floor(offset).asi8
+    else:
+        keys = dates.to_period(offset).asi8  # Frecuencias de calendario (semana, mes...)
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+
+
+def bucket_downsample(df: pd.DataFrame, date_col: str, freq: str = "h", how: str = "first") -> pd.DataFrame:
+    """
+    Reduce la serie a una fila por intervalo de tiempo (p.ej. una por hora).
+
+    Args:
+        df: DataFrame de pandas
+        date_col: Columna de fechas
+        freq: Intervalo ('min', 'h', 'D', 'W', 'M'...)
+        how: 'first'/'last' (una fila real del intervalo) o una agregación
+            de columnas numéricas: 'mean', 'sum', 'min', 'max', 'count'
+
+    Returns:
+        pd.DataFrame: Una fila por intervalo con datos, en orden temporal. Con
+        agregaciones, date_col es el inicio del intervalo
+    """
+    if how not in BUCKET_AGGREGATIONS:
+        raise ValueError(f"Agregación '{how}' no soportada")
+    sorted_df, index = time_sorted(df, date_col)
+    n_rows = len(index.order)
+    starts = _bucket_starts(index, freq)
+    if how == "first":
+        return _rows(sorted_df, starts)
+    if how == "last":
+        return _rows(sorted_df, np.append(starts[1:] - 1, n_rows - 1) if len(starts) else starts)
+
+    # Agregación por segmentos contiguos con reduceat: sin groupby ni copia del frame
+    ordered = sorted_df.iloc[:n_rows]
+    numeric_cols = [col for col in ordered.select_dtypes(include=np.number).columns if col != date_col]
+    counts = np.diff(np.append(starts, n_rows))
+    bucket_dates = pd.DatetimeIndex(index.sorted_values[starts].view(f'datetime64[{index.datetime_unit}]'))
+    offset = pd.tseries.frequencies.to_offset(freq)
+    bucket_dates = bucket_dates.floor(offset) if isinstance(offset, pd.offsets.Tick) \
+        else bucket_dates.to_period(offset).start_time
+    result = {date_col: bucket_dates}
+    for col in numeric_cols:
+        values = ordered[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        valid_counts = np.add.reduceat(valid.astype(np.int64), starts)
+        if how == "count":
+            result[col] = valid_counts
+        elif how in ("sum", "mean"):
+            sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[col] = sums if how == "sum" else np.where(valid_counts > 0, sums / valid_counts, np.nan)
+        else:
+            fill = np.inf if how == "min" else -np.inf
+            reducer = np.minimum if how == "min" else np.maximum
+            extreme = reducer.reduceat(np.where(valid, values, fill), starts)
+            result[col] = np.where(valid_counts > 0, extreme, np.nan)
+    result['rows'] = counts
+    return pd.DataFrame(result)
+
+
+def temporal_sample(
+    df: pd.DataFrame,
+    date_col: str,
+    size: Union[int, float],
+    random_state: int = 42
+) -> pd.DataFrame:
+    """Muestra aleatoria que conserva el orden temporal (filas con fecha nula excluidas)."""
+    sorted_df, index = time_sorted(df, date_col)
+    n_rows = len(index.order)
+    n_sample = int(round(size * n_rows)) if isinstance(size, float) else min(int(size), n_rows)
+    positions = np.sort(np.random.default_rng(random_state).choice(n_rows, n_sample, replace=False))
+    return _rows(sorted_df, positions)
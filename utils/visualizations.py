@@ -1,12 +1,165 @@
 # utils/visualizations.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Union
 from plotly.subplots import make_subplots
+from utils.aggregations import (value_counts_frame, grouped_sum, grouped_mean, crosstab, correlation_matrix,
+                                histogram_frame, bar_sum_frame, shared_aggregations, CROSSTAB_TOP_K)
+from utils.lazy import is_lazy, is_empty, lazy_frame_key, lazy_row_count, materialize, rescan_parquet
+from utils.cache import LRUByteCache, dataset_fingerprint, hash_key, known_fingerprint
+from utils.decimation import (DEFAULT_POINT_BUDGET, DENSITY_PAIRPLOT_BINS, choose_render_mode,
+                              density_decimate, density_grid)
+from utils.progressive import (CONFIDENCE_LEVEL, PROGRESSIVE_FRACTIONS, PROGRESSIVE_MIN_ROWS, PROGRESSIVE_TYPES,
+                               estimate_aggregate, estimate_aggregate_partitions, partition_prefix, random_prefix)
 
-def create_visualization(
+# Tipos de gráfico que en modo perezoso (Dask) se calculan como agregaciones
+# sobre las particiones; el resto trabaja sobre una muestra materializada.
+LAZY_AGGREGATED_TYPES = {"bar", "histogram", "pie", "heatmap_corr", "heatmap_crosstab", "diverging_bars"}
+
+# Figuras ya construidas, por huella del dataset (incluye los filtros) + tipo +
+# parámetros. Acotada por el tamaño serializado (JSON) de las figuras.
+FIGURE_CACHE_BYTES = 256 * 1024**2
+_figure_cache = LRUByteCache(max_bytes=FIGURE_CACHE_BYTES)
+# Hilos para construir en paralelo los subgráficos de create_coupled_plot
+COUPLED_PLOT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+# Filas de la muestra aleatoria uniforme sobre la que se ajusta la línea de
+# tendencia cuando el scatter se submuestrea o se dibuja como densidad
+TRENDLINE_MAX_ROWS = 100_000
+
+def _figure_fingerprint(df) -> Union[str, None]:
+    """Huella del dataset para la caché de figuras (None = no cachear)."""
+    if df is None:
+        return None
+    if is_lazy(df):
+        return known_fingerprint(df)  # Calcularla obligaría a leer todo el dataset
+    return dataset_fingerprint(df)
+
+def _error_figure(text: str) -> go.Figure:
+    """Figura con el mensaje de error como título, marcada en layout.meta para no cachearla."""
+    return go.Figure(layout=go.Layout(title=go.layout.Title(text=text), meta={"error": True}))
+
+def _is_error_figure(fig: go.Figure) -> bool:
+    meta = fig.layout.meta
+    return isinstance(meta, dict) and bool(meta.get("error"))
+
+def _cached_figure(key_parts: tuple, fingerprint: Union[str, None], build) -> go.Figure:
+    """
+    Devuelve una copia de la figura cacheada, construyéndola con build() si falta.
+    Las figuras de error no se cachean: el siguiente rerun vuelve a intentarlo.
+    """
+    if fingerprint is None:
+        return build()
+    key = hash_key(fingerprint, *key_parts)
+    fig = _figure_cache.get(key)
+    if fig is None:
+        fig = build()
+        if _is_error_figure(fig):
+            return fig
+        _figure_cache.put(key, fig, nbytes=len(fig.to_json()))
+    # Copia: quien llama puede modificar la figura sin alterar la caché
+    return go.Figure(fig)
+
+def get_required_columns(
+    viz_type: str,
+    x: str = None,
+    y: Union[str, List[str]] = None,
+    y2: str = None,
+    color: str = None,
+    size: str = None,
+    facet_row: str = None,
+    facet_col: str = None,
+    **kwargs
+) -> Union[List[str], None]:
+    """
+    Columnas que necesita un gráfico, para proyectarlas en la lectura.
+    
+    Returns:
+        list o None si el gráfico necesita todas las columnas (p.ej. heatmap_corr)
+    """
+    if viz_type == "heatmap_corr":
+        return list(kwargs['corr_columns']) if kwargs.get('corr_columns') else None
+    if viz_type == "pairplot" and not kwargs.get('dimensions'):
+        return None
+    columns = list(y) if isinstance(y, list) else [y]
+    columns += [x, y2, color, size, facet_row, facet_col]
+    if viz_type == "pairplot":
+        columns += list(kwargs['dimensions'])
+    return [col for col in dict.fromkeys(columns) if col]
+
+def _set_render_meta(fig: go.Figure, render_mode: str, n_rows: int, n_points: int, trendline: Any = None) -> None:
+    """
+    Guarda en fig.layout.meta cómo se dibujó un gráfico de puntos (lo muestra la UI).
+    trendline: filas sobre las que se ajustó la línea de tendencia, o "off" si se desactivó.
+    """
+    meta = {"render_mode": render_mode, "rows": int(n_rows), "points": int(n_points)}
+    if trendline is not None:
+        meta["trendline"] = trendline
+    fig.update_layout(meta=meta)
+
+def _color_orders(df: pd.DataFrame, color) -> Dict[str, list]:
+    """Orden de las categorías de color en el dataset completo (mismos colores en puntos y líneas)."""
+    if not color or pd.api.types.is_numeric_dtype(df[color].dtype):
+        return {}
+    return {color: list(df[color].dropna().unique())}
+
+def _trendline_traces(df: pd.DataFrame, x: str, y: str, method: str, color=None) -> List[go.Scatter]:
+    """
+    Líneas de tendencia ajustadas sobre una muestra aleatoria uniforme de df
+    (hasta TRENDLINE_MAX_ROWS filas). El submuestreo por densidad conserva de
+    más extremos y zonas poco densas, así que ajustar sobre él sesgaría la línea.
+    """
+    fit_df = df[list(dict.fromkeys(col for col in (x, y, color) if col))]
+    if len(fit_df) > TRENDLINE_MAX_ROWS:
+        fit_df = fit_df.sample(n=TRENDLINE_MAX_ROWS, random_state=0)
+    trend_fig = px.scatter(fit_df, x=x, y=y, color=color, trendline=method,
+                           category_orders=_color_orders(df, color))
+    return [trace for trace in trend_fig.data if trace.mode == "lines"]
+
+def _density_pairplot(df: pd.DataFrame, dimensions: List[str], colorscale: str) -> go.Figure:
+    """Pairplot agregado: histograma en la diagonal y mapa de densidad 2D en cada panel."""
+    n_dims = len(dimensions)
+    fig = make_subplots(rows=n_dims, cols=n_dims, horizontal_spacing=0.02, vertical_spacing=0.02)
+    for row, y_dim in enumerate(dimensions, start=1):
+        for col, x_dim in enumerate(dimensions, start=1):
+            if row == col:
+                hist_df, bin_width = histogram_frame(df, x_dim, nbins=DENSITY_PAIRPLOT_BINS)
+                fig.add_trace(go.Bar(x=hist_df[x_dim], y=hist_df['count'], width=bin_width,
+                                     marker_color="#636efa", showlegend=False, name=x_dim), row=row, col=col)
+            else:
+                counts, x_centers, y_centers = density_grid(df[x_dim], df[y_dim], bins=DENSITY_PAIRPLOT_BINS)
+                fig.add_trace(go.Heatmap(z=counts, x=x_centers, y=y_centers, coloraxis="coloraxis",
+                                         hoverongaps=False, name=f"{y_dim} vs {x_dim}"), row=row, col=col)
+            if row == n_dims:
+                fig.update_xaxes(title_text=x_dim, row=row, col=col)
+            if col == 1:
+                fig.update_yaxes(title_text=y_dim, row=row, col=col)
+    fig.update_layout(title="Pairplot (Densidad por Paneles)", bargap=0,
+                      coloraxis={"colorscale": colorscale, "colorbar": {"title": "Filas"}})
+    return fig
+
+def create_visualization(df: pd.DataFrame, viz_type: str, **params) -> go.Figure:
+    """
+    Crea la figura de un gráfico. El resultado se memoiza por huella del
+    dataset (y de sus filtros), tipo de gráfico y parámetros, de modo que los
+    reruns de Streamlit que no cambian nada reutilizan la figura ya construida.
+
+    Args:
+        df: DataFrame (pandas o Dask)
+        viz_type: Tipo de gráfico
+        **params: Parámetros de _build_visualization (x, y, color, nbins, ...)
+
+    Returns:
+        go.Figure: Figura (copia independiente de la cacheada)
+    """
+    return _cached_figure(("figure", viz_type, sorted(params.items())), _figure_fingerprint(df),
+                          lambda: _build_visualization(df, viz_type, **params))
+
+def _build_visualization(
     df: pd.DataFrame,
     viz_type: str,
     x: str = None,
@@ -33,11 +186,14 @@ def create_visualization(
     hole_pie: float = 0,
     slope_marker_color_positive: str = 'green',
     slope_marker_color_negative: str = 'red',
+    point_budget: int = DEFAULT_POINT_BUDGET,
+    large_data_mode: str = 'auto',
+    bar_agg: str = 'sum',
     **kwargs
 ) -> go.Figure:
     
     fig = go.Figure()
-    if df.empty and viz_type not in ["heatmap_corr_empty_ok"]:
+    if is_empty(df) and viz_type not in ["heatmap_corr_empty_ok"]:
         return fig
 
     if x and x not in df.columns: return fig
@@ -54,22 +210,49 @@ def create_visualization(
     if color and color not in df.columns: color = None
     if size and size not in df.columns: size = None
 
+    if is_lazy(df):
+        # Proyección: solo se leen las columnas que usa el gráfico
+        required_columns = get_required_columns(viz_type, x=x, y=y, y2=y2, color=color, size=size,
+                                                facet_row=facet_row, facet_col=facet_col, **kwargs)
+        if required_columns is not None:
+            df = rescan_parquet(df, columns=required_columns)
+        if viz_type not in LAZY_AGGREGATED_TYPES:
+            df = materialize(df)
+
     try:
         if viz_type == "bar":
             if not x: return fig
             if not y:
-                bar_df = df[x].value_counts().reset_index()
-                bar_df.columns = [x, 'count']
+                bar_df = value_counts_frame(df, x, top_k=kwargs.get('max_categories') or None)
                 fig = px.bar(bar_df, x=x, y='count', color=color if color in bar_df.columns else None,
                              orientation=orientation, barmode=barmode, title=f"Frecuencia de {x}")
+            elif pd.api.types.is_numeric_dtype(df[y].dtype) and bar_agg == 'mean':
+                keys = [x] + ([color] if color and color != x else [])
+                bar_df = grouped_mean(df, keys, y)
+                fig = px.bar(bar_df, x=x, y=y, color=color if color in bar_df.columns else None,
+                             orientation=orientation, barmode='group' if barmode == 'relative' else barmode,
+                             title=f"Gráfico de Barras: media de {y} por {x}")
+            elif pd.api.types.is_numeric_dtype(df[y].dtype):
+                # Una barra (o dos, por signo, en modo 'relative') por categoría y color
+                bar_df = bar_sum_frame(df, x, y, color=color, split_sign=(barmode == 'relative'))
+                fig = px.bar(bar_df, x=x, y=y, color=color if color in bar_df.columns else None,
+                             orientation=orientation, barmode=barmode,
+                             title=f"Gráfico de Barras: {y} por {x}")
             else:
-                fig = px.bar(df, x=x, y=y, color=color, orientation=orientation, barmode=barmode,
+                fig = px.bar(materialize(df), x=x, y=y, color=color, orientation=orientation, barmode=barmode,
                              title=f"Gráfico de Barras: {y} por {x}")
 
         elif viz_type == "histogram":
             if not x: return fig
-            fig = px.histogram(df, x=x, color=color, nbins=nbins, histnorm=histnorm,
-                               title=f"Histograma de {x}", opacity=kwargs.get('opacity', None))
+            # Binning en el servidor: al navegador solo llegan los conteos por bin
+            hist_df, bin_width = histogram_frame(df, x, color=color, nbins=nbins, histnorm=histnorm)
+            fig = px.bar(hist_df, x=x, y=histnorm or 'count', color=color if color in hist_df.columns else None,
+                         barmode=barmode, title=f"Histograma de {x}", opacity=kwargs.get('opacity', None))
+            if bin_width is not None:
+                if pd.api.types.is_datetime64_any_dtype(hist_df[x].dtype):
+                    bin_width = bin_width / 1e6  # Los ejes de fecha usan milisegundos
+                fig.update_traces(width=bin_width)
+            fig.update_layout(bargap=0)
 
         elif viz_type == "box":
             if not y: 
@@ -94,32 +277,62 @@ def create_visualization(
 
         elif viz_type == "scatter":
             if not x or not y: return fig
-            fig = px.scatter(df, x=x, y=y, color=color, size=size,
-                             opacity=opacity_scatter, symbol=marker_shape,
-                             title=f"Dispersión: {y} vs {x}",
-                             trendline=kwargs.get("trendline", None), 
-                             facet_row=facet_row, facet_col=facet_col)
+            render_mode = choose_render_mode(len(df), point_budget, large_data_mode)
+            trendline = kwargs.get("trendline", None)
+            grid = density_grid(df[x], df[y]) if render_mode == "density" and not (facet_row or facet_col) else None
+            if grid is not None:
+                counts, x_centers, y_centers = grid
+                fig = go.Figure(go.Heatmap(z=counts, x=x_centers, y=y_centers, colorscale=cmap_heatmap,
+                                           colorbar={"title": "Filas"}, hoverongaps=False))
+                fig.update_layout(title=f"Densidad: {y} vs {x}", xaxis_title=x, yaxis_title=y)
+                if trendline:
+                    fig.add_traces(_trendline_traces(df, x, y, trendline))
+                _set_render_meta(fig, "density", len(df), int(counts.size),
+                                 min(len(df), TRENDLINE_MAX_ROWS) if trendline else None)
+            elif render_mode == "all":
+                fig = px.scatter(df, x=x, y=y, color=color, size=size,
+                                 opacity=opacity_scatter, symbol=marker_shape,
+                                 title=f"Dispersión: {y} vs {x}", trendline=trendline,
+                                 facet_row=facet_row, facet_col=facet_col)
+                _set_render_meta(fig, render_mode, len(df), len(df))
+            else:
+                # Submuestreo por densidad: la tendencia no se ajusta sobre los puntos dibujados
+                strata = [color] if color and not pd.api.types.is_numeric_dtype(df[color].dtype) else None
+                plot_df = density_decimate(df, [x, y], point_budget, strata=strata)
+                fig = px.scatter(plot_df, x=x, y=y, color=color, size=size,
+                                 opacity=opacity_scatter, symbol=marker_shape,
+                                 title=f"Dispersión: {y} vs {x}", category_orders=_color_orders(df, color),
+                                 facet_row=facet_row, facet_col=facet_col)
+                trend_rows = None
+                if trendline and (facet_row or facet_col):
+                    trend_rows = "off"  # Con facetas no se puede alinear la línea con cada panel
+                elif trendline:
+                    fig.add_traces(_trendline_traces(df, x, y, trendline, color))
+                    trend_rows = min(len(df), TRENDLINE_MAX_ROWS)
+                _set_render_meta(fig, "decimated", len(df), len(plot_df), trend_rows)
 
         elif viz_type == "heatmap_corr":
-            numeric_df = df.select_dtypes(include=[np.number])
-            if numeric_df.shape[1] < 2: return fig
-            corr_matrix = numeric_df.corr()
-            fig = px.imshow(corr_matrix, text_auto=annot_heatmap, aspect="auto",
-                            color_continuous_scale=cmap_heatmap, title="Heatmap de Correlación")
+            corr_matrix = correlation_matrix(df, method=kwargs.get('corr_method', 'pearson'),
+                                             columns=kwargs.get('corr_columns') or None)
+            if corr_matrix.shape[0] < 2: return fig
+            method_label = "Spearman" if kwargs.get('corr_method') == 'spearman' else "Pearson"
+            fig = px.imshow(corr_matrix, text_auto=annot_heatmap, aspect="auto", zmin=-1, zmax=1,
+                            color_continuous_scale=cmap_heatmap, title=f"Heatmap de Correlación ({method_label})")
 
         elif viz_type == "heatmap_crosstab":
             if not x or not y: return fig
-            crosstab_df = pd.crosstab(df[x], df[y])
+            top_k = (kwargs.get('crosstab_top_x', CROSSTAB_TOP_K), kwargs.get('crosstab_top_y', CROSSTAB_TOP_K))
+            crosstab_df = crosstab(df, x, y, top_k=top_k)
+            if any(isinstance(dtype, pd.SparseDtype) for dtype in crosstab_df.dtypes):
+                crosstab_df = crosstab_df.sparse.to_dense()
             fig = px.imshow(crosstab_df, text_auto=annot_heatmap, aspect="auto",
                             color_continuous_scale=cmap_heatmap, title=f"Heatmap: Frecuencias de {x} vs {y}")
         
         elif viz_type == "pie":
             if not x or not y : return fig
-            pie_df_prep = df.copy()
-            if not pd.api.types.is_numeric_dtype(pie_df_prep[y]): return fig
-            pie_df_prep.dropna(subset=[x, y], inplace=True)
-            if pie_df_prep.empty: return fig
-            chart_data = pie_df_prep.groupby(x, as_index=False)[y].sum()
+            if not pd.api.types.is_numeric_dtype(df[y].dtype): return fig
+            chart_data = grouped_sum(df, x, y)
+            if chart_data.empty: return fig
             fig = px.pie(chart_data, names=x, values=y, title=f"Gráfico Circular de {y} por {x}",
                          hole=hole_pie, color=color if color in chart_data.columns else None)
             fig.update_traces(textinfo='percent+label+value', pull=kwargs.get('pull_pie', None))
@@ -132,8 +345,21 @@ def create_visualization(
             valid_dimensions = [d for d in dimensions_to_use if d in numeric_df_for_pairplot.columns]
             if not valid_dimensions: valid_dimensions = default_dims
             if not valid_dimensions: return fig
-            fig = px.scatter_matrix(numeric_df_for_pairplot, dimensions=valid_dimensions, color=color,
-                                    title="Pairplot (Matriz de Dispersión)")
+            n_dims = len(valid_dimensions)
+            render_mode = choose_render_mode(len(df), point_budget, large_data_mode, panels=n_dims * n_dims)
+            if render_mode == "density":
+                fig = _density_pairplot(df, valid_dimensions, cmap_heatmap)
+                n_cells = sum(np.size(trace.z) if trace.type == "heatmap" else len(trace.y) for trace in fig.data)
+                _set_render_meta(fig, "density", len(df), n_cells)
+            else:
+                plot_df = df
+                if render_mode == "decimated":
+                    strata = [color] if color and not pd.api.types.is_numeric_dtype(df[color].dtype) else None
+                    plot_df = density_decimate(df, valid_dimensions, max(point_budget // (n_dims * n_dims), 1),
+                                               strata=strata)
+                fig = px.scatter_matrix(plot_df, dimensions=valid_dimensions, color=color,
+                                        title="Pairplot (Matriz de Dispersión)")
+                _set_render_meta(fig, render_mode, len(df), len(plot_df) * n_dims * n_dims)
         
         elif viz_type == "slope":
             if not x or not y or not color: return fig # y2 no se usa directamente, se espera que x tenga 2 puntos
@@ -198,7 +424,10 @@ def create_visualization(
 
         elif viz_type == "diverging_bars":
             if not x or not y: return fig
-            fig = px.bar(df, x=x, y=y, color=y, 
+            if not pd.api.types.is_numeric_dtype(df[y].dtype): return fig
+            # Una barra por categoría con su total (con una fila por categoría es el mismo gráfico)
+            chart_data = grouped_sum(df, x, y)
+            fig = px.bar(chart_data, x=x, y=y, color=y,
                          color_continuous_scale=px.colors.diverging.RdBu,
                          color_continuous_midpoint=0, 
                          title=f"Barras Divergentes: {y} por {x}")
@@ -221,7 +450,7 @@ def create_visualization(
         else:
             pass 
     except Exception as e:
-        return go.Figure(layout=go.Layout(title=go.layout.Title(text=f"Error generando {viz_type}: {e}")))
+        return _error_figure(f"Error generando {viz_type}: {e}")
 
     if fig.data and not viz_type in ["slope", "radar", "box_violin_combined"]:
         fig.update_layout(template=kwargs.get("plotly_template", "plotly_white"), showlegend=True,
@@ -230,7 +459,149 @@ def create_visualization(
     return fig
 
 
+def supports_progressive(viz_type: str, y: Union[str, List[str]] = None, **params) -> bool:
+    """Indica si el gráfico admite agregación progresiva (agregados de una columna numérica)."""
+    if viz_type not in PROGRESSIVE_TYPES or not y:
+        return False
+    return viz_type != "radar" or isinstance(y, list)
+
+def progressive_visualization(df: pd.DataFrame, viz_type: str, fractions=PROGRESSIVE_FRACTIONS, **params):
+    """
+    Construye un gráfico agregado por etapas: primero con un prefijo aleatorio
+    de las filas (estimaciones con intervalo de confianza) y al final con todas
+    (resultado exacto, el mismo que create_visualization). En DataFrames de
+    Dask el prefijo es de particiones completas (partition_prefix), y las
+    etapas que no dejan particiones sin leer se omiten.
+
+    Args:
+        df: DataFrame (pandas o Dask)
+        viz_type: 'bar', 'pie', 'radar' o 'diverging_bars'
+        fractions: Fracciones de filas de cada etapa (la última debe ser 1.0)
+        **params: Parámetros de create_visualization
+
+    Yields:
+        tuple: (fracción de filas usada, figura)
+    """
+    lazy = is_lazy(df)
+    exact_fingerprint = _figure_fingerprint(df)
+    exact_key = hash_key(exact_fingerprint, "figure", viz_type, sorted(params.items())) if exact_fingerprint else None
+    # Las estimaciones de Dask se cachean con la clave estable de la fuente
+    fingerprint = lazy_frame_key(df) if lazy else exact_fingerprint
+    # Sin etapas si el dataset es pequeño o el resultado exacto ya está en caché
+    if fingerprint is None or not supports_progressive(viz_type, **params) or exact_key in _figure_cache \
+            or (lazy_row_count(df)[0] if lazy else len(df)) < PROGRESSIVE_MIN_ROWS:
+        yield 1.0, create_visualization(df, viz_type, **params)
+        return
+    used_partitions = 0
+    for fraction in fractions:
+        if fraction >= 1:
+            break
+        if lazy:
+            partitions = partition_prefix(df, fraction)
+            if len(partitions) in (used_partitions, df.npartitions):
+                continue  # La etapa no añade particiones o ya las lee todas
+            used_partitions = len(partitions)
+            sample = df._meta
+            estimate = lambda keys, cols, how, partitions=partitions: estimate_aggregate_partitions(
+                df, partitions, keys, cols, how)
+            note = f"estimación con {len(partitions) / df.npartitions:.0%} de las particiones, IC {CONFIDENCE_LEVEL:.0%}"
+        else:
+            sample = random_prefix(df, fraction)
+            estimate = lambda keys, cols, how, sample=sample: estimate_aggregate(sample, keys, cols, how, len(df))
+            note = f"estimación con {len(sample) / len(df):.0%} de las filas, IC {CONFIDENCE_LEVEL:.0%}"
+        yield fraction, _cached_figure(
+            ("progressive", viz_type, fraction, sorted(params.items())), fingerprint,
+            lambda: _build_progressive_estimate(sample, estimate, note, viz_type, **params))
+    yield 1.0, create_visualization(df, viz_type, **params)
+
+def _build_progressive_estimate(
+    sample: pd.DataFrame,
+    estimate,
+    note: str,
+    viz_type: str,
+    x: str = None,
+    y: Union[str, List[str]] = None,
+    color: str = None,
+    orientation: str = 'v',
+    barmode: str = 'relative',
+    hole_pie: float = 0,
+    bar_agg: str = 'sum',
+    **kwargs
+) -> go.Figure:
+    """
+    Figura intermedia de progressive_visualization: agregados estimados con
+    barras de error. `sample` solo da columnas y tipos; estimate(keys, cols, how)
+    devuelve las estimaciones (formato de estimate_aggregate).
+    """
+    fig = go.Figure()
+    if x and x not in sample.columns: return fig
+    values = y if isinstance(y, list) else [y]
+    if any(col not in sample.columns or not pd.api.types.is_numeric_dtype(sample[col].dtype) for col in values):
+        return fig
+    if color and (color not in sample.columns or color == x): color = None
+
+    try:
+        if viz_type == "bar":
+            if not x: return fig
+            keys = [x] + ([color] if color else [])
+            estimates = estimate(keys, y, bar_agg)
+            error = {"error_x" if orientation == 'h' else "error_y": f"{y}_error"}
+            fig = px.bar(estimates, x=x, y=y, color=color, orientation=orientation,
+                         barmode='group' if color else barmode, **error,
+                         title=f"Gráfico de Barras: {'media' if bar_agg == 'mean' else 'suma'} de {y} por {x} ({note})")
+
+        elif viz_type == "pie":
+            if not x: return fig
+            estimates = estimate([x], y, "sum")
+            estimates = estimates[estimates[y] > 0]
+            fig = px.pie(estimates, names=x, values=y, hole=hole_pie, custom_data=[f"{y}_error"],
+                         title=f"Gráfico Circular de {y} por {x} ({note})")
+            fig.update_traces(textinfo='percent+label',
+                              hovertemplate="%{label}<br>%{value:,.4g} ± %{customdata[0]:,.2g}<extra></extra>")
+
+        elif viz_type == "radar":
+            keys = [x] if x else []
+            estimates = estimate(keys, values, "mean")
+            for i, row in estimates.iterrows():
+                name = str(row[x]) if x else kwargs.get('radar_trace_name', 'Radar')
+                r = row[values].astype(float).tolist()
+                err = row[[f"{col}_error" for col in values]].astype(float).fillna(0).tolist()
+                line_color = px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
+                fig.add_trace(go.Scatterpolar(r=r + [r[0]], theta=values + [values[0]], fill='toself',
+                                              name=name, legendgroup=name, line_color=line_color))
+                # Banda del intervalo de confianza: límites inferior y superior discontinuos
+                for bound in (np.subtract(r, err), np.add(r, err)):
+                    bound = bound.tolist()
+                    fig.add_trace(go.Scatterpolar(r=bound + [bound[0]], theta=values + [values[0]], mode='lines',
+                                                  line={"dash": "dot", "width": 1, "color": line_color},
+                                                  legendgroup=name, showlegend=False, hoverinfo='skip'))
+            fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=kwargs.get('radar_range', None))),
+                              showlegend=len(estimates) > 1, title=f"Radar Chart{f' por {x}' if x else ''} ({note})")
+            return fig
+
+        elif viz_type == "diverging_bars":
+            if not x: return fig
+            estimates = estimate([x], y, "sum")
+            fig = px.bar(estimates, x=x, y=y, color=y, error_y=f"{y}_error",
+                         color_continuous_scale=px.colors.diverging.RdBu, color_continuous_midpoint=0,
+                         title=f"Barras Divergentes: {y} por {x} ({note})")
+    except Exception as e:
+        return _error_figure(f"Error generando {viz_type}: {e}")
+
+    if fig.data:
+        fig.update_layout(template=kwargs.get("plotly_template", "plotly_white"), showlegend=True,
+                          height=kwargs.get("fig_height", 600), legend_title_text=str(color) if color else None,
+                          margin=dict(l=60, r=50, t=70, b=60), title_x=0.5)
+    return fig
+
+
 def create_coupled_plot(df: pd.DataFrame, plot_configs: List[Dict[str, Any]], **kwargs) -> go.Figure: # Añadido **kwargs
+    # Memoizada como create_visualization; los subgráficos también salen de la caché de figuras
+    key_parts = ("coupled", [sorted(config.items()) for config in plot_configs], sorted(kwargs.items()))
+    return _cached_figure(key_parts, _figure_fingerprint(df),
+                          lambda: _build_coupled_plot(df, plot_configs, **kwargs))
+
+def _build_coupled_plot(df: pd.DataFrame, plot_configs: List[Dict[str, Any]], **kwargs) -> go.Figure:
     if not plot_configs or len(plot_configs) > 4:
         return go.Figure(layout={"title_text":"Configuración de gráficos acoplados inválida"})
 
@@ -242,19 +613,30 @@ def create_coupled_plot(df: pd.DataFrame, plot_configs: List[Dict[str, Any]], **
             rows = int(np.ceil(len(plot_configs)/cols))
 
 
-    subplot_titles = [f"{config.get('viz_type', '').capitalize()}{f' de {config.get('x')}' if config.get('x') else ''}{f' vs {config.get('y')}' if config.get('y') else ''}" for config in plot_configs]
+    subplot_titles = [
+        f"{config.get('viz_type', '').capitalize()}"
+        + (f" de {config.get('x')}" if config.get('x') else '')
+        + (f" vs {config.get('y')}" if config.get('y') else '')
+        for config in plot_configs
+    ]
 
     try:
         fig_subplots = make_subplots(rows=rows, cols=cols, subplot_titles=subplot_titles)
     except Exception as e:
-        return go.Figure(layout={"title_text": f"Error creando subplots: {e}"})
+        return _error_figure(f"Error creando subplots: {e}")
 
-    for i, config in enumerate(plot_configs):
+    # Subgráficos en paralelo; las agregaciones repetidas entre ellos se calculan una vez
+    with shared_aggregations(), ThreadPoolExecutor(max_workers=COUPLED_PLOT_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(copy_context().run, create_visualization, df, config['viz_type'],
+                            **{k: v for k, v in config.items() if k != 'viz_type'})
+            for config in plot_configs
+        ]
+        sub_figs = [future.result() for future in futures]
+
+    for i, (config, sub_fig) in enumerate(zip(plot_configs, sub_figs)):
         row_idx = (i // cols) + 1
         col_idx = (i % cols) + 1
-        params_for_subfig = {k: v for k, v in config.items() if k != 'viz_type'}
-        sub_fig = create_visualization(df, viz_type=config['viz_type'], **params_for_subfig)
-        
         if not sub_fig.data:
             fig_subplots.add_annotation(text=f"No data for {config['viz_type']}", xref="paper", yref="paper",
                                         x= (col_idx - 0.5) / cols, y= 1 - ((row_idx - 0.5) / rows), 
@@ -266,6 +648,8 @@ def create_coupled_plot(df: pd.DataFrame, plot_configs: List[Dict[str, Any]], **
     fig_subplots.update_layout(height=kwargs.get("coupled_fig_height", 700), 
                                showlegend=kwargs.get("showlegend_coupled", True),
                                title_text=kwargs.get("coupled_plot_title", "Gráficos Acoplados"))
+    if any(_is_error_figure(sub_fig) for sub_fig in sub_figs):
+        fig_subplots.update_layout(meta={"error": True})  # Algún subgráfico falló: no se cachea
     return fig_subplots
 
 
@@ -275,7 +659,7 @@ def export_plot(fig: go.Figure, format: str = "png", dpi: int = 300, width: int
     scale_factor = dpi / 100 
     try:
         if format in ["png", "jpeg", "webp", "svg", "pdf", "eps"]:
-            return fig.to_image(format=format, width=width, height=height, scale=scale_factor if format=='png' else None)
+            return fig.to_image(format=format, width=width, height=height, scale=scale_factor if format in ['png', 'jpeg', 'webp'] else None)
         else:
             raise ValueError(f"Formato '{format}' no soportado para exportación.")
     except Exception as e: